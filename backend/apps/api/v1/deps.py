@@ -115,6 +115,13 @@ async def get_current_user_optional(
     if not token:
         return None
 
+    return await get_user_from_token(token, db)
+
+
+async def get_user_from_token(token: str, db: DatabaseAdapter) -> Optional[AuthenticatedUser]:
+    """
+    解析 JWT 并加载用户，token 无效或用户不可用时返回 None（供 WebSocket 等非依赖注入场景使用）
+    """
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
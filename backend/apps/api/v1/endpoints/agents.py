@@ -20,9 +20,8 @@ from libs.agents.v2 import (
 from libs.agents.v2.config import config_manager
 from libs.agents.v2.ai_foundation.llm.manager import llm_manager
 from libs.config.settings import settings
-from apps.api.v1.deps import get_current_user_optional, get_database, AuthenticatedUser
-from apps.api.v1.services import user_credit_logs as credit_service
-from apps.schemas.user_credit_logs import CreditTransaction
+from apps.api.v1.deps import get_current_user_optional, get_database, require_admin_role, AuthenticatedUser
+from apps.api.v1.services import agent_metering
 from libs.database.adapters import DatabaseAdapter
 
 logger = logging.getLogger(__name__)
@@ -90,35 +89,42 @@ async def get_or_create_session(db: DatabaseAdapter, user_id: int, session_id: O
     return str(uuid.uuid4())
 
 
-async def log_agent_interaction(db: DatabaseAdapter, user_id: int, agent_type: str, message: str, response: str, session_id: str):
+async def log_agent_interaction(
+    db: DatabaseAdapter,
+    user_id: int,
+    agent_type: str,
+    message: str,
+    response: str,
+    session_id: str,
+    model_name: Optional[str] = None,
+    account_id: Optional[uuid.UUID] = None
+):
     """
     记录AI智能体交互日志
+
+    认证用户（account_id）的用量进入计费缓冲，由后台任务批量扣减积分，不阻塞响应
     """
     try:
-        # 这里可以记录到数据库中，暂时记录到日志
         logger.info(f"AI交互: user={user_id}, agent={agent_type}, session={session_id}, message_length={len(message)}")
 
-        # 扣除积分（如果需要的话）
-        # await credit_service.award_credits(db, CreditTransaction(
-        #     user_id=user_id,
-        #     credit_type="learning_points",
-        #     amount=-1,  # 每次对话消耗1积分
-        #     description=f"AI{agent_type}对话",
-        #     reference_type="ai_interaction"
-        # ))
+        if account_id:
+            await agent_metering.record_agent_usage(
+                account_id, agent_type, model_name,
+                agent_metering.estimate_tokens(message),
+                agent_metering.estimate_tokens(response),
+                session_id
+            )
 
     except Exception as e:
         logger.error(f"记录AI交互失败: {e}")
 
 
-async def check_user_credits(db: DatabaseAdapter, user_id: int) -> bool:
+async def check_user_credits(db: DatabaseAdapter, user_id: uuid.UUID) -> bool:
     """
-    检查用户是否有足够的积分使用AI服务
+    检查用户是否有足够的积分使用AI服务（读取缓存的运行余额）
     """
     try:
-        balance = await credit_service.get_user_credit_balance(db, user_id)
-        # 检查是否有足够的积分（这里可以设置最低要求）
-        return balance.total_points >= 0  # 暂时允许所有用户使用
+        return await agent_metering.has_agent_credits(db, user_id)
     except Exception as e:
         logger.error(f"检查用户积分失败: {e}")
         return True  # 出错时允许使用
@@ -180,7 +186,7 @@ async def chat_with_planner(
         if current_user:
             user_id = int(current_user.id)
             # 认证用户检查积分
-            if not await check_user_credits(db, user_id):
+            if not await check_user_credits(db, current_user.id):
                 raise HTTPException(status_code=402, detail="积分不足，请充值后继续使用")
         else:
             # 匿名用户使用临时UUID
@@ -197,7 +203,10 @@ async def chat_with_planner(
         response = await planner.execute(request.message)
 
         # 记录交互日志
-        await log_agent_interaction(db, user_id, "study_planner", request.message, response, session_id)
+        await log_agent_interaction(
+            db, user_id, "study_planner", request.message, response, session_id,
+            model_name, current_user.id if current_user else None
+        )
 
         return ChatResponse(
             response=response,
@@ -239,7 +248,7 @@ async def chat_with_consultant(
         if current_user:
             user_id = int(current_user.id)
             # 认证用户检查积分
-            if not await check_user_credits(db, user_id):
+            if not await check_user_credits(db, current_user.id):
                 raise HTTPException(status_code=402, detail="积分不足，请充值后继续使用")
         else:
             # 匿名用户使用临时UUID
@@ -256,7 +265,10 @@ async def chat_with_consultant(
         response = await consultant.execute(request.message)
 
         # 记录交互日志
-        await log_agent_interaction(db, user_id, "study_consultant", request.message, response, session_id)
+        await log_agent_interaction(
+            db, user_id, "study_consultant", request.message, response, session_id,
+            model_name, current_user.id if current_user else None
+        )
 
         return ChatResponse(
             response=response,
@@ -308,7 +320,7 @@ async def chat_with_auto_agent(
         if current_user:
             user_id = int(current_user.id)
             # 认证用户检查积分
-            if not await check_user_credits(db, user_id):
+            if not await check_user_credits(db, current_user.id):
                 raise HTTPException(status_code=402, detail="积分不足，请充值后继续使用")
         else:
             # 匿名用户使用临时UUID
@@ -334,7 +346,10 @@ async def chat_with_auto_agent(
         response_text = await agent.execute(auto_request.request.message)
 
         # 记录交互日志
-        await log_agent_interaction(db, user_id, auto_request.agent_type, auto_request.request.message, response_text, session_id)
+        await log_agent_interaction(
+            db, user_id, auto_request.agent_type, auto_request.request.message, response_text, session_id,
+            model_name, current_user.id if current_user else None
+        )
 
         if not stream:
             return ChatResponse(
@@ -399,6 +414,13 @@ async def chat_with_auto_agent(
         logger.error(f"智能体对话异常: {e}")
         raise HTTPException(status_code=500, detail="对话服务暂时不可用")
 
+@router.get("/metrics/usage", summary="智能体计费缓冲指标")
+async def get_agent_usage_metrics(
+    current_user: AuthenticatedUser = Depends(require_admin_role())
+):
+    """查看用量缓冲的待刷写量、余额缓存命中与刷写任务运行情况（仅管理员）"""
+    return await agent_metering.get_agent_usage_metrics()
+
 # 健康检查路由
 @router.get("/health", summary="智能体系统健康检查")
 async def health_check():
@@ -2,25 +2,32 @@
 通信中心 - API 路由
 包括对话和消息管理的API
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
 from typing import List, Optional
 from uuid import UUID
 
 from apps.api.v1.deps import (
     get_current_user,
+    get_user_from_token,
     AuthenticatedUser,
     get_database
 )
 from libs.database.adapters import DatabaseAdapter
+from libs.database.connection import database_adapter_context
+from libs.realtime import ClientConnection, pump_connection
 from apps.schemas.communication import (
     Conversation, ConversationCreate, ConversationUpdate,
     ConversationParticipant, ConversationParticipantCreate,
-    Message, MessageCreate, MessageUpdate
+    Message, MessageCreate, MessageUpdate,
+    ConversationReadRequest, ConversationReadState, ConversationSyncResult
 )
 from apps.schemas.common import GeneralResponse, PaginatedResponse
 from apps.api.v1.services import communication as communication_service
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # ============ 对话管理 ============
@@ -42,9 +49,11 @@ async def list_conversations(
 
     - **limit**: 返回数量（1-100）
     - **offset**: 偏移量
+
+    每个对话附带当前用户的 lastReadMessageId 与 unreadCount（最多统计到 999）。
     """
     conversations = await communication_service.get_conversations_by_user(
-        db, current_user.id
+        db, current_user.id, limit, offset
     )
     return GeneralResponse(data=conversations)
 
@@ -149,6 +158,65 @@ async def delete_conversation(
     return GeneralResponse(data={"message": "对话删除成功"})
 
 
+@router.put(
+    "/conversations/{conversation_id}/read",
+    response_model=GeneralResponse[ConversationReadState],
+    summary="标记对话已读",
+    description="将当前用户在对话中的已读位置推进到指定消息"
+)
+async def mark_conversation_read(
+    conversation_id: UUID,
+    read_data: Optional[ConversationReadRequest] = None,
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    标记对话已读
+
+    - **conversation_id**: 对话ID
+    - **message_id**: 已读到的消息ID（可选，默认对话最新消息）
+
+    已读位置只前进不后退，返回推进后的游标与剩余未读数。
+    """
+    state = await communication_service.mark_conversation_read(
+        db, conversation_id, current_user.id, read_data.message_id if read_data else None
+    )
+    if not state:
+        raise HTTPException(status_code=404, detail="对话或消息不存在")
+    return GeneralResponse(data=state)
+
+
+@router.get(
+    "/conversations/{conversation_id}/sync",
+    response_model=GeneralResponse[ConversationSyncResult],
+    summary="增量同步对话",
+    description="返回客户端游标之后的消息与参与者变更"
+)
+async def sync_conversation(
+    conversation_id: UUID,
+    cursor: int = Query(0, ge=0, description="上次同步返回的游标，0 表示从头同步"),
+    limit: int = Query(500, ge=1, le=1000, description="本次最多读取的变更条数"),
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    增量同步对话
+
+    - **conversation_id**: 对话ID
+    - **cursor**: 上次同步返回的游标（也可取对话详情中的 changeSeq）
+    - **limit**: 本次最多读取的变更条数（1-1000）
+
+    同一消息的多次变更合并为最终状态；has_more 为真时以返回的游标继续请求。
+    reset 为真表示游标已失效，客户端应清空本地数据，重新加载消息后从返回的游标继续同步。
+    """
+    result = await communication_service.sync_conversation(
+        db, conversation_id, current_user.id, cursor, limit
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="对话不存在")
+    return GeneralResponse(data=result)
+
+
 # ============ 对话参与者管理 ============
 
 @router.get(
@@ -398,8 +466,92 @@ async def mark_message_as_read(
     标记消息为已读
 
     - **message_id**: 消息ID
+
+    推进当前用户在该对话中的已读位置，该消息及之前的消息均视为已读。
     """
     success = await communication_service.mark_message_as_read(db, message_id, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="消息不存在")
     return GeneralResponse(data={"message": "消息已标记为已读", "message_id": message_id})
+
+
+# ============ 实时消息 (WebSocket) ============
+
+async def _receive_client_messages(websocket: WebSocket, connection: ClientConnection) -> None:
+    """处理客户端上行消息：ping 与订阅新对话"""
+    while True:
+        message = await websocket.receive_json()
+        message_type = message.get("type") if isinstance(message, dict) else None
+
+        if message_type == "ping":
+            await websocket.send_json({"type": "pong"})
+        elif message_type == "subscribe":
+            try:
+                conversation_id = UUID(str(message.get("conversation_id")))
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "无效的对话ID"})
+                continue
+            async with database_adapter_context() as db:
+                ok = await communication_service.subscribe_realtime_conversation(db, connection, conversation_id)
+            await websocket.send_json({
+                "type": "subscribed" if ok else "error",
+                "conversation_id": str(conversation_id),
+                **({} if ok else {"detail": "不是对话参与者"})
+            })
+
+
+@router.websocket("/ws")
+async def conversation_events(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="访问令牌（也可通过 Authorization 头传递）")
+):
+    """
+    实时消息通道
+
+    连接时认证一次并订阅当前用户参与的全部对话，服务端推送：
+    - **message.created / message.updated**: 新消息 / 消息更新
+    - **participant.added / participant.removed**: 参与者变化
+    - **participant.read**: 参与者已读位置前进
+
+    客户端可发送 `{"type": "ping"}` 与 `{"type": "subscribe", "conversation_id": ...}`。
+    推送积压过多时服务端以 1013 关闭连接，客户端应重连并通过消息列表接口补齐。
+    """
+    if not token:
+        authorization = websocket.headers.get("authorization", "")
+        token = authorization[7:] if authorization.startswith("Bearer ") else None
+
+    try:
+        async with database_adapter_context() as db:
+            user = await get_user_from_token(token, db) if token else None
+            if user is None:
+                await websocket.close(code=4401)
+                return
+            connection = await communication_service.open_realtime_connection(db, user.id)
+    except RuntimeError:
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+
+    await websocket.accept()
+    await websocket.send_json({
+        "type": "ready",
+        "conversation_ids": [str(channel[1]) for channel in connection.channels]
+    })
+
+    sender = asyncio.create_task(pump_connection(connection, websocket.send_text))
+    receiver = asyncio.create_task(_receive_client_messages(websocket, connection))
+    try:
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error and not isinstance(error, WebSocketDisconnect):
+                logger.warning(f"实时连接异常结束: {error}")
+        if connection.overflowed:
+            try:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            except RuntimeError:
+                # 连接已关闭
+                pass
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        communication_service.close_realtime_connection(connection)
@@ -14,6 +14,7 @@ from apps.api.v1.deps import get_current_user
 from apps.api.v1.deps import AuthenticatedUser
 from apps.schemas.common import GeneralResponse
 from libs.config.settings import settings
+from libs.storage.minio_client import FileTooLargeError
 from libs.storage.minio_manager import minio_storage_manager
 
 router = APIRouter()
@@ -49,6 +50,25 @@ def validate_file_size(file_size: int, max_size: int) -> bool:
     """验证文件大小"""
     return file_size <= max_size
 
+async def stream_upload(file: UploadFile, file_type: str, user_id: str, max_size: int) -> dict:
+    """
+    流式上传 UploadFile 到MinIO，不把整个文件读入内存
+
+    客户端声明的大小超限时直接拒绝；否则边读边上传，实际读取超限时抛出 FileTooLargeError
+    """
+    declared_size = getattr(file, "size", None)
+    if declared_size is not None and not validate_file_size(declared_size, max_size):
+        raise FileTooLargeError(max_size)
+
+    await file.seek(0)
+    return await minio_storage_manager.upload_stream(
+        stream=file.file,
+        original_filename=file.filename,
+        file_type=file_type,
+        user_id=user_id,
+        max_size=max_size
+    )
+
 def generate_unique_filename(original_filename: str) -> str:
     """生成唯一文件名"""
     if not original_filename:
@@ -83,24 +103,15 @@ async def upload_avatar(
                 detail="不支持的文件类型。仅支持 jpg, jpeg, png, gif, webp 格式"
             )
         
-        # 读取文件内容以验证大�?
-        contents = await file.read()
-        file_size = len(contents)
-        
-        # 验证文件大小
-        if not validate_file_size(file_size, MAX_IMAGE_SIZE):
+        # 流式上传，大小限制在读取过程中校验
+        try:
+            upload_result = await stream_upload(file, "avatar", str(current_user.id), MAX_IMAGE_SIZE)
+        except FileTooLargeError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"文件大小超过限制。最大允�?{MAX_IMAGE_SIZE // (1024*1024)}MB"
+                detail=f"文件大小超过限制。最大允许 {MAX_IMAGE_SIZE // (1024*1024)}MB"
             )
-        
-        # 使用MinIO存储管理器上传文件
-        upload_result = await minio_storage_manager.upload_file(
-            file_content=contents,
-            original_filename=file.filename,
-            file_type="avatar",
-            user_id=str(current_user.id)
-        )
+        file_size = upload_result["file_size"]
 
         file_url = upload_result["file_url"]
         unique_filename = upload_result["unique_filename"]
@@ -151,24 +162,15 @@ async def upload_document(
                 detail="不支持的文件类型。仅支持 pdf, doc, docx, txt 格式"
             )
         
-        # 读取文件内容以验证大�?
-        contents = await file.read()
-        file_size = len(contents)
-        
-        # 验证文件大小
-        if not validate_file_size(file_size, MAX_DOCUMENT_SIZE):
+        # 流式上传，大小限制在读取过程中校验
+        try:
+            upload_result = await stream_upload(file, "document", str(current_user.id), MAX_DOCUMENT_SIZE)
+        except FileTooLargeError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"文件大小超过限制。最大允�?{MAX_DOCUMENT_SIZE // (1024*1024)}MB"
+                detail=f"文件大小超过限制。最大允许 {MAX_DOCUMENT_SIZE // (1024*1024)}MB"
             )
-        
-        # 使用MinIO存储管理器上传文件
-        upload_result = await minio_storage_manager.upload_file(
-            file_content=contents,
-            original_filename=file.filename,
-            file_type="document",
-            user_id=str(current_user.id)
-        )
+        file_size = upload_result["file_size"]
 
         file_url = upload_result["file_url"]
         unique_filename = upload_result["unique_filename"]
@@ -227,11 +229,8 @@ async def upload_multiple_files(
                     errors.append(f"文件{i+1}: 不支持的图片格式")
                     continue
                     
-                contents = await file.read()
-                if not validate_file_size(len(contents), MAX_IMAGE_SIZE):
-                    errors.append(f"文件{i+1}: 图片大小超过限制")
-                    continue
-                    
+                max_size = MAX_IMAGE_SIZE
+                too_large_error = f"文件{i+1}: 图片大小超过限制"
                 subdir = "avatars"
                 
             else:  # document
@@ -240,27 +239,23 @@ async def upload_multiple_files(
                     errors.append(f"文件{i+1}: 不支持的文档格式")
                     continue
                     
-                contents = await file.read()
-                if not validate_file_size(len(contents), MAX_DOCUMENT_SIZE):
-                    errors.append(f"文件{i+1}: 文档大小超过限制")
-                    continue
-                    
+                max_size = MAX_DOCUMENT_SIZE
+                too_large_error = f"文件{i+1}: 文档大小超过限制"
                 subdir = "documents"
             
             # 使用MinIO存储管理器上传文件
             file_type = "avatar" if file_type == "avatar" else "document"
-            upload_result = await minio_storage_manager.upload_file(
-                file_content=contents,
-                original_filename=file.filename,
-                file_type=file_type,
-                user_id=str(current_user.id)
-            )
+            try:
+                upload_result = await stream_upload(file, file_type, str(current_user.id), max_size)
+            except FileTooLargeError:
+                errors.append(too_large_error)
+                continue
 
             results.append({
                 "file_id": upload_result["file_id"],
                 "filename": file.filename,
                 "file_url": upload_result["file_url"],
-                "file_size": len(contents),
+                "file_size": upload_result["file_size"],
                 "content_type": file.content_type,
                 "bucket_name": upload_result["bucket_name"],
                 "object_name": upload_result["object_name"],
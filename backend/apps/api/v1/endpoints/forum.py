@@ -2,12 +2,14 @@
 论坛中心 - API 路由
 包括帖子和评论管理的API
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from typing import List, Optional
 from uuid import UUID
 
 from apps.api.v1.deps import (
     get_current_user,
+    get_current_user_optional,
+    require_admin_role,
     AuthenticatedUser,
     get_database
 )
@@ -15,9 +17,10 @@ from libs.database.adapters import DatabaseAdapter
 from apps.schemas.forum import (
     ForumPost, ForumPostCreate, ForumPostUpdate,
     PostReply, PostReplyCreate, PostReplyUpdate,
-    Like, LikeCreate,
+    Like, LikeCreate, LikedIds, LikeBatchRequest, LikeBatchItemResult,
     ForumPostDetail, ForumReplyDetail,
-    ForumPostListResponse, ForumReplyListResponse
+    ForumPostListResponse, ForumReplyListResponse, ForumSearchResponse,
+    ForumReplyTree
 )
 from apps.schemas.common import GeneralResponse, PaginatedResponse
 from apps.api.v1.services import forum as forum_service
@@ -39,7 +42,10 @@ async def list_posts(
     author_id: Optional[UUID] = Query(None, description="作者ID筛选"),
     limit: int = Query(20, ge=1, le=100, description="返回数量"),
     offset: int = Query(0, ge=0, description="偏移量"),
-    db: DatabaseAdapter = Depends(get_database)
+    include_total: bool = Query(True, description="是否返回总数；为 false 时仅返回 has_more"),
+    sort: str = Query("latest", pattern="^(latest|hot)$", description="排序方式: latest 最新, hot 热门"),
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_optional)
 ):
     """
     获取帖子列表
@@ -49,9 +55,13 @@ async def list_posts(
     - **author_id**: 作者ID筛选
     - **limit**: 返回数量（1-100）
     - **offset**: 偏移量
+    - **include_total**: 是否返回总数（总数为短期缓存值）
+    - **sort**: 排序方式（latest 最新 / hot 热门，热度每5分钟刷新）
     """
     result = await forum_service.get_posts(
-        db, category, tag, author_id, limit, offset
+        db, category, tag, author_id, limit, offset, include_total,
+        viewer_id=current_user.id if current_user else None,
+        sort=sort
     )
     return GeneralResponse(data=result)
 
@@ -80,6 +90,31 @@ async def create_post(
     return GeneralResponse(data=post)
 
 
+@router.get(
+    "/search",
+    response_model=GeneralResponse[ForumSearchResponse],
+    summary="搜索帖子",
+    description="按标题、标签和正文全文搜索帖子，按相关度排序，支持游标分页"
+)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=100, description="搜索关键词"),
+    category: Optional[str] = Query(None, description="帖子分类"),
+    limit: int = Query(20, ge=1, le=50, description="返回数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    db: DatabaseAdapter = Depends(get_database)
+):
+    """
+    搜索帖子
+
+    - **q**: 搜索关键词，多个词以空格分隔（同时命中）
+    - **category**: 帖子分类筛选
+    - **limit**: 返回数量（1-50）
+    - **cursor**: 分页游标
+    """
+    result = await forum_service.search_posts(db, q, category, limit, cursor)
+    return GeneralResponse(data=result)
+
+
 @router.get(
     "/posts/{post_id}",
     response_model=GeneralResponse[ForumPostDetail],
@@ -95,7 +130,7 @@ async def get_post(
 
     - **post_id**: 帖子ID
     """
-    post = await forum_service.get_post_by_id(db, post_id)
+    post = await forum_service.get_post_by_id(db, post_id, record_view=True)
     if not post:
         raise HTTPException(status_code=404, detail="帖子不存在")
     return GeneralResponse(data=post)
@@ -162,7 +197,8 @@ async def list_post_replies(
     post_id: UUID,
     limit: int = Query(20, ge=1, le=100, description="返回数量"),
     offset: int = Query(0, ge=0, description="偏移量"),
-    db: DatabaseAdapter = Depends(get_database)
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_optional)
 ):
     """
     获取帖子回复列表
@@ -171,10 +207,32 @@ async def list_post_replies(
     - **limit**: 返回数量（1-100）
     - **offset**: 偏移量
     """
-    result = await forum_service.get_post_replies(db, post_id, limit, offset)
+    result = await forum_service.get_post_replies(
+        db, post_id, limit, offset,
+        viewer_id=current_user.id if current_user else None
+    )
     return GeneralResponse(data=result)
 
 
+@router.get(
+    "/posts/{post_id}/replies/tree",
+    response_model=GeneralResponse[ForumReplyTree],
+    summary="获取帖子回复树",
+    description="一次返回帖子的全部回复，按父子关系嵌套"
+)
+async def get_post_reply_tree(
+    post_id: UUID,
+    db: DatabaseAdapter = Depends(get_database)
+):
+    """
+    获取帖子回复树
+
+    - **post_id**: 帖子ID
+    """
+    body = await forum_service.get_reply_tree_body(db, post_id)
+    return Response(content=body, media_type="application/json")
+
+
 @router.post(
     "/posts/{post_id}/replies",
     response_model=GeneralResponse[PostReply],
@@ -265,6 +323,8 @@ async def like_post(
     - **post_id**: 帖子ID
     """
     like = await forum_service.like_post(db, post_id, current_user.id)
+    if not like:
+        raise HTTPException(status_code=404, detail="帖子不存在")
     return GeneralResponse(data=like)
 
 
@@ -286,9 +346,55 @@ async def like_reply(
     - **reply_id**: 回复ID
     """
     like = await forum_service.like_reply(db, reply_id, current_user.id)
+    if not like:
+        raise HTTPException(status_code=404, detail="回复不存在")
     return GeneralResponse(data=like)
 
 
+@router.post(
+    "/likes/batch",
+    response_model=GeneralResponse[List[LikeBatchItemResult]],
+    summary="批量点赞/取消点赞",
+    description="按期望状态批量设置点赞，适用于客户端离线队列回放，重复提交结果不变"
+)
+async def batch_likes(
+    request: LikeBatchRequest,
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    批量点赞/取消点赞
+
+    - **items**: 操作列表（最多500项），每项包含 target_type、target_id、liked
+    """
+    results = await forum_service.apply_like_batch(db, current_user.id, request.items)
+    return GeneralResponse(data=results)
+
+
+@router.get(
+    "/likes/me",
+    response_model=GeneralResponse[LikedIds],
+    summary="批量查询点赞状态",
+    description="查询当前用户在给定帖子/回复ID中已点赞的部分"
+)
+async def get_my_likes(
+    post_ids: List[UUID] = Query([], description="帖子ID列表"),
+    reply_ids: List[UUID] = Query([], description="回复ID列表"),
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    批量查询点赞状态
+
+    - **post_ids**: 帖子ID列表（最多200个）
+    - **reply_ids**: 回复ID列表（最多200个）
+    """
+    if len(post_ids) > 200 or len(reply_ids) > 200:
+        raise HTTPException(status_code=400, detail="单次最多查询200个ID")
+    result = await forum_service.get_liked_ids(db, current_user.id, post_ids, reply_ids)
+    return GeneralResponse(data=result)
+
+
 @router.delete(
     "/likes/posts/{post_id}",
     response_model=GeneralResponse[dict],
@@ -331,3 +437,19 @@ async def unlike_reply(
     if not success:
         raise HTTPException(status_code=404, detail="点赞不存在")
     return GeneralResponse(data={"message": "取消点赞成功"})
+
+
+# ============ 运行指标 ============
+
+@router.get(
+    "/metrics/views",
+    response_model=GeneralResponse[dict],
+    summary="浏览计数缓冲指标",
+    description="查看帖子浏览计数缓冲的待刷写量与刷写任务运行情况（仅管理员）"
+)
+async def get_post_view_metrics(
+    current_user: AuthenticatedUser = Depends(require_admin_role())
+):
+    """获取浏览计数缓冲指标"""
+    metrics = await forum_service.get_post_view_metrics()
+    return GeneralResponse(data=metrics)
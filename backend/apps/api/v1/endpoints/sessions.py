@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 from apps.api.v1.deps import get_current_user, require_mentor_role, require_student_role, get_database
 from apps.api.v1.deps import AuthenticatedUser
 from apps.schemas.session import (
-    SessionCreate, SessionUpdate, Session, SessionRead, SessionFeedback, SessionSummary
+    SessionCreate, SessionUpdate, Session, SessionRead, SessionFeedback, SessionSummary,
+    WeeklyAvailability, UnavailablePeriodCreate, UnavailablePeriod, BookableSlot
 )
 from apps.api.v1.repositories import session
+from apps.api.v1.services import scheduling
 
 router = APIRouter()
 
@@ -29,7 +32,12 @@ async def create_session(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="创建会话失败，请检查指导者和订单信息"
             )
+        scheduling.invalidate_mentor_weeks(
+            session_result["mentor_id"], session_result["scheduled_at"], session_result["ends_at"]
+        )
         return session_result
+    except session.SessionOverlapError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="该时段导师已有预约，请选择其他时间")
     except HTTPException:
         raise
     except Exception as e:
@@ -53,13 +61,11 @@ async def get_session_statistics(
         # 使用当前用户的角色
         user_role = current_user.role
 
-        # 简化实现：返回基础统计信息
-        sessions = await session.get_by_user(db_conn, current_user.id, 1000)  # 获取所有会话进行统计
-
-        total_sessions = len(sessions)
-        completed_sessions = len([s for s in sessions if s.get('status') == 'completed'])
-        cancelled_sessions = len([s for s in sessions if s.get('status') == 'cancelled'])
-        active_sessions = len([s for s in sessions if s.get('status') == 'active'])
+        counts = await session.get_user_statistics(db_conn, current_user.id)
+        total_sessions = counts['total_sessions']
+        completed_sessions = counts['completed_sessions']
+        cancelled_sessions = counts['cancelled_sessions']
+        active_sessions = counts['active_sessions']
 
         stats = {
             "user_role": user_role,
@@ -115,8 +121,7 @@ async def get_upcoming_sessions(
 ):
     """获取即将到来的会话"""
     try:
-        # 简化实现：获取所有用户会话（实际应该根据时间筛选即将到来的会话）
-        sessions = await session.get_by_user(db_conn, current_user.id, limit)
+        sessions = await session.get_upcoming_by_user(db_conn, current_user.id, limit)
         return sessions
     except Exception as e:
         raise HTTPException(
@@ -126,90 +131,150 @@ async def get_upcoming_sessions(
 
 
 @router.get(
-    "/{session_id}",
-    response_model=SessionRead,
-    summary="获取会话详情",
-    description="获取指定会话的详细信息",
+    "/mentors/{mentor_id}/slots",
+    response_model=List[BookableSlot],
+    summary="获取导师可预约时段",
+    description="按导师每周可用时间、不可用时段和已有会话计算指定范围内的可预约时段",
 )
-async def get_session_detail(
-    session_id: UUID,
+async def get_mentor_slots(
+    mentor_id: UUID,
+    start: datetime = Query(..., description="开始时间（不带时区按 UTC）"),
+    end: datetime = Query(..., description="结束时间（最多 62 天）"),
+    duration_minutes: int = Query(60, ge=15, le=480, description="时段时长（分钟）"),
+    step_minutes: int = Query(30, ge=5, le=480, description="相邻时段起点间隔（分钟）"),
     db_conn=Depends(get_database),
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    """获取会话详情"""
+    """获取导师可预约时段"""
     try:
-        session_result = await session.get_by_id(db_conn, session_id)
-        if not session_result:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="会话未找到或您没有权限查看",
-            )
-        return session_result
+        return await scheduling.get_bookable_slots(
+            db_conn, mentor_id, start, end, duration_minutes, step_minutes
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"获取会话详情失败: {str(e)}"
+            detail=f"获取可预约时段失败: {str(e)}"
         )
 
 @router.get(
-    "/statistics",
-    response_model=dict,
-    summary="获取会话统计",
-    description="获取用户的会话统计信息",
+    "/availability",
+    response_model=List[WeeklyAvailability],
+    summary="获取我的每周可用时间",
+    description="获取当前用户设置的每周可用时间（UTC）",
 )
-async def get_session_statistics(
+async def get_my_availability(
     db_conn=Depends(get_database),
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    """获取会话统计"""
+    """获取我的每周可用时间"""
     try:
-        # 从当前用户中获取角色信息，后端自动判断角色
-        user_role = current_user.role.lower() if hasattr(current_user, 'role') else 'student'
+        return await scheduling.get_weekly_availability(db_conn, current_user.id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"获取可用时间失败: {str(e)}"
+        )
 
-        # 简化实现：返回基础统计信息
-        sessions = await session.get_by_user(db_conn, current_user.id, 1000)  # 获取所有会话进行统计
+@router.put(
+    "/availability",
+    response_model=List[WeeklyAvailability],
+    summary="设置每周可用时间",
+    description="以提交的列表整体替换当前导师的每周可用时间（UTC，0=周日，每天一个时间段）",
+)
+async def replace_my_availability(
+    items: List[WeeklyAvailability],
+    db_conn=Depends(get_database),
+    current_user: AuthenticatedUser = Depends(require_mentor_role())
+):
+    """设置每周可用时间"""
+    try:
+        return await scheduling.replace_weekly_availability(db_conn, current_user.id, items)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"设置可用时间失败: {str(e)}"
+        )
 
-        total_sessions = len(sessions)
-        completed_sessions = len([s for s in sessions if s.get('status') == 'completed'])
-        cancelled_sessions = len([s for s in sessions if s.get('status') == 'cancelled'])
+@router.post(
+    "/unavailable-periods",
+    response_model=UnavailablePeriod,
+    status_code=status.HTTP_201_CREATED,
+    summary="新增不可用时段",
+    description="导师标记一段不可预约的时间（如休假）",
+)
+async def create_unavailable_period(
+    period_data: UnavailablePeriodCreate,
+    db_conn=Depends(get_database),
+    current_user: AuthenticatedUser = Depends(require_mentor_role())
+):
+    """新增不可用时段"""
+    try:
+        return await scheduling.create_unavailable_period(db_conn, current_user.id, period_data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"新增不可用时段失败: {str(e)}"
+        )
 
-        stats = {
-            "total_sessions": total_sessions,
-            "completed_sessions": completed_sessions,
-            "cancelled_sessions": cancelled_sessions,
-            "completion_rate": completed_sessions / total_sessions if total_sessions > 0 else 0
-        }
-        return stats
+@router.delete(
+    "/unavailable-periods/{period_id}",
+    response_model=dict,
+    summary="删除不可用时段",
+    description="删除当前导师的不可用时段",
+)
+async def delete_unavailable_period(
+    period_id: UUID,
+    db_conn=Depends(get_database),
+    current_user: AuthenticatedUser = Depends(require_mentor_role())
+):
+    """删除不可用时段"""
+    try:
+        if not await scheduling.delete_unavailable_period(db_conn, period_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="不可用时段未找到",
+            )
+        return {"message": "不可用时段已删除", "period_id": period_id}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"获取会话统计失败: {str(e)}"
+            detail=f"删除不可用时段失败: {str(e)}"
         )
 
 @router.get(
-    "",
-    response_model=List[SessionRead],
-    summary="获取我的会话",
-    description="获取当前用户的所有会话",
+    "/{session_id}",
+    response_model=SessionRead,
+    summary="获取会话详情",
+    description="获取指定会话的详细信息",
 )
-async def get_my_sessions(
-    role: Optional[str] = Query(None, description="角色筛选（student/mentor）"),
-    limit: int = Query(20, ge=1, le=100, description="返回数量"),
+async def get_session_detail(
+    session_id: UUID,
     db_conn=Depends(get_database),
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    """获取我的会话"""
+    """获取会话详情"""
     try:
-        sessions = await session.get_by_user(db_conn, current_user.id, limit)
-        return sessions
+        session_result = await session.get_by_id(db_conn, session_id)
+        if not session_result:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="会话未找到或您没有权限查看",
+            )
+        return session_result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"获取会话列表失败: {str(e)}"
+            detail=f"获取会话详情失败: {str(e)}"
         )
 
 @router.put(
@@ -232,7 +297,11 @@ async def update_session(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="会话未找到或您没有权限修改",
             )
+        # 改期前后的周都可能受影响
+        scheduling.invalidate_mentor_weeks(session_result["mentor_id"])
         return session_result
+    except session.SessionOverlapError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="该时段导师已有预约，请选择其他时间")
     except HTTPException:
         raise
     except Exception as e:
@@ -328,6 +397,9 @@ async def cancel_session(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="取消会话失败，请检查会话状态",
             )
+        scheduling.invalidate_mentor_weeks(
+            session_result["mentor_id"], session_result["scheduled_at"], session_result["ends_at"]
+        )
         return {"message": "会话已取消", "session_id": session_id}
     except HTTPException:
         raise
@@ -405,27 +477,3 @@ async def save_summary(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"保存总结失败: {str(e)}"
         )
-
-@router.get(
-    "/upcoming",
-    response_model=List[SessionRead],
-    summary="获取即将到来的会话",
-    description="获取用户即将进行的会话",
-)
-async def get_upcoming_sessions(
-    role: Optional[str] = Query(None, description="角色筛选（student/mentor）"),
-    limit: int = Query(10, ge=1, le=50, description="返回数量"),
-    db_conn=Depends(get_database),
-    current_user: AuthenticatedUser = Depends(get_current_user)
-):
-    """获取即将到来的会话"""
-    try:
-        # 简化实现：获取所有用户会话（实际应该根据时间筛选即将到来的会话）
-        sessions = await session.get_by_user(db_conn, current_user.id, limit)
-        return sessions
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"获取即将到来的会话失败: {str(e)}"
-        )
-
@@ -2,7 +2,7 @@
 技能中心 - API 路由
 包括技能分类、技能管理和用户技能的API
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from typing import List, Optional
 from uuid import UUID
 from decimal import Decimal
@@ -17,7 +17,8 @@ from apps.schemas.skill import (
     SkillCategory, SkillCategoryCreate, SkillCategoryUpdate,
     Skill, SkillCreate, SkillUpdate,
     UserSkill, UserSkillCreate, UserSkillUpdate,
-    MentorSkill, MentorSkillCreate, MentorSkillUpdate
+    MentorSkill, MentorSkillCreate, MentorSkillUpdate,
+    SkillTaxonomy, UserSkillImportRequest, UserSkillImportResult
 )
 from apps.schemas.common import GeneralResponse, PaginatedResponse
 from apps.api.v1.services import skill as skill_service
@@ -41,6 +42,39 @@ async def list_skill_categories(
     return GeneralResponse(data=categories)
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 是否命中当前 ETag（弱比较）"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+@router.get(
+    "/taxonomy",
+    response_model=GeneralResponse[SkillTaxonomy],
+    summary="获取技能分类快照",
+    description="一次返回完整的分类 → 技能树，支持 ETag / If-None-Match 条件请求"
+)
+async def get_skill_taxonomy(
+    request: Request,
+    db: DatabaseAdapter = Depends(get_database)
+):
+    """
+    获取技能分类快照
+
+    - 响应头携带 **ETag**（内容哈希）
+    - 请求头携带匹配的 **If-None-Match** 时返回 304，无响应体
+    """
+    snapshot = await skill_service.get_skill_taxonomy_snapshot(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
 @router.post(
     "/categories",
     response_model=GeneralResponse[SkillCategory],
@@ -296,6 +330,44 @@ async def create_user_skill(
     return GeneralResponse(data=user_skill)
 
 
+@router.post(
+    "/users/skills/import",
+    response_model=GeneralResponse[UserSkillImportResult],
+    summary="批量导入用户技能",
+    description="以 JSON 或 CSV（Content-Type: text/csv）批量导入用户技能，返回逐行结果"
+)
+async def import_user_skills(
+    request: Request,
+    update_existing: bool = Query(True, description="CSV 导入时已存在的技能是否覆盖"),
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    批量导入用户技能
+
+    - JSON: `{"items": [{"skill_id": ..., "proficiency_level": 3}], "update_existing": true}`
+    - CSV: 表头 `user_id,skill_id,proficiency_level,years_experience`，user_id 可省略
+    - 非管理员只能为自己导入
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("text/csv"):
+        content = (await request.body()).decode("utf-8-sig")
+        entries = skill_service.parse_user_skill_import_csv(content)
+    else:
+        try:
+            payload = UserSkillImportRequest.model_validate(await request.json())
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"导入请求格式错误: {e}"
+            )
+        entries = [(row_no, item, None) for row_no, item in enumerate(payload.items, start=1)]
+        update_existing = payload.update_existing
+
+    result = await skill_service.import_user_skills(db, entries, current_user, update_existing)
+    return GeneralResponse(data=result)
+
+
 @router.put(
     "/users/skills/{user_skill_id}",
     response_model=GeneralResponse[UserSkill],
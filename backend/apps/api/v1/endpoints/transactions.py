@@ -9,6 +9,7 @@ from decimal import Decimal
 
 from apps.api.v1.deps import (
     get_current_user,
+    require_admin_role,
     AuthenticatedUser,
     get_database
 )
@@ -16,10 +17,12 @@ from libs.database.adapters import DatabaseAdapter
 from apps.schemas.transaction import (
     Order, OrderCreate, OrderUpdate,
     UserWallet, UserWalletCreate, UserWalletUpdate,
-    WalletTransaction, WalletTransactionCreate
+    WalletTransaction, WalletTransactionCreate, WalletAudit
 )
+from apps.schemas.user_credit_logs import CreditAwardBatchRequest, CreditAwardResult
 from apps.schemas.common import GeneralResponse, PaginatedResponse
 from apps.api.v1.services import transaction as transaction_service
+from apps.api.v1.services import user_credit_logs as credit_service
 
 router = APIRouter()
 
@@ -250,6 +253,8 @@ async def create_transaction(
     - **description**: 交易描述
     """
     transaction = await transaction_service.create_wallet_transaction(db, transaction_data, current_user.id)
+    if not transaction:
+        raise HTTPException(status_code=400, detail="钱包不存在或余额不足")
     return GeneralResponse(data=transaction)
 
 
@@ -293,10 +298,10 @@ async def pay_order(
 
     - **order_id**: 订单ID
     """
-    success, message = await transaction_service.pay_order(db, order_id, current_user.id)
+    success, message, balance = await transaction_service.pay_order(db, order_id, current_user.id)
     if not success:
         raise HTTPException(status_code=400, detail=message)
-    return GeneralResponse(data={"message": message})
+    return GeneralResponse(data={"message": message, "balance": balance})
 
 
 @router.post(
@@ -318,6 +323,8 @@ async def recharge_wallet(
     - **payment_method**: 支付方式
     """
     transaction = await transaction_service.recharge_wallet(db, amount, payment_method, current_user.id)
+    if not transaction:
+        raise HTTPException(status_code=404, detail="用户钱包不存在")
     return GeneralResponse(data=transaction)
 
 
@@ -340,9 +347,63 @@ async def withdraw_wallet(
     - **account_info**: 账户信息（银行卡号等）
     """
     transaction = await transaction_service.withdraw_wallet(db, amount, account_info, current_user.id)
+    if not transaction:
+        raise HTTPException(status_code=400, detail="钱包不存在或余额不足")
     return GeneralResponse(data=transaction)
 
 
+@router.get(
+    "/wallet/{user_id}/audit",
+    response_model=GeneralResponse[WalletAudit],
+    summary="核对钱包余额",
+    description="管理员按最近的余额检查点重放之后的流水，核对用户钱包余额"
+)
+async def audit_wallet(
+    user_id: UUID,
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: AuthenticatedUser = Depends(require_admin_role())
+):
+    """
+    核对钱包余额
+
+    - **user_id**: 用户ID
+
+    difference 为 0 表示余额与流水一致。
+    """
+    audit = await transaction_service.audit_wallet(db, user_id)
+    if not audit:
+        raise HTTPException(status_code=404, detail="钱包不存在")
+    return GeneralResponse(data=audit)
+
+
+# ============ 积分发放 ============
+
+@router.post(
+    "/credits/awards/batch",
+    response_model=GeneralResponse[List[CreditAwardResult]],
+    summary="批量发放积分",
+    description="管理员为多个用户发放积分（活动奖励），一次调用完成"
+)
+async def award_credits_batch(
+    request: CreditAwardBatchRequest,
+    db: DatabaseAdapter = Depends(get_database),
+    current_user: AuthenticatedUser = Depends(require_admin_role())
+):
+    """
+    批量发放积分
+
+    - **point_type**: 积分池（mentor_points / learning_points / reputation_points）
+    - **items**: 发放明细（最多 5000 条，同一用户多条会合并）
+    - **description**: 发放说明
+    - **campaign_id**: 活动ID（可选，指定后同一活动对同一用户只发放一次，可安全重试）
+    - **expires_at**: 积分过期时间（可选）
+
+    返回每个用户的结果：awarded / duplicate（已领取过该活动）/ user_not_found。
+    """
+    results = await credit_service.award_credits_batch(db, request)
+    return GeneralResponse(data=results)
+
+
 # ============ 财务统计 ============
 
 @router.get(
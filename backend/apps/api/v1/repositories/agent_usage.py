@@ -0,0 +1,25 @@
+"""
+智能体用量仓库层
+提供智能体调用用量事件的批量写入
+"""
+from typing import List
+
+from libs.database.adapters import DatabaseAdapter
+
+
+AGENT_USAGE_EVENT_COLUMNS = [
+    "user_id", "agent_type", "model", "session_id",
+    "prompt_tokens", "completion_tokens", "credits", "created_at",
+]
+
+
+async def insert_usage_events(db: DatabaseAdapter, records: List[tuple]) -> int:
+    """通过 COPY 批量写入用量事件
+
+    Args:
+        records: 按 AGENT_USAGE_EVENT_COLUMNS 顺序排列的元组列表
+    """
+    if not records:
+        return 0
+    await db.copy_records_to_table("agent_usage_events", records, AGENT_USAGE_EVENT_COLUMNS)
+    return len(records)
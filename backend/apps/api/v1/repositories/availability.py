@@ -0,0 +1,111 @@
+"""
+导师可用时间相关的数据访问操作
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from apps.schemas.session import UnavailablePeriodCreate, WeeklyAvailability
+from libs.database.adapters import DatabaseAdapter
+
+
+async def get_weekly_availability(db: DatabaseAdapter, user_id: UUID) -> List[Dict]:
+    """获取用户的每周可用时间"""
+    query = """
+        SELECT day_of_week, start_time, end_time
+        FROM user_availability
+        WHERE user_id = $1
+        ORDER BY day_of_week
+    """
+    return await db.fetch_all(query, user_id)
+
+
+async def replace_weekly_availability(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    items: List[WeeklyAvailability]
+) -> List[Dict]:
+    """以给定列表整体替换用户的每周可用时间（单条语句）"""
+    query = """
+        WITH removed AS (
+            DELETE FROM user_availability
+            WHERE user_id = $1 AND day_of_week <> ALL($2::int[])
+        )
+        INSERT INTO user_availability (user_id, day_of_week, start_time, end_time)
+        SELECT $1, t.day_of_week, t.start_time, t.end_time
+        FROM unnest($2::int[], $3::time[], $4::time[]) AS t(day_of_week, start_time, end_time)
+        ON CONFLICT (user_id, day_of_week) DO UPDATE
+        SET start_time = EXCLUDED.start_time, end_time = EXCLUDED.end_time, updated_at = NOW()
+        RETURNING day_of_week, start_time, end_time
+    """
+    rows = await db.fetch_all(
+        query, user_id,
+        [item.day_of_week for item in items],
+        [item.start_time for item in items],
+        [item.end_time for item in items]
+    )
+    return sorted(rows, key=lambda row: row["day_of_week"])
+
+
+async def get_unavailable_periods(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    start: datetime,
+    end: datetime
+) -> List[Dict]:
+    """获取与 [start, end) 重叠的不可用时段"""
+    query = """
+        SELECT id, user_id, start_datetime, end_datetime, reason, created_at, updated_at
+        FROM unavailable_periods
+        WHERE user_id = $1 AND start_datetime < $3 AND end_datetime > $2
+        ORDER BY start_datetime
+    """
+    return await db.fetch_all(query, user_id, start, end)
+
+
+async def create_unavailable_period(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    period_in: UnavailablePeriodCreate
+) -> Optional[Dict]:
+    """创建不可用时段"""
+    query = """
+        INSERT INTO unavailable_periods (user_id, start_datetime, end_datetime, reason)
+        VALUES ($1, $2, $3, $4)
+        RETURNING id, user_id, start_datetime, end_datetime, reason, created_at, updated_at
+    """
+    return await db.fetch_one(
+        query, user_id, period_in.start_datetime, period_in.end_datetime, period_in.reason
+    )
+
+
+async def delete_unavailable_period(
+    db: DatabaseAdapter,
+    period_id: UUID,
+    user_id: UUID
+) -> Optional[Dict]:
+    """删除用户自己的不可用时段，返回被删除的时段"""
+    query = """
+        DELETE FROM unavailable_periods
+        WHERE id = $1 AND user_id = $2
+        RETURNING id, user_id, start_datetime, end_datetime, reason, created_at, updated_at
+    """
+    return await db.fetch_one(query, period_id, user_id)
+
+
+async def get_booked_ranges(
+    db: DatabaseAdapter,
+    mentor_id: UUID,
+    start: datetime,
+    end: datetime
+) -> List[Dict]:
+    """获取导师在 [start, end) 内占用的会话时间（与排他约束同一表达式，走其 GiST 索引）"""
+    query = """
+        SELECT scheduled_at, ends_at
+        FROM sessions
+        WHERE mentor_id = $1
+          AND status <> 'cancelled'
+          AND tstzrange(scheduled_at, ends_at, '[)') && tstzrange($2, $3, '[)')
+        ORDER BY scheduled_at
+    """
+    return await db.fetch_all(query, mentor_id, start, end)
@@ -15,25 +15,86 @@ from apps.schemas.message import MessageCreate as LegacyMessageCreate, MessageUp
 from libs.database.adapters import DatabaseAdapter
 
 
+# ============ 已读游标 ============
+
+# 未读数最多统计到该值，避免长期未读的大群聊拖慢收件箱查询
+UNREAD_COUNT_CAP = 999
+
+
+def _read_cursor_sql(alias: str) -> str:
+    """参与者已读游标位置；消息按 (created_at, id) 排序，位于游标及之前的视为已读"""
+    return (
+        f"(COALESCE({alias}.last_read_at, '-infinity'::timestamptz), "
+        f"COALESCE({alias}.last_read_message_id, 'ffffffff-ffff-ffff-ffff-ffffffffffff'::uuid))"
+    )
+
+
+def _unread_count_sql(alias: str) -> str:
+    """参与者（含 conversation_id、user_id 与游标列）的未读数：他人发送且位于游标之后的消息"""
+    return f"""(
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM messages um
+            WHERE um.conversation_id = {alias}.conversation_id
+              AND um.sender_id <> {alias}.user_id
+              AND (um.created_at, um.id) > {_read_cursor_sql(alias)}
+            LIMIT {UNREAD_COUNT_CAP}
+        ) unread
+    )"""
+
+
+# 对话列表中最后一条消息的预览长度
+LAST_MESSAGE_PREVIEW_LENGTH = 200
+
+# 当前参与者（别名 cp）视角下消息 m 是否已读
+_MESSAGE_IS_READ_SQL = f"(m.sender_id = cp.user_id OR (m.created_at, m.id) <= {_read_cursor_sql('cp')}) AS is_read"
+
+
+# ============ 变更日志 ============
+
+def _log_change_sql(change_type: str, source: str, entity_column: str) -> str:
+    """写入变更日志的 CTE 片段
+
+    要求同一语句中已有名为 conversation 的 CTE：递增 conversations.change_seq 并 RETURNING id, change_seq；
+    递增会持有对话行锁，因此同一对话内的序号连续且按提交顺序可见。
+    """
+    return f"""
+        logged AS (
+            INSERT INTO conversation_changes (conversation_id, seq, change_type, entity_id)
+            SELECT c.id, c.change_seq, '{change_type}', s.{entity_column}
+            FROM {source} s
+            JOIN conversation c ON c.id = s.conversation_id
+        )"""
+
+
 # ============ 对话仓库操作 ============
 
-async def get_conversations_by_user(db: DatabaseAdapter, user_id: UUID) -> List[Conversation]:
-    """获取用户参与的对话列表"""
-    query = """
-        SELECT c.id, c.title, c.description, c.conversation_type, c.last_message_id, c.created_at, c.updated_at
-        FROM conversations c
-        JOIN conversation_participants cp ON c.id = cp.conversation_id
+async def get_conversations_by_user(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[Conversation]:
+    """获取用户参与的对话列表（按最后活动时间倒序，含已读游标与未读数，单条查询）"""
+    query = f"""
+        SELECT c.id, c.title, c.description, c.conversation_type, c.last_message_id,
+               c.last_message_preview, c.last_message_at, c.created_at, c.updated_at,
+               cp.last_read_message_id, {_unread_count_sql('cp')} AS unread_count
+        FROM conversation_participants cp
+        JOIN conversations c ON c.id = cp.conversation_id
         WHERE cp.user_id = $1
-        ORDER BY c.updated_at DESC
+        ORDER BY cp.last_activity_at DESC, cp.conversation_id DESC
+        LIMIT $2 OFFSET $3
     """
-    rows = await db.fetch_all(query, user_id)
+    rows = await db.fetch_all(query, user_id, limit, offset)
     return [Conversation(**row) for row in rows]
 
 
 async def get_conversation_by_id(db: DatabaseAdapter, conversation_id: UUID, user_id: UUID) -> Optional[Conversation]:
     """获取对话详情"""
-    query = """
-        SELECT c.id, c.title, c.description, c.conversation_type, c.last_message_id, c.created_at, c.updated_at
+    query = f"""
+        SELECT c.id, c.title, c.description, c.conversation_type, c.last_message_id,
+               c.last_message_preview, c.last_message_at, c.change_seq, c.created_at, c.updated_at,
+               cp.last_read_message_id, {_unread_count_sql('cp')} AS unread_count
         FROM conversations c
         JOIN conversation_participants cp ON c.id = cp.conversation_id
         WHERE c.id = $1 AND cp.user_id = $2
@@ -101,11 +162,7 @@ async def create_conversation(db: DatabaseAdapter, conversation_data: Conversati
 
 
 async def update_conversation(db: DatabaseAdapter, conversation_id: UUID, user_id: UUID, conversation_data: ConversationUpdate) -> Optional[Conversation]:
-    """更新对话"""
-    # 验证用户是否为对话参与者
-    if not await is_conversation_participant(db, conversation_id, user_id):
-        return None
-
+    """更新对话（非参与者时不更新，返回 None）"""
     # 构建动态更新语句
     set_parts = []
     values = []
@@ -125,71 +182,63 @@ async def update_conversation(db: DatabaseAdapter, conversation_id: UUID, user_i
         set_parts.append(f"conversation_type = ${param_num}")
         values.append(conversation_data.conversation_type)
 
-    # 如果没有要更新的字段，只更新时间戳
-    if not set_parts:
-        query = """
-            UPDATE conversations
-            SET updated_at = NOW()
-            WHERE id = $1
-            RETURNING id, title, description, conversation_type, last_message_id, created_at, updated_at
-        """
-        values = [conversation_id]
-    else:
-        set_parts.append("updated_at = NOW()")
-        param_num = len(values) + 1
-        query = f"""
-            UPDATE conversations
-            SET {', '.join(set_parts)}
-            WHERE id = ${param_num}
-            RETURNING id, title, description, conversation_type, last_message_id, created_at, updated_at
-        """
-        values.append(conversation_id)
+    # 始终更新时间戳；参与者校验并入同一条语句
+    set_parts.append("updated_at = NOW()")
+    values.extend([conversation_id, user_id])
+    query = f"""
+        UPDATE conversations
+        SET {', '.join(set_parts)}
+        WHERE id = ${len(values) - 1}
+          AND EXISTS (
+              SELECT 1 FROM conversation_participants
+              WHERE conversation_id = ${len(values) - 1} AND user_id = ${len(values)}
+          )
+        RETURNING id, title, description, conversation_type, last_message_id,
+                  last_message_preview, last_message_at, change_seq, created_at, updated_at
+    """
 
     row = await db.fetch_one(query, *values)
     return Conversation(**row) if row else None
 
 
 async def delete_conversation(db: DatabaseAdapter, conversation_id: UUID, user_id: UUID) -> bool:
-    """删除对话"""
-    # 验证用户是否为对话参与者
-    if not await is_conversation_participant(db, conversation_id, user_id):
-        return False
-
+    """删除对话（仅参与者可删除）"""
     # 硬删除对话 - 删除对话记录
     query = """
         DELETE FROM conversations
         WHERE id = $1
+          AND EXISTS (
+              SELECT 1 FROM conversation_participants
+              WHERE conversation_id = $1 AND user_id = $2
+          )
     """
-    result = await db.execute(query, conversation_id)
+    result = await db.execute(query, conversation_id, user_id)
     return result == "DELETE 1"
 
-    return True
-
 
 # ============ 消息仓库操作 ============
 
 async def get_messages_by_conversation(db: DatabaseAdapter, conversation_id: UUID, user_id: UUID, page: int = 1, page_size: int = 50) -> List[Message]:
-    """获取对话的消息列表"""
-    # 验证用户是否为对话参与者
-    if not await is_conversation_participant(db, conversation_id, user_id):
-        return []
-
+    """获取对话的消息列表（非参与者时 JOIN 为空，返回空列表）"""
     offset = (page - 1) * page_size
-    query = """
-        SELECT id, conversation_id, sender_id, content, is_read, created_at, updated_at
-        FROM messages
-        WHERE conversation_id = $1
-        ORDER BY created_at DESC
-        LIMIT $2 OFFSET $3
+    query = f"""
+        SELECT m.id, m.conversation_id, m.sender_id, m.content, m.created_at, m.updated_at,
+               {_MESSAGE_IS_READ_SQL}
+        FROM messages m
+        JOIN conversation_participants cp ON cp.conversation_id = m.conversation_id AND cp.user_id = $2
+        WHERE m.conversation_id = $1
+        ORDER BY m.created_at DESC
+        LIMIT $3 OFFSET $4
     """
-    rows = await db.fetch_all(query, conversation_id, page_size, offset)
+    rows = await db.fetch_all(query, conversation_id, user_id, page_size, offset)
     return [Message(**row) for row in rows]
 
 
 async def get_message_by_id(db: DatabaseAdapter, message_id: UUID, user_id: UUID) -> Optional[Message]:
     """根据ID获取消息"""
-    query = """
-        SELECT m.id, m.conversation_id, m.sender_id, m.content, m.is_read, m.created_at, m.updated_at
+    query = f"""
+        SELECT m.id, m.conversation_id, m.sender_id, m.content, m.created_at, m.updated_at,
+               {_MESSAGE_IS_READ_SQL}
         FROM messages m
         JOIN conversation_participants cp ON m.conversation_id = cp.conversation_id
         WHERE m.id = $1 AND cp.user_id = $2
@@ -199,53 +248,186 @@ async def get_message_by_id(db: DatabaseAdapter, message_id: UUID, user_id: UUID
 
 
 async def create_message(db: DatabaseAdapter, conversation_id: UUID, message_data: MessageCreate, sender_id: UUID) -> Optional[Message]:
-    """创建消息"""
-    # 验证发送者是否为对话参与者
-    if not await is_conversation_participant(db, conversation_id, sender_id):
-        return None
-
-    query = """
-        INSERT INTO messages (conversation_id, sender_id, content)
-        VALUES ($1, $2, $3)
-        RETURNING id, conversation_id, sender_id, content, is_read, created_at, updated_at
+    """创建消息（发送者不是对话参与者时不插入，返回 None）"""
+    # 插入消息的同时更新对话的最后一条消息、变更序号与各参与者的收件箱排序时间；
+    # 并发发送时只允许更晚的消息覆盖最后一条消息
+    newer = "(c.last_message_at IS NULL OR c.last_message_at <= i.created_at)"
+    query = f"""
+        WITH inserted AS (
+            INSERT INTO messages (conversation_id, sender_id, content)
+            SELECT $1, $2, $3
+            WHERE EXISTS (
+                SELECT 1 FROM conversation_participants
+                WHERE conversation_id = $1 AND user_id = $2
+            )
+            RETURNING id, conversation_id, sender_id, content, is_read, created_at, updated_at
+        ),
+        conversation AS (
+            UPDATE conversations c
+            SET change_seq = c.change_seq + 1,
+                last_message_id = CASE WHEN {newer} THEN i.id ELSE c.last_message_id END,
+                last_message_preview = CASE WHEN {newer} THEN LEFT(i.content, $4) ELSE c.last_message_preview END,
+                last_message_at = CASE WHEN {newer} THEN i.created_at ELSE c.last_message_at END,
+                updated_at = NOW()
+            FROM inserted i
+            WHERE c.id = i.conversation_id
+            RETURNING c.id, c.change_seq
+        ),
+        {_log_change_sql('message.created', 'inserted', 'id')},
+        inbox AS (
+            UPDATE conversation_participants cp
+            SET last_activity_at = GREATEST(cp.last_activity_at, i.created_at)
+            FROM inserted i
+            WHERE cp.conversation_id = i.conversation_id
+        )
+        SELECT * FROM inserted
     """
     values = (
         conversation_id,
         sender_id,
-        message_data.content
+        message_data.content,
+        LAST_MESSAGE_PREVIEW_LENGTH
     )
     row = await db.fetch_one(query, *values)
-    if row:
-        # 更新对话的最后活动时间
-        await update_conversation_timestamp(db, conversation_id)
-        return Message(**row)
-    return None
+    return Message(**row) if row else None
 
 
 async def update_message(db: DatabaseAdapter, message_id: UUID, sender_id: UUID, update_data: MessageUpdate) -> Optional[Message]:
-    """更新消息"""
-    query = """
-        UPDATE messages
-        SET content = $1, updated_at = NOW()
-        WHERE id = $2 AND sender_id = $3
-        RETURNING id, conversation_id, sender_id, content, is_read, created_at, updated_at
+    """更新消息（若为对话最后一条消息，同时刷新预览）"""
+    query = f"""
+        WITH updated AS (
+            UPDATE messages
+            SET content = $1, updated_at = NOW()
+            WHERE id = $2 AND sender_id = $3
+            RETURNING id, conversation_id, sender_id, content, is_read, created_at, updated_at
+        ),
+        conversation AS (
+            UPDATE conversations c
+            SET change_seq = c.change_seq + 1,
+                last_message_preview = CASE
+                    WHEN c.last_message_id = u.id THEN LEFT(u.content, $4)
+                    ELSE c.last_message_preview
+                END
+            FROM updated u
+            WHERE c.id = u.conversation_id
+            RETURNING c.id, c.change_seq
+        ),
+        {_log_change_sql('message.updated', 'updated', 'id')}
+        SELECT * FROM updated
     """
-    row = await db.fetch_one(query, update_data.content, message_id, sender_id)
+    row = await db.fetch_one(query, update_data.content, message_id, sender_id, LAST_MESSAGE_PREVIEW_LENGTH)
     return Message(**row) if row else None
 
 
 async def delete_message(db: DatabaseAdapter, message_id: UUID, sender_id: UUID) -> bool:
-    """删除消息"""
+    """删除消息（若为对话最后一条消息，回退到前一条）"""
+    is_last = "c.last_message_id = d.id"
+    query = f"""
+        WITH deleted AS (
+            DELETE FROM messages
+            WHERE id = $1 AND sender_id = $2
+            RETURNING id, conversation_id
+        ),
+        previous AS (
+            SELECT m.id, m.content, m.created_at
+            FROM messages m, deleted d
+            WHERE m.conversation_id = d.conversation_id AND m.id <> d.id
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT 1
+        ),
+        conversation AS (
+            UPDATE conversations c
+            SET change_seq = c.change_seq + 1,
+                last_message_id = CASE WHEN {is_last} THEN p.id ELSE c.last_message_id END,
+                last_message_preview = CASE WHEN {is_last} THEN LEFT(p.content, $3) ELSE c.last_message_preview END,
+                last_message_at = CASE WHEN {is_last} THEN p.created_at ELSE c.last_message_at END
+            FROM deleted d
+            LEFT JOIN previous p ON TRUE
+            WHERE c.id = d.conversation_id
+            RETURNING c.id, c.change_seq
+        ),
+        {_log_change_sql('message.deleted', 'deleted', 'id')}
+        SELECT COUNT(*) FROM deleted
+    """
+    deleted = await db.fetch_value(query, message_id, sender_id, LAST_MESSAGE_PREVIEW_LENGTH)
+    return deleted == 1
+
+
+async def get_conversation_changes(
+    db: DatabaseAdapter,
+    conversation_id: UUID,
+    user_id: UUID,
+    since: int,
+    limit: int
+) -> List[dict]:
+    """获取对话中序号大于 since 的变更，消息类变更附带消息当前内容（单条语句）
+
+    Returns:
+        非参与者返回空列表；参与者至少返回一行，head_seq 为对话当前序号，
+        无变更时该行的 seq 为 NULL
+    """
+    query = f"""
+        WITH cp AS (
+            SELECT c.change_seq AS head_seq, p.user_id, p.last_read_at, p.last_read_message_id
+            FROM conversations c
+            JOIN conversation_participants p ON p.conversation_id = c.id AND p.user_id = $2
+            WHERE c.id = $1
+        ),
+        changes AS (
+            SELECT seq, change_type, entity_id
+            FROM conversation_changes
+            WHERE conversation_id = $1 AND seq > $3
+            ORDER BY seq
+            LIMIT $4
+        )
+        SELECT cp.head_seq, ch.seq, ch.change_type, ch.entity_id,
+               m.id, m.conversation_id, m.sender_id, m.content, m.created_at, m.updated_at,
+               {_MESSAGE_IS_READ_SQL}
+        FROM cp
+        LEFT JOIN changes ch ON TRUE
+        LEFT JOIN messages m
+            ON m.id = ch.entity_id AND ch.change_type IN ('message.created', 'message.updated')
+        ORDER BY ch.seq
+    """
+    return await db.fetch_all(query, conversation_id, user_id, since, limit)
+
+
+async def prune_conversation_changes(db: DatabaseAdapter, retention_days: int, batch_size: int = 5000) -> int:
+    """删除超过保留期的变更日志（每次最多 batch_size 行），返回删除数量"""
     query = """
-        DELETE FROM messages
-        WHERE id = $1 AND sender_id = $2
+        DELETE FROM conversation_changes
+        WHERE ctid IN (
+            SELECT ctid FROM conversation_changes
+            WHERE created_at < NOW() - make_interval(days => $1)
+            LIMIT $2
+        )
     """
-    result = await db.execute(query, message_id, sender_id)
-    return result == "DELETE 1"
+    result = await db.execute(query, retention_days, batch_size)
+    return int(result.split()[-1]) if result else 0
 
 
 # ============ 参与者仓库操作 ============
 
+async def get_conversation_ids_by_user(db: DatabaseAdapter, user_id: UUID) -> List[UUID]:
+    """获取用户参与的全部对话ID"""
+    query = """
+        SELECT conversation_id FROM conversation_participants
+        WHERE user_id = $1
+    """
+    rows = await db.fetch_all(query, user_id)
+    return [row["conversation_id"] for row in rows]
+
+
+async def get_conversation_member_ids(db: DatabaseAdapter, conversation_id: UUID) -> List[UUID]:
+    """获取对话全部参与者的用户ID"""
+    query = """
+        SELECT user_id FROM conversation_participants
+        WHERE conversation_id = $1
+    """
+    rows = await db.fetch_all(query, conversation_id)
+    return [row["user_id"] for row in rows]
+
+
 async def is_conversation_participant(db: DatabaseAdapter, conversation_id: UUID, user_id: UUID) -> bool:
     """检查用户是否为对话参与者"""
     query = """
@@ -257,11 +439,23 @@ async def is_conversation_participant(db: DatabaseAdapter, conversation_id: UUID
 
 
 async def add_conversation_participant(db: DatabaseAdapter, conversation_id: UUID, participant_data: ConversationParticipantCreate) -> Optional[ConversationParticipant]:
-    """添加对话参与者"""
-    query = """
-        INSERT INTO conversation_participants (conversation_id, user_id)
-        VALUES ($1, $2)
-        RETURNING id, conversation_id, user_id, created_at, updated_at
+    """添加对话参与者（已是参与者时返回 None）"""
+    query = f"""
+        WITH inserted AS (
+            INSERT INTO conversation_participants (conversation_id, user_id)
+            VALUES ($1, $2)
+            ON CONFLICT (conversation_id, user_id) DO NOTHING
+            RETURNING id, conversation_id, user_id, created_at, updated_at
+        ),
+        conversation AS (
+            UPDATE conversations c
+            SET change_seq = c.change_seq + 1
+            FROM inserted i
+            WHERE c.id = i.conversation_id
+            RETURNING c.id, c.change_seq
+        ),
+        {_log_change_sql('participant.added', 'inserted', 'user_id')}
+        SELECT * FROM inserted
     """
     values = (
         conversation_id,
@@ -283,12 +477,24 @@ async def add_conversation_participant(db: DatabaseAdapter, conversation_id: UUI
 
 async def remove_conversation_participant(db: DatabaseAdapter, conversation_id: UUID, user_id: UUID) -> bool:
     """移除对话参与者"""
-    query = """
-        DELETE FROM conversation_participants
-        WHERE conversation_id = $1 AND user_id = $2
+    query = f"""
+        WITH deleted AS (
+            DELETE FROM conversation_participants
+            WHERE conversation_id = $1 AND user_id = $2
+            RETURNING conversation_id, user_id
+        ),
+        conversation AS (
+            UPDATE conversations c
+            SET change_seq = c.change_seq + 1
+            FROM deleted d
+            WHERE c.id = d.conversation_id
+            RETURNING c.id, c.change_seq
+        ),
+        {_log_change_sql('participant.removed', 'deleted', 'user_id')}
+        SELECT COUNT(*) FROM deleted
     """
-    result = await db.execute(query, conversation_id, user_id)
-    return result == "DELETE 1"
+    removed = await db.fetch_value(query, conversation_id, user_id)
+    return removed == 1
 
 
 async def get_conversation_participants(db: DatabaseAdapter, conversation_id: UUID) -> List[ConversationParticipant]:
@@ -309,18 +515,6 @@ async def update_participant_role(db: DatabaseAdapter, conversation_id: UUID, us
     return False
 
 
-# ============ 辅助函数 ============
-
-async def update_conversation_timestamp(db: DatabaseAdapter, conversation_id: UUID) -> None:
-    """更新对话时间戳"""
-    query = """
-        UPDATE conversations
-        SET updated_at = NOW()
-        WHERE id = $1
-    """
-    await db.execute(query, conversation_id)
-
-
 # ============ 兼容性函数（向后兼容） ============
 
 async def get_by_id(db: DatabaseAdapter, message_id: int) -> Optional[dict]:
@@ -361,34 +555,74 @@ async def create(db: DatabaseAdapter, message_in: LegacyMessageCreate) -> Option
     return await db.fetch_one(query, *create_data.values())
 
 
-async def mark_as_read(db: DatabaseAdapter, message_id: UUID, user_id: UUID) -> bool:
-    """标记消息为已读"""
-    # 验证用户是否能访问这条消息（是否为对话参与者）
-    message_query = """
-        SELECT conversation_id FROM messages WHERE id = $1
-    """
-    message_row = await db.fetch_one(message_query, message_id)
-    if not message_row:
-        return False
+async def mark_conversation_read(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    conversation_id: Optional[UUID] = None,
+    message_id: Optional[UUID] = None
+) -> Optional[dict]:
+    """将参与者的已读游标推进到指定消息（单条语句）
 
-    # 验证用户是否为对话参与者
-    if not await is_conversation_participant(db, message_row['conversation_id'], user_id):
-        return False
+    未指定消息时推进到对话最新消息；游标只前进不后退。
+    未指定对话时由消息所属对话确定。
 
-    # 标记消息为已读
-    query = """
-        UPDATE messages
-        SET is_read = true, updated_at = NOW()
-        WHERE id = $1
+    Returns:
+        非参与者返回 None；否则返回 conversation_id、last_read_message_id、last_read_at、
+        unread_count、advanced（游标是否前进）与 target_found（目标消息是否存在于该对话）
     """
-    result = await db.execute(query, message_id)
-    return result == "UPDATE 1"
+    query = f"""
+        WITH participant AS (
+            SELECT cp.id, cp.conversation_id, cp.user_id, cp.last_read_message_id, cp.last_read_at
+            FROM conversation_participants cp
+            WHERE cp.user_id = $1
+              AND cp.conversation_id = COALESCE(
+                  $2::uuid, (SELECT conversation_id FROM messages WHERE id = $3::uuid)
+              )
+        ),
+        target AS (
+            SELECT m.id, m.created_at
+            FROM messages m
+            WHERE m.conversation_id = (SELECT conversation_id FROM participant)
+              AND ($3::uuid IS NULL OR m.id = $3::uuid)
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT 1
+        ),
+        advanced AS (
+            UPDATE conversation_participants cp
+            SET last_read_message_id = t.id, last_read_at = t.created_at, updated_at = NOW()
+            FROM participant p, target t
+            WHERE cp.id = p.id
+              AND (t.created_at, t.id) > {_read_cursor_sql('p')}
+            RETURNING cp.last_read_message_id, cp.last_read_at
+        ),
+        state AS (
+            SELECT p.conversation_id, p.user_id,
+                   COALESCE(a.last_read_message_id, p.last_read_message_id) AS last_read_message_id,
+                   COALESCE(a.last_read_at, p.last_read_at) AS last_read_at,
+                   a.last_read_at IS NOT NULL AS advanced
+            FROM participant p
+            LEFT JOIN advanced a ON TRUE
+        )
+        SELECT s.conversation_id, s.last_read_message_id, s.last_read_at, s.advanced,
+               EXISTS (SELECT 1 FROM target) AS target_found,
+               {_unread_count_sql('s')} AS unread_count
+        FROM state s
+    """
+    row = await db.fetch_one(query, user_id, conversation_id, message_id)
+    return dict(row) if row else None
+
+
+async def mark_as_read(db: DatabaseAdapter, message_id: UUID, user_id: UUID) -> bool:
+    """标记消息为已读（将已读游标推进到该消息）"""
+    state = await mark_conversation_read(db, user_id, message_id=message_id)
+    return bool(state and state["target_found"])
 
 
 async def get_messages_by_user(db: DatabaseAdapter, user_id: UUID, limit: int = 20, offset: int = 0) -> List[Message]:
     """获取用户的消息列表"""
-    query = """
-        SELECT m.id, m.conversation_id, m.sender_id, m.content, m.is_read, m.created_at, m.updated_at
+    query = f"""
+        SELECT m.id, m.conversation_id, m.sender_id, m.content, m.created_at, m.updated_at,
+               {_MESSAGE_IS_READ_SQL}
         FROM messages m
         JOIN conversation_participants cp ON m.conversation_id = cp.conversation_id
         WHERE cp.user_id = $1
@@ -400,24 +634,19 @@ async def get_messages_by_user(db: DatabaseAdapter, user_id: UUID, limit: int =
 
 
 async def get_conversations_by_user_legacy(db: DatabaseAdapter, user_id: UUID, limit: int = 20) -> List[ConversationListItem]:
-    """获取用户的对话列表"""
-    query = """
+    """获取用户的对话列表（最后一条消息取自对话上的冗余字段，未读数在同一条查询中取得）"""
+    query = f"""
         SELECT
             c.id as conversation_id,
-            m.content as last_message,
-            m.created_at as last_message_time,
-            0 as unread_count,
+            c.last_message_preview as last_message,
+            c.last_message_at as last_message_time,
+            cp.last_read_message_id,
+            {_unread_count_sql('cp')} as unread_count,
             c.created_at as created_at
-        FROM conversations c
-        JOIN conversation_participants cp ON c.id = cp.conversation_id
-        LEFT JOIN messages m ON c.id = m.conversation_id
-            AND m.created_at = (
-                SELECT MAX(created_at) FROM messages
-                WHERE conversation_id = c.id
-            )
+        FROM conversation_participants cp
+        JOIN conversations c ON c.id = cp.conversation_id
         WHERE cp.user_id = $1
-        GROUP BY c.id, m.content, m.created_at, c.created_at
-        ORDER BY COALESCE(m.created_at, c.created_at) DESC
+        ORDER BY cp.last_activity_at DESC, cp.conversation_id DESC
         LIMIT $2
     """
     rows = await db.fetch_all(query, user_id, limit)
@@ -2,7 +2,7 @@
 论坛中心 - 仓库层
 提供帖子和评论的数据库操作
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
 from uuid import UUID
 
 from apps.schemas.forum import (
@@ -21,9 +21,13 @@ async def get_posts(
     tag: Optional[str] = None,
     author_id: Optional[UUID] = None,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    sort: str = "latest"
 ) -> List[Post]:
-    """获取帖子列表"""
+    """获取帖子列表
+
+    sort: latest 按发布时间倒序；hot 按预计算的 hot_score 倒序
+    """
     where_conditions = []
     params = []
 
@@ -42,10 +46,10 @@ async def get_posts(
     where_clause = " AND ".join(where_conditions) if where_conditions else ""
 
     query = f"""
-        SELECT id, author_id, title, content, category, tags, views_count, created_at, updated_at
+        SELECT id, author_id, title, content, category, tags, views_count, like_count, created_at, updated_at
         FROM forum_posts
         {"WHERE " + where_clause if where_clause else ""}
-        ORDER BY created_at DESC
+        ORDER BY {"hot_score DESC, id DESC" if sort == "hot" else "created_at DESC"}
         LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
     """
     params.extend([limit, offset])
@@ -57,7 +61,7 @@ async def get_posts(
 async def get_post_by_id(db: DatabaseAdapter, post_id: UUID) -> Optional[Post]:
     """根据ID获取帖子"""
     query = """
-        SELECT id, author_id, title, content, category, tags, views_count, created_at, updated_at
+        SELECT id, author_id, title, content, category, tags, views_count, like_count, created_at, updated_at
         FROM forum_posts
         WHERE id = $1
     """
@@ -72,9 +76,9 @@ async def create_post(
 ) -> Optional[Post]:
     """创建帖子"""
     query = """
-        INSERT INTO forum_posts (author_id, title, content, category, tags)
-        VALUES ($1, $2, $3, $4, $5)
-        RETURNING id, author_id, title, content, category, tags, views_count, created_at, updated_at
+        INSERT INTO forum_posts (author_id, title, content, category, tags, hot_score)
+        VALUES ($1, $2, $3, $4, $5, forum_hot_score(0, NOW()))
+        RETURNING id, author_id, title, content, category, tags, views_count, like_count, created_at, updated_at
     """
     values = (
         author_id,
@@ -128,7 +132,7 @@ async def update_post(
         UPDATE forum_posts
         SET {', '.join(set_parts)}
         WHERE id = ${param_index} AND author_id = ${param_index + 1}
-        RETURNING id, author_id, title, content, category, tags, views_count, created_at, updated_at
+        RETURNING id, author_id, title, content, category, tags, views_count, like_count, created_at, updated_at
     """
     values.extend([post_id, author_id])
 
@@ -149,7 +153,7 @@ async def delete_post(db: DatabaseAdapter, post_id: UUID, author_id: UUID) -> bo
 async def get_posts_by_author(db: DatabaseAdapter, author_id: UUID) -> List[Post]:
     """获取作者的帖子列表"""
     query = """
-        SELECT id, author_id, title, content, category, tags, views_count, created_at, updated_at
+        SELECT id, author_id, title, content, category, tags, views_count, like_count, created_at, updated_at
         FROM forum_posts
         WHERE author_id = $1
         ORDER BY created_at DESC
@@ -192,6 +196,112 @@ async def count_posts(
     return row["count"] if row else 0
 
 
+async def search_posts(
+    db: DatabaseAdapter,
+    tsquery: str,
+    category: Optional[str] = None,
+    limit: int = 20,
+    after_rank: Optional[float] = None,
+    after_id: Optional[UUID] = None
+) -> List[Dict[str, Any]]:
+    """全文搜索帖子，按相关度降序、ID 降序做游标分页
+
+    Args:
+        tsquery: to_tsquery('simple', ...) 可解析的查询串
+        after_rank/after_id: 上一页最后一条的得分与ID
+    """
+    params: List[Any] = [tsquery]
+    conditions = ["fp.search_vector @@ q.query"]
+
+    if category:
+        params.append(category)
+        conditions.append(f"fp.category = ${len(params)}")
+
+    keyset = ""
+    if after_rank is not None and after_id is not None:
+        params.extend([after_rank, after_id])
+        keyset = f"WHERE (s.rank, s.id) < (${len(params) - 1}::real, ${len(params)}::uuid)"
+
+    params.append(limit)
+    query = f"""
+        SELECT s.* FROM (
+            SELECT fp.id, fp.author_id, fp.title, fp.content, fp.category, fp.tags,
+                   fp.views_count, fp.like_count, fp.created_at, fp.updated_at,
+                   ts_rank(fp.search_vector, q.query) AS rank
+            FROM forum_posts fp, to_tsquery('simple', $1) AS q(query)
+            WHERE {" AND ".join(conditions)}
+        ) s
+        {keyset}
+        ORDER BY s.rank DESC, s.id DESC
+        LIMIT ${len(params)}
+    """
+    return await db.fetch_all(query, *params)
+
+
+# 热度权重：点赞、回复、浏览
+HOT_SCORE_LIKE_WEIGHT = 2
+HOT_SCORE_REPLY_WEIGHT = 3
+HOT_SCORE_VIEW_WEIGHT = 0.1
+
+
+async def refresh_hot_scores(db: DatabaseAdapter, batch_size: int = 1000) -> int:
+    """认领一批标记为待重算的帖子，重算 hot_score 并清除标记，返回处理数量
+
+    得分与时间无关、只随互动量变化（见 forum_hot_score），只需重算有新互动的帖子；
+    SKIP LOCKED 使多个 worker 并发运行时互不阻塞，得分取自加锁读到的最新行
+    """
+    query = """
+        WITH dirty AS (
+            SELECT id, like_count, views_count, created_at
+            FROM forum_posts
+            WHERE hot_score_dirty_at IS NOT NULL
+            ORDER BY hot_score_dirty_at
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        ), replies AS (
+            SELECT post_id, COUNT(*) AS reply_count
+            FROM post_replies
+            WHERE post_id IN (SELECT id FROM dirty)
+            GROUP BY post_id
+        ), scores AS (
+            SELECT d.id,
+                   forum_hot_score(
+                       d.like_count * $2::numeric
+                       + COALESCE(r.reply_count, 0) * $3::numeric
+                       + d.views_count * $4::numeric,
+                       d.created_at
+                   ) AS score
+            FROM dirty d
+            LEFT JOIN replies r ON r.post_id = d.id
+        )
+        UPDATE forum_posts fp
+        SET hot_score = s.score, hot_score_dirty_at = NULL
+        FROM scores s
+        WHERE fp.id = s.id
+    """
+    result = await db.execute(
+        query, batch_size,
+        HOT_SCORE_LIKE_WEIGHT, HOT_SCORE_REPLY_WEIGHT, HOT_SCORE_VIEW_WEIGHT
+    )
+    return int(result.split()[-1]) if result else 0
+
+
+async def apply_post_view_increments(db: DatabaseAdapter, increments: Dict[UUID, int]) -> int:
+    """批量累加帖子浏览数并标记待重算热度，返回更新的帖子数量"""
+    if not increments:
+        return 0
+    # 按ID排序，使并发刷写以相同顺序加锁
+    post_ids = sorted(increments)
+    query = """
+        UPDATE forum_posts fp
+        SET views_count = fp.views_count + v.delta, hot_score_dirty_at = NOW()
+        FROM unnest($1::uuid[], $2::int[]) AS v(id, delta)
+        WHERE fp.id = v.id
+    """
+    result = await db.execute(query, post_ids, [increments[post_id] for post_id in post_ids])
+    return int(result.split()[-1]) if result else 0
+
+
 # ============ 评论仓库操作 ============
 
 async def get_post_replies(
@@ -203,14 +313,8 @@ async def get_post_replies(
     """获取帖子的回复列表"""
     query = """
         SELECT pr.id, pr.post_id, pr.author_id, pr.parent_reply_id as parent_id, pr.content, pr.created_at, pr.updated_at,
-               COALESCE(like_counts.like_count, 0) as like_count
+               pr.like_count
         FROM post_replies pr
-        LEFT JOIN (
-            SELECT reply_id, COUNT(*) as like_count
-            FROM likes
-            WHERE reply_id IS NOT NULL
-            GROUP BY reply_id
-        ) like_counts ON pr.id = like_counts.reply_id
         WHERE pr.post_id = $1
         ORDER BY pr.created_at ASC
         LIMIT $2 OFFSET $3
@@ -219,6 +323,37 @@ async def get_post_replies(
     return [Comment(**row) for row in rows]
 
 
+# 回复树的最大递归深度，防止异常数据导致的无限递归
+REPLY_TREE_MAX_DEPTH = 64
+
+
+async def get_reply_tree_rows(db: DatabaseAdapter, post_id: UUID) -> List[Dict[str, Any]]:
+    """递归查询帖子的全部回复，按树的先序（路径）排列"""
+    query = """
+        WITH RECURSIVE tree AS (
+            SELECT pr.id, pr.post_id, pr.author_id, pr.parent_reply_id, pr.content,
+                   pr.like_count, pr.created_at, pr.updated_at,
+                   0 AS depth, ARRAY[pr.created_at] AS sort_path, ARRAY[pr.id] AS id_path
+            FROM post_replies pr
+            WHERE pr.post_id = $1 AND pr.parent_reply_id IS NULL
+            UNION ALL
+            SELECT c.id, c.post_id, c.author_id, c.parent_reply_id, c.content,
+                   c.like_count, c.created_at, c.updated_at,
+                   t.depth + 1, t.sort_path || c.created_at, t.id_path || c.id
+            FROM post_replies c
+            JOIN tree t ON c.parent_reply_id = t.id
+            WHERE t.depth < $2
+        )
+        SELECT t.id, t.post_id, t.author_id, t.parent_reply_id, t.content, t.like_count,
+               t.created_at, t.updated_at, t.depth,
+               u.username AS author_name, u.avatar_url AS author_avatar
+        FROM tree t
+        LEFT JOIN users u ON u.id = t.author_id
+        ORDER BY t.sort_path, t.id_path
+    """
+    return await db.fetch_all(query, post_id, REPLY_TREE_MAX_DEPTH)
+
+
 async def count_post_replies(db: DatabaseAdapter, post_id: UUID) -> int:
     """统计帖子的回复数量"""
     query = """
@@ -236,11 +371,19 @@ async def create_reply(
     reply_data: CommentCreate,
     author_id: UUID
 ) -> Optional[Comment]:
-    """创建回复"""
+    """创建回复，同一语句标记帖子待重算热度"""
     query = """
-        INSERT INTO post_replies (post_id, author_id, parent_reply_id, content)
-        VALUES ($1, $2, $3, $4)
-        RETURNING id, post_id, author_id, parent_reply_id as parent_id, content, created_at, updated_at
+        WITH inserted AS (
+            INSERT INTO post_replies (post_id, author_id, parent_reply_id, content)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id, post_id, author_id, parent_reply_id as parent_id, content, like_count, created_at, updated_at
+        ), touched AS (
+            UPDATE forum_posts fp
+            SET hot_score_dirty_at = NOW()
+            FROM inserted i
+            WHERE fp.id = i.post_id
+        )
+        SELECT * FROM inserted
     """
     values = (
         post_id,
@@ -263,7 +406,7 @@ async def update_reply(
         UPDATE post_replies
         SET content = $1, updated_at = NOW()
         WHERE id = $2 AND author_id = $3
-        RETURNING id, post_id, author_id, parent_reply_id as parent_id, content, created_at, updated_at
+        RETURNING id, post_id, author_id, parent_reply_id as parent_id, content, like_count, created_at, updated_at
     """
     row = await db.fetch_one(query, reply_data.content, reply_id, author_id)
     return Comment(**row) if row else None
@@ -275,18 +418,35 @@ async def delete_reply(
     author_id: UUID
 ) -> bool:
     """删除回复"""
+    return await delete_reply_returning_post(db, reply_id, author_id) is not None
+
+
+async def delete_reply_returning_post(
+    db: DatabaseAdapter,
+    reply_id: UUID,
+    author_id: UUID
+) -> Optional[UUID]:
+    """删除回复并返回所属帖子ID，未删除时返回 None；同一语句标记帖子待重算热度"""
     query = """
-        DELETE FROM post_replies
-        WHERE id = $1 AND author_id = $2
+        WITH deleted AS (
+            DELETE FROM post_replies
+            WHERE id = $1 AND author_id = $2
+            RETURNING post_id
+        ), touched AS (
+            UPDATE forum_posts fp
+            SET hot_score_dirty_at = NOW()
+            FROM deleted d
+            WHERE fp.id = d.post_id
+        )
+        SELECT post_id FROM deleted
     """
-    result = await db.execute(query, reply_id, author_id)
-    return result == "DELETE 1"
+    return await db.fetch_value(query, reply_id, author_id)
 
 
 async def get_comments_by_author(db: DatabaseAdapter, author_id: UUID) -> List[Comment]:
     """获取作者的回复列表"""
     query = """
-        SELECT c.id, c.post_id, c.author_id, c.parent_reply_id as parent_id, c.content, c.created_at, c.updated_at
+        SELECT c.id, c.post_id, c.author_id, c.parent_reply_id as parent_id, c.content, c.like_count, c.created_at, c.updated_at
         FROM post_replies c
         WHERE c.author_id = $1
         ORDER BY c.created_at DESC
@@ -300,66 +460,182 @@ async def get_comments_by_author(db: DatabaseAdapter, author_id: UUID) -> List[C
 # ============ 点赞仓库操作 ============
 
 async def like_post(db: DatabaseAdapter, post_id: UUID, user_id: UUID):
-    """点赞帖子"""
-    # 先检查是否已经点赞
-    check_query = """
-        SELECT id FROM likes
-        WHERE post_id = $1 AND user_id = $2
-    """
-    existing = await db.fetch_one(check_query, post_id, user_id)
+    """点赞帖子（幂等）
 
-    if existing:
-        return existing
-
-    # 创建点赞记录
-    insert_query = """
-        INSERT INTO likes (post_id, user_id)
-        VALUES ($1, $2)
-        RETURNING id, post_id, user_id, created_at
+    单条语句完成：插入点赞（冲突则忽略）、递增帖子点赞数，已点赞时返回原记录；
+    帖子不存在时返回 None
     """
-    like_record = await db.fetch_one(insert_query, post_id, user_id)
-
-    return like_record
+    query = """
+        WITH inserted AS (
+            INSERT INTO likes (post_id, user_id)
+            SELECT $1, $2
+            WHERE EXISTS (SELECT 1 FROM forum_posts WHERE id = $1)
+            ON CONFLICT (user_id, post_id) DO NOTHING
+            RETURNING id, post_id, user_id, created_at
+        ), counted AS (
+            UPDATE forum_posts fp
+            SET like_count = fp.like_count + 1, hot_score_dirty_at = NOW()
+            FROM inserted i
+            WHERE fp.id = i.post_id
+        )
+        SELECT id, post_id, user_id, created_at FROM inserted
+        UNION ALL
+        SELECT id, post_id, user_id, created_at FROM likes
+        WHERE post_id = $1 AND user_id = $2
+          AND NOT EXISTS (SELECT 1 FROM inserted)
+    """
+    row = await db.fetch_one(query, post_id, user_id)
+    if row is None:
+        # 并发点赞在本语句快照之后提交时，冲突行对上面的查询不可见，需重新读取
+        row = await db.fetch_one(
+            "SELECT id, post_id, user_id, created_at FROM likes WHERE post_id = $1 AND user_id = $2",
+            post_id, user_id
+        )
+    return row
 
 
 async def unlike_post(db: DatabaseAdapter, post_id: UUID, user_id: UUID) -> bool:
     """取消点赞帖子"""
     delete_query = """
-        DELETE FROM likes
-        WHERE post_id = $1 AND user_id = $2
+        WITH deleted AS (
+            DELETE FROM likes
+            WHERE post_id = $1 AND user_id = $2
+            RETURNING post_id
+        ), counted AS (
+            UPDATE forum_posts fp
+            SET like_count = GREATEST(fp.like_count - 1, 0), hot_score_dirty_at = NOW()
+            FROM deleted d
+            WHERE fp.id = d.post_id
+        )
+        SELECT COUNT(*) FROM deleted
     """
-    result = await db.execute(delete_query, post_id, user_id)
-    return result == "DELETE 1"
+    deleted = await db.fetch_value(delete_query, post_id, user_id)
+    return deleted == 1
 
 
 async def like_reply(db: DatabaseAdapter, reply_id: UUID, user_id: UUID):
-    """点赞回复"""
-    # 先检查是否已经点赞
-    check_query = """
-        SELECT id FROM likes
+    """点赞回复（幂等），语义同 like_post"""
+    query = """
+        WITH inserted AS (
+            INSERT INTO likes (reply_id, user_id)
+            SELECT $1, $2
+            WHERE EXISTS (SELECT 1 FROM post_replies WHERE id = $1)
+            ON CONFLICT (user_id, reply_id) DO NOTHING
+            RETURNING id, reply_id, user_id, created_at
+        ), counted AS (
+            UPDATE post_replies pr
+            SET like_count = pr.like_count + 1
+            FROM inserted i
+            WHERE pr.id = i.reply_id
+        )
+        SELECT id, reply_id, user_id, created_at FROM inserted
+        UNION ALL
+        SELECT id, reply_id, user_id, created_at FROM likes
         WHERE reply_id = $1 AND user_id = $2
+          AND NOT EXISTS (SELECT 1 FROM inserted)
     """
-    existing = await db.fetch_one(check_query, reply_id, user_id)
+    row = await db.fetch_one(query, reply_id, user_id)
+    if row is None:
+        # 并发点赞在本语句快照之后提交时，冲突行对上面的查询不可见，需重新读取
+        row = await db.fetch_one(
+            "SELECT id, reply_id, user_id, created_at FROM likes WHERE reply_id = $1 AND user_id = $2",
+            reply_id, user_id
+        )
+    return row
 
-    if existing:
-        return existing
 
-    # 创建点赞记录
-    insert_query = """
-        INSERT INTO likes (reply_id, user_id)
-        VALUES ($1, $2)
-        RETURNING id, reply_id, user_id, created_at
+async def unlike_reply(db: DatabaseAdapter, reply_id: UUID, user_id: UUID) -> bool:
+    """取消点赞回复"""
+    delete_query = """
+        WITH deleted AS (
+            DELETE FROM likes
+            WHERE reply_id = $1 AND user_id = $2
+            RETURNING reply_id
+        ), counted AS (
+            UPDATE post_replies pr
+            SET like_count = GREATEST(pr.like_count - 1, 0)
+            FROM deleted d
+            WHERE pr.id = d.reply_id
+        )
+        SELECT COUNT(*) FROM deleted
     """
-    like_record = await db.fetch_one(insert_query, reply_id, user_id)
+    deleted = await db.fetch_value(delete_query, reply_id, user_id)
+    return deleted == 1
 
-    return like_record
 
+# 点赞目标类型 -> (likes 外键列, 计数表, 计数更新时附带的赋值)；帖子点赞数变化时标记待重算热度
+_LIKE_TARGETS = {
+    "post": ("post_id", "forum_posts", ", hot_score_dirty_at = NOW()"),
+    "reply": ("reply_id", "post_replies", ""),
+}
 
-async def unlike_reply(db: DatabaseAdapter, reply_id: UUID, user_id: UUID) -> bool:
-    """取消点赞回复"""
-    delete_query = """
-        DELETE FROM likes
-        WHERE reply_id = $1 AND user_id = $2
+
+async def add_likes(db: DatabaseAdapter, user_id: UUID, target_type: str, target_ids: List[UUID]) -> Set[UUID]:
+    """批量点赞，返回本次新增点赞的目标ID；已点赞或目标不存在的ID被忽略"""
+    if not target_ids:
+        return set()
+    column, table, touch = _LIKE_TARGETS[target_type]
+    query = f"""
+        WITH inserted AS (
+            INSERT INTO likes ({column}, user_id)
+            SELECT t.id, $1
+            FROM {table} t
+            WHERE t.id = ANY($2::uuid[])
+            ON CONFLICT (user_id, {column}) DO NOTHING
+            RETURNING {column} AS target_id
+        ), counted AS (
+            UPDATE {table} t
+            SET like_count = t.like_count + 1{touch}
+            FROM inserted i
+            WHERE t.id = i.target_id
+        )
+        SELECT target_id FROM inserted
+    """
+    rows = await db.fetch_all(query, user_id, target_ids)
+    return {row["target_id"] for row in rows}
+
+
+async def remove_likes(db: DatabaseAdapter, user_id: UUID, target_type: str, target_ids: List[UUID]) -> Set[UUID]:
+    """批量取消点赞，返回本次实际取消的目标ID"""
+    if not target_ids:
+        return set()
+    column, table, touch = _LIKE_TARGETS[target_type]
+    query = f"""
+        WITH deleted AS (
+            DELETE FROM likes
+            WHERE user_id = $1 AND {column} = ANY($2::uuid[])
+            RETURNING {column} AS target_id
+        ), counted AS (
+            UPDATE {table} t
+            SET like_count = GREATEST(t.like_count - 1, 0){touch}
+            FROM deleted d
+            WHERE t.id = d.target_id
+        )
+        SELECT target_id FROM deleted
+    """
+    rows = await db.fetch_all(query, user_id, target_ids)
+    return {row["target_id"] for row in rows}
+
+
+async def get_liked_post_ids(db: DatabaseAdapter, user_id: UUID, post_ids: List[UUID]) -> Set[UUID]:
+    """批量查询用户点赞过的帖子ID"""
+    if not post_ids:
+        return set()
+    query = """
+        SELECT post_id FROM likes
+        WHERE user_id = $1 AND post_id = ANY($2::uuid[])
+    """
+    rows = await db.fetch_all(query, user_id, post_ids)
+    return {row["post_id"] for row in rows}
+
+
+async def get_liked_reply_ids(db: DatabaseAdapter, user_id: UUID, reply_ids: List[UUID]) -> Set[UUID]:
+    """批量查询用户点赞过的回复ID"""
+    if not reply_ids:
+        return set()
+    query = """
+        SELECT reply_id FROM likes
+        WHERE user_id = $1 AND reply_id = ANY($2::uuid[])
     """
-    result = await db.execute(delete_query, reply_id, user_id)
-    return result == "DELETE 1"
\ No newline at end of file
+    rows = await db.fetch_all(query, user_id, reply_ids)
+    return {row["reply_id"] for row in rows}
@@ -2,7 +2,7 @@
 会话相关的数据访问操作
 """
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import datetime, timedelta
 from uuid import UUID
 
 from apps.schemas.session import SessionCreate, SessionUpdate
@@ -10,6 +10,17 @@ from libs.database.adapters import DatabaseAdapter
 
 TABLE_NAME = "sessions"
 
+# sessions_mentor_no_overlap 排他约束冲突
+EXCLUSION_VIOLATION = "23P01"
+
+
+class SessionOverlapError(Exception):
+    """导师在该时间段已有未取消的会话"""
+
+
+def _is_overlap(error: Exception) -> bool:
+    return getattr(error, "sqlstate", None) == EXCLUSION_VIOLATION
+
 async def get_by_id(db: DatabaseAdapter, session_id: UUID) -> Optional[Dict]:
     """根据ID获取会话"""
     query = f"SELECT * FROM {TABLE_NAME} WHERE id = $1"
@@ -25,12 +36,41 @@ async def get_by_user(db: DatabaseAdapter, user_id: UUID, limit: int = 20, offse
     """
     return await db.fetch_many(query, user_id, limit, offset)
 
+async def get_upcoming_by_user(db: DatabaseAdapter, user_id: UUID, limit: int = 10) -> List[Dict]:
+    """获取用户尚未开始的已预约会话，按开始时间排序"""
+    query = f"""
+        SELECT * FROM {TABLE_NAME}
+        WHERE (mentor_id = $1 OR mentee_id = $1)
+          AND status = 'scheduled'
+          AND scheduled_at >= NOW()
+        ORDER BY scheduled_at
+        LIMIT $2
+    """
+    return await db.fetch_many(query, user_id, limit)
+
+async def get_user_statistics(db: DatabaseAdapter, user_id: UUID) -> Dict:
+    """按状态统计用户（导师或学员）的会话数，单条聚合查询"""
+    query = f"""
+        SELECT
+            COUNT(*) AS total_sessions,
+            COUNT(*) FILTER (WHERE status = 'active') AS active_sessions,
+            COUNT(*) FILTER (WHERE status = 'completed') AS completed_sessions,
+            COUNT(*) FILTER (WHERE status = 'cancelled') AS cancelled_sessions
+        FROM {TABLE_NAME}
+        WHERE mentor_id = $1 OR mentee_id = $1
+    """
+    return await db.fetch_one(query, user_id)
+
 async def create(db: DatabaseAdapter, session_in: SessionCreate) -> Optional[Dict]:
-    """创建新会话"""
+    """创建新会话
+
+    与导师已有会话重叠时由排他约束拒绝，抛出 SessionOverlapError（不锁定导师日程）
+    """
     
     # 构建插入数据
     create_data = session_in.model_dump()
     create_data["status"] = "scheduled"
+    create_data["ends_at"] = session_in.scheduled_at + timedelta(minutes=session_in.duration_minutes)
     
     # 动态构建插入语句
     columns = ", ".join(create_data.keys())
@@ -42,10 +82,15 @@ async def create(db: DatabaseAdapter, session_in: SessionCreate) -> Optional[Dic
         RETURNING *
     """
     
-    return await db.fetch_one(query, *create_data.values())
+    try:
+        return await db.fetch_one(query, *create_data.values())
+    except Exception as e:
+        if _is_overlap(e):
+            raise SessionOverlapError() from e
+        raise
 
 async def update(db: DatabaseAdapter, session_id: UUID, session_in: SessionUpdate) -> Optional[Dict]:
-    """更新会话"""
+    """更新会话，改期与导师其他会话重叠时抛出 SessionOverlapError"""
     update_data = session_in.model_dump(exclude_unset=True)
     if not update_data:
         return await get_by_id(db, session_id)
@@ -53,7 +98,13 @@ async def update(db: DatabaseAdapter, session_id: UUID, session_in: SessionUpdat
     update_data["updated_at"] = datetime.now()
 
     # 动态构建更新语句
-    set_clause = ", ".join([f"{key} = ${i+2}" for i, key in enumerate(update_data.keys())])
+    keys = list(update_data.keys())
+    set_clause = ", ".join([f"{key} = ${i+2}" for i, key in enumerate(keys)])
+    if "scheduled_at" in update_data or "duration_minutes" in update_data:
+        # SET 中引用的列为更新前的值，未修改的一侧取原值
+        scheduled = f"${keys.index('scheduled_at') + 2}" if "scheduled_at" in update_data else "scheduled_at"
+        duration = f"${keys.index('duration_minutes') + 2}" if "duration_minutes" in update_data else "duration_minutes"
+        set_clause += f", ends_at = {scheduled} + make_interval(mins => {duration})"
     
     query = f"""
         UPDATE {TABLE_NAME}
@@ -62,7 +113,12 @@ async def update(db: DatabaseAdapter, session_id: UUID, session_in: SessionUpdat
         RETURNING *
     """
     
-    return await db.fetch_one(query, session_id, *update_data.values())
+    try:
+        return await db.fetch_one(query, session_id, *update_data.values())
+    except Exception as e:
+        if _is_overlap(e):
+            raise SessionOverlapError() from e
+        raise
 
 async def delete(db: DatabaseAdapter, session_id: UUID) -> bool:
     """删除会话"""
@@ -222,6 +222,18 @@ async def search_skills(db: DatabaseAdapter, query_str: str, limit: int = 20) ->
     return [Skill(**row) for row in rows]
 
 
+async def get_skill_taxonomy_rows(db: DatabaseAdapter) -> List[Dict[str, Any]]:
+    """一次查询获取完整的分类 → 技能树（扁平行，按分类、技能排序）"""
+    query = """
+        SELECT sc.id as category_id, sc.name as category_name, sc.description as category_description,
+               s.id as skill_id, s.name as skill_name
+        FROM skill_categories sc
+        LEFT JOIN skills s ON s.category_id = sc.id
+        ORDER BY sc.name, sc.id, s.name
+    """
+    return await db.fetch_all(query)
+
+
 # ============ 用户技能仓库操作 ============
 
 async def get_user_skill_by_id(db: DatabaseAdapter, user_skill_id: UUID) -> Optional[UserSkill]:
@@ -270,15 +282,13 @@ async def get_user_skills(db: DatabaseAdapter, user_id: UUID, can_mentor: Option
                s.name as skill_name, s.description as skill_description,
                sc.name as category_name,
                COALESCE(usv.username, '') as verified_by_username,
-               COUNT(use2.id) as endorsement_count
+               us.endorsement_count
         FROM user_skills us
         JOIN users u ON us.user_id = u.id
         LEFT JOIN skills s ON us.skill_id = s.id
         LEFT JOIN skill_categories sc ON s.category_id = sc.id
         LEFT JOIN users usv ON us.verified_by = usv.id
-        LEFT JOIN user_skill_endorsements use2 ON us.id = use2.user_skill_id
         {where_clause}
-        GROUP BY us.id, u.username, u.avatar_url, s.name, s.description, sc.name, usv.username
         ORDER BY us.proficiency_level DESC, us.years_experience DESC
         LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
     """
@@ -354,6 +364,75 @@ async def update_user_skill(db: DatabaseAdapter, user_skill_id: UUID, user_skill
     return UserSkill(**row) if row else None
 
 
+USER_SKILL_IMPORT_COLUMNS = ["row_no", "user_id", "skill_id", "proficiency_level", "years_experience"]
+
+
+async def bulk_import_user_skills(
+    db: DatabaseAdapter,
+    records: List[tuple],
+    update_existing: bool = True
+) -> List[Dict[str, Any]]:
+    """批量导入用户技能
+
+    记录经 COPY 写入临时表，再由一条 INSERT ... SELECT ... ON CONFLICT 合并到 user_skills，
+    返回每行的结果。同一批次内重复的 (user_id, skill_id) 以最后一行为准。
+
+    Args:
+        records: (row_no, user_id, skill_id, proficiency_level, years_experience) 元组列表
+        update_existing: 已存在时是否覆盖熟练度与经验年限
+    """
+    async with db.transaction():
+        await db.execute("""
+            CREATE TEMP TABLE user_skill_import (
+                row_no INT NOT NULL,
+                user_id UUID NOT NULL,
+                skill_id UUID NOT NULL,
+                proficiency_level INT NOT NULL,
+                years_experience INT NOT NULL
+            ) ON COMMIT DROP
+        """)
+        await db.copy_records_to_table("user_skill_import", records, USER_SKILL_IMPORT_COLUMNS)
+
+        query = """
+            WITH latest AS (
+                SELECT DISTINCT ON (i.user_id, i.skill_id) i.*
+                FROM user_skill_import i
+                JOIN users u ON u.id = i.user_id
+                JOIN skills s ON s.id = i.skill_id
+                ORDER BY i.user_id, i.skill_id, i.row_no DESC
+            ), merged AS (
+                INSERT INTO user_skills (
+                    user_id, skill_id, proficiency_level, years_experience, created_at, updated_at
+                )
+                SELECT user_id, skill_id, proficiency_level, years_experience, NOW(), NOW()
+                FROM latest
+                ON CONFLICT (user_id, skill_id) DO UPDATE
+                SET proficiency_level = EXCLUDED.proficiency_level,
+                    years_experience = EXCLUDED.years_experience,
+                    updated_at = NOW()
+                WHERE $1
+                RETURNING id, user_id, skill_id, (xmax = 0) AS inserted
+            )
+            SELECT i.row_no, m.id AS user_skill_id,
+                   CASE
+                       WHEN u.id IS NULL THEN 'user_not_found'
+                       WHEN s.id IS NULL THEN 'skill_not_found'
+                       WHEN l.row_no <> i.row_no THEN 'duplicate'
+                       WHEN m.id IS NULL THEN 'skipped'
+                       WHEN m.inserted THEN 'created'
+                       ELSE 'updated'
+                   END AS status
+            FROM user_skill_import i
+            LEFT JOIN users u ON u.id = i.user_id
+            LEFT JOIN skills s ON s.id = i.skill_id
+            LEFT JOIN latest l ON l.user_id = i.user_id AND l.skill_id = i.skill_id
+            LEFT JOIN merged m ON m.user_id = i.user_id AND m.skill_id = i.skill_id
+                AND l.row_no = i.row_no
+            ORDER BY i.row_no
+        """
+        return await db.fetch_all(query, update_existing)
+
+
 async def delete_user_skill(db: DatabaseAdapter, user_skill_id: UUID) -> bool:
     """删除用户技能"""
     query = "DELETE FROM user_skills WHERE id = $1"
@@ -394,16 +473,13 @@ async def get_skill_mentors(db: DatabaseAdapter, skill_id: UUID, min_proficiency
                u.username, u.avatar_url, u.role,
                s.name as skill_name, s.description as skill_description,
                sc.name as category_name,
-               COUNT(use2.id) as endorsement_count,
-               AVG(use2.rating) as avg_endorsement_rating
+               us.endorsement_count, us.avg_endorsement_rating
         FROM user_skills us
         JOIN users u ON us.user_id = u.id
         LEFT JOIN skills s ON us.skill_id = s.id
         LEFT JOIN skill_categories sc ON s.category_id = sc.id
-        LEFT JOIN user_skill_endorsements use2 ON us.id = use2.user_skill_id
         {where_clause}
-        GROUP BY us.id, u.username, u.avatar_url, u.role, s.name, s.description, sc.name
-        ORDER BY us.proficiency_level DESC, us.years_experience DESC, endorsement_count DESC
+        ORDER BY us.proficiency_level DESC, us.years_experience DESC, us.endorsement_count DESC
         LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
     """
     params.extend([limit, skip])
@@ -500,39 +576,33 @@ async def delete_mentor_skill(db: DatabaseAdapter, mentor_skill_id: UUID, user_i
 # ============ 技能认可仓库操作 ============
 
 async def add_skill_endorsement(db: DatabaseAdapter, user_skill_id: UUID, endorser_id: UUID, rating: Optional[int] = None, comment: Optional[str] = None) -> Optional[SkillEndorsement]:
-    """添加技能认可"""
-    # 检查是否已认可过
-    existing_query = """
-        SELECT id FROM user_skill_endorsements
-        WHERE user_skill_id = $1 AND endorser_id = $2
-    """
-    existing = await db.fetch_one(existing_query, user_skill_id, endorser_id)
-    if existing:
-        return None  # 已认可过
+    """添加技能认可
 
+    插入与统计更新在同一条语句中完成：重复认可由唯一约束拦截（返回 None），
+    统计字段按增量累加，平均分由 rating_sum / rating_count 派生，不再全表重算
+    """
     query = """
-        INSERT INTO user_skill_endorsements (
-            user_skill_id, endorser_id, rating, comment, created_at
+        WITH inserted AS (
+            INSERT INTO user_skill_endorsements (
+                user_skill_id, endorser_id, rating, comment, created_at
+            )
+            VALUES ($1, $2, $3, $4, NOW())
+            ON CONFLICT (user_skill_id, endorser_id) DO NOTHING
+            RETURNING id, user_skill_id, endorser_id, rating, comment, created_at
+        ), updated AS (
+            UPDATE user_skills us
+            SET endorsement_count = us.endorsement_count + 1,
+                rating_sum = us.rating_sum + COALESCE(i.rating, 0),
+                rating_count = us.rating_count + (i.rating IS NOT NULL)::int,
+                updated_at = NOW()
+            FROM inserted i
+            WHERE us.id = i.user_skill_id
         )
-        VALUES ($1, $2, $3, $4, NOW())
-        RETURNING id, user_skill_id, endorser_id, rating, comment, created_at
+        SELECT id, user_skill_id, endorser_id, rating, comment, created_at
+        FROM inserted
     """
     row = await db.fetch_one(query, user_skill_id, endorser_id, rating, comment)
-    if row:
-        endorsement = SkillEndorsement(**row)
-        # 更新用户技能的认可统计
-        await db.execute("""
-            UPDATE user_skills
-            SET endorsement_count = endorsement_count + 1,
-                avg_endorsement_rating = (
-                    SELECT AVG(rating) FROM user_skill_endorsements
-                    WHERE user_skill_id = $1 AND rating IS NOT NULL
-                ),
-                updated_at = NOW()
-            WHERE id = $1
-        """, user_skill_id)
-        return endorsement
-    return None
+    return SkillEndorsement(**row) if row else None
 
 
 async def get_skill_endorsements(db: DatabaseAdapter, user_skill_id: UUID, skip: int = 0, limit: int = 50) -> List[SkillEndorsement]:
@@ -608,7 +678,7 @@ async def search_user_skills(db: DatabaseAdapter, skill_name: Optional[str] = No
                s.name as skill_name, s.description as skill_description,
                sc.name as category_name,
                p.location,
-               COUNT(use2.id) as endorsement_count,
+               us.endorsement_count,
                COALESCE(usv.username, '') as verified_by_username
         FROM user_skills us
         JOIN users u ON us.user_id = u.id
@@ -616,10 +686,8 @@ async def search_user_skills(db: DatabaseAdapter, skill_name: Optional[str] = No
         LEFT JOIN skills s ON us.skill_id = s.id
         LEFT JOIN skill_categories sc ON s.category_id = sc.id
         LEFT JOIN users usv ON us.verified_by = usv.id
-        LEFT JOIN user_skill_endorsements use2 ON us.id = use2.user_skill_id
         {where_clause}
-        GROUP BY us.id, u.username, u.avatar_url, u.role, s.name, s.description, sc.name, p.location, usv.username
-        ORDER BY us.proficiency_level DESC, us.years_experience DESC, endorsement_count DESC
+        ORDER BY us.proficiency_level DESC, us.years_experience DESC, us.endorsement_count DESC
         LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
     """
     params.extend([limit, skip])
@@ -2,7 +2,7 @@
 交易 & 金融 - 仓库层
 提供订单、钱包和交易记录的数据库操作
 """
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 from decimal import Decimal
 
@@ -14,6 +14,42 @@ from apps.schemas.transaction import (
 from libs.database.adapters import DatabaseAdapter
 
 
+# ============ 财务日汇总 ============
+
+_ROLLUP_COLUMNS = (
+    "income", "expense", "orders_created", "orders_completed", "orders_cancelled",
+    "transaction_count", "credit_amount", "debit_amount",
+)
+
+_ROLLUP_DAY_SQL = "(NOW() AT TIME ZONE 'UTC')::date"
+
+
+def _rollup_delta(user_expr: str, from_sql: str, day: str = _ROLLUP_DAY_SQL, **values: str) -> str:
+    """构造一行日汇总增量的 SELECT，默认记入当日（UTC），未指定的列记 0"""
+    columns = ", ".join(f"{values.get(c, '0')} AS {c}" for c in _ROLLUP_COLUMNS)
+    return f"SELECT {user_expr} AS user_id, {day} AS day, {columns} {from_sql}"
+
+
+def _rollup_sql(*deltas: str) -> str:
+    """把增量累加到用户日汇总的 CTE 片段（名为 rollup）
+
+    同一用户同一天的多行增量先合并，避免 ON CONFLICT 在同一语句中重复更新同一行。
+    """
+    columns = ", ".join(_ROLLUP_COLUMNS)
+    sums = ", ".join(f"SUM({c})" for c in _ROLLUP_COLUMNS)
+    updates = ", ".join(f"{c} = r.{c} + EXCLUDED.{c}" for c in _ROLLUP_COLUMNS)
+    source = " UNION ALL ".join(deltas)
+    return f"""
+        rollup AS (
+            INSERT INTO user_financial_daily AS r (user_id, day, {columns})
+            SELECT user_id, day, {sums}
+            FROM ({source}) delta
+            GROUP BY user_id, day
+            ON CONFLICT (user_id, day) DO UPDATE
+            SET {updates}, updated_at = NOW()
+        )"""
+
+
 # ============ 订单仓库操作 ============
 
 async def get_orders_by_user(db: DatabaseAdapter, user_id: UUID) -> List[Order]:
@@ -45,10 +81,14 @@ async def get_order_by_id(
 
 async def create_order(db: DatabaseAdapter, order_data: OrderCreate) -> Optional[Order]:
     """创建订单"""
-    query = """
-        INSERT INTO orders (user_id, service_id, total_price, status)
-        VALUES ($1, $2, $3, $4)
-        RETURNING id, user_id, service_id, total_price as amount, status, created_at, updated_at
+    query = f"""
+        WITH created AS (
+            INSERT INTO orders (user_id, service_id, total_price, status)
+            VALUES ($1, $2, $3, $4)
+            RETURNING id, user_id, service_id, total_price as amount, status, created_at, updated_at
+        ),
+        {_rollup_sql(_rollup_delta("c.user_id", "FROM created c", orders_created="1"))}
+        SELECT * FROM created
     """
     values = (
         order_data.user_id,
@@ -66,31 +106,72 @@ async def update_order(
     user_id: UUID,
     order_data: OrderUpdate
 ) -> Optional[Order]:
-    """更新订单"""
-    # 构建动态更新语句
-    set_parts = []
-    values = []
-    param_index = 1
+    """更新订单
 
-    if order_data.status is not None:
-        set_parts.append(f"status = ${param_index}")
-        values.append(order_data.status.value if hasattr(order_data.status, 'value') else order_data.status)
-        param_index += 1
-
-    if not set_parts:
+    状态离开 completed / cancelled 时，在同一语句中从原状态变更日的汇总中冲回；
+    进入 completed / cancelled 时记入当日汇总，与支付、取消路径口径一致。
+    """
+    if order_data.status is None:
         return await get_order_by_id(db, order_id, user_id)
 
-    set_parts.append("updated_at = NOW()")
-
+    status = order_data.status.value if hasattr(order_data.status, 'value') else order_data.status
+    old_day = "(c.old_changed_at AT TIME ZONE 'UTC')::date"
+    rollup = _rollup_sql(
+        # 冲回原状态
+        _rollup_delta(
+            "c.buyer_id", "FROM changed c WHERE c.old_status = 'completed'",
+            day=old_day, expense="-c.price", orders_completed="-1",
+        ),
+        _rollup_delta(
+            "c.mentor_id", "FROM changed c WHERE c.old_status = 'completed' AND c.mentor_id IS NOT NULL",
+            day=old_day, income="-c.price",
+        ),
+        _rollup_delta(
+            "c.buyer_id", "FROM changed c WHERE c.old_status = 'cancelled'",
+            day=old_day, orders_cancelled="-1",
+        ),
+        # 记入新状态
+        _rollup_delta(
+            "c.buyer_id", "FROM changed c WHERE c.new_status = 'completed'",
+            expense="c.price", orders_completed="1",
+        ),
+        _rollup_delta(
+            "c.mentor_id", "FROM changed c WHERE c.new_status = 'completed' AND c.mentor_id IS NOT NULL",
+            income="c.price",
+        ),
+        _rollup_delta(
+            "c.buyer_id", "FROM changed c WHERE c.new_status = 'cancelled'",
+            orders_cancelled="1",
+        ),
+    )
     query = f"""
-        UPDATE orders
-        SET {', '.join(set_parts)}
-        WHERE id = ${param_index} AND user_id = ${param_index + 1}
-        RETURNING id, user_id, service_id, total_price as amount, status, created_at, updated_at
+        WITH prior AS (
+            SELECT o.id AS order_id, o.user_id AS buyer_id, o.total_price AS price,
+                   o.status AS old_status, o.status_changed_at AS old_changed_at, s.mentor_id
+            FROM orders o
+            LEFT JOIN services s ON s.id = o.service_id
+            WHERE o.id = $2 AND o.user_id = $3
+            FOR UPDATE OF o
+        ),
+        updated AS (
+            UPDATE orders o
+            SET status_changed_at = CASE WHEN o.status IS DISTINCT FROM $1 THEN NOW() ELSE o.status_changed_at END,
+                status = $1,
+                updated_at = NOW()
+            FROM prior p
+            WHERE o.id = p.order_id
+            RETURNING o.id, o.user_id, o.service_id, o.total_price as amount, o.status, o.created_at, o.updated_at
+        ),
+        changed AS (
+            SELECT p.buyer_id, p.mentor_id, p.price, p.old_status, p.old_changed_at, u.status AS new_status
+            FROM prior p
+            JOIN updated u ON u.id = p.order_id
+            WHERE p.old_status IS DISTINCT FROM u.status
+        ),
+        {rollup}
+        SELECT * FROM updated
     """
-    values.extend([order_id, user_id])
-
-    row = await db.fetch_one(query, *values)
+    row = await db.fetch_one(query, status, order_id, user_id)
     return Order(**row) if row else None
 
 
@@ -158,20 +239,66 @@ async def update_wallet_balance_by_id(
 
 # ============ 交易记录仓库操作 ============
 
+_WALLET_TRANSACTION_COLUMNS = (
+    "id, wallet_id, transaction_type, amount, order_id, balance_after, description, created_at, updated_at"
+)
+
+
+def _wallet_movement_sql(wallet_filter: str) -> str:
+    """单条语句完成余额变动与流水写入
+
+    参数：$1 金额（正数入账、负数出账），$2 交易类型，$3 描述，$4 关联订单；
+    wallet_filter 为定位钱包的条件，参数从 $5 开始。
+    出账附带余额充足条件（balance >= 出账金额），不足时不更新、不写流水，返回空结果。
+    钱包行锁只在这一条语句内持有；用户当日汇总同时累加。
+    """
+    rollup = _rollup_sql(_rollup_delta(
+        "m.user_id", "FROM moved m",
+        transaction_count="1",
+        credit_amount="GREATEST($1, 0)",
+        debit_amount="GREATEST(-$1, 0)",
+    ))
+    return f"""
+        WITH moved AS (
+            UPDATE user_wallets
+            SET balance = balance + $1, updated_at = NOW()
+            WHERE {wallet_filter} AND balance + $1 >= 0
+            RETURNING id, user_id, balance
+        ),
+        {rollup}
+        INSERT INTO wallet_transactions (wallet_id, user_id, transaction_type, amount, order_id, balance_after, description)
+        SELECT id, user_id, $2, $1, $4, balance, $3 FROM moved
+        RETURNING {_WALLET_TRANSACTION_COLUMNS}
+    """
+
+
+async def apply_wallet_movement(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    amount: Decimal,
+    transaction_type: str,
+    description: Optional[str] = None,
+    order_id: Optional[UUID] = None
+) -> Optional[WalletTransaction]:
+    """变动用户钱包余额并记录流水；钱包不存在或余额不足时返回 None"""
+    query = _wallet_movement_sql("user_id = $5")
+    row = await db.fetch_one(query, amount, transaction_type, description, order_id, user_id)
+    return WalletTransaction(**row) if row else None
+
 async def get_wallet_transactions(
     db: DatabaseAdapter,
     user_id: UUID,
     page: int = 1,
     page_size: int = 20
 ) -> List[WalletTransaction]:
-    """获取钱包交易记录"""
+    """获取钱包交易记录（按 user_id 覆盖索引读取，无需关联钱包表）"""
     offset = (page - 1) * page_size
     query = """
-        SELECT wt.id, wt.wallet_id, wt.amount, wt.transaction_type, wt.balance_after, wt.created_at, wt.updated_at
-        FROM wallet_transactions wt
-        JOIN user_wallets uw ON wt.wallet_id = uw.id
-        WHERE uw.user_id = $1
-        ORDER BY wt.created_at DESC
+        SELECT id, wallet_id, amount, transaction_type, order_id, balance_after,
+               description, created_at, updated_at
+        FROM wallet_transactions
+        WHERE user_id = $1
+        ORDER BY created_at DESC, id DESC
         LIMIT $2 OFFSET $3
     """
     rows = await db.fetch_all(query, user_id, page_size, offset)
@@ -180,37 +307,123 @@ async def get_wallet_transactions(
 
 async def create_wallet_transaction(
     db: DatabaseAdapter,
-    transaction_data: WalletTransactionCreate
+    transaction_data: WalletTransactionCreate,
+    user_id: Optional[UUID] = None
 ) -> Optional[WalletTransaction]:
-    """创建钱包交易记录"""
-    query = """
-        INSERT INTO wallet_transactions (wallet_id, amount, transaction_type, description)
-        VALUES ($1, $2, $3, $4)
-        RETURNING id, wallet_id, amount, transaction_type, description, created_at
-    """
+    """按钱包ID变动余额并记录流水（指定 user_id 时仅限该用户的钱包）"""
+    query = _wallet_movement_sql("id = $5 AND ($6::uuid IS NULL OR user_id = $6)")
+    transaction_type = transaction_data.transaction_type
     values = (
-        transaction_data.wallet_id,
         transaction_data.amount,
-        transaction_data.transaction_type,
-        transaction_data.description
+        transaction_type.value if hasattr(transaction_type, 'value') else transaction_type,
+        transaction_data.description,
+        transaction_data.order_id,
+        transaction_data.wallet_id,
+        user_id
     )
     row = await db.fetch_one(query, *values)
     return WalletTransaction(**row) if row else None
 
 
+async def create_wallet_checkpoints(
+    db: DatabaseAdapter,
+    after_wallet_id: Optional[UUID] = None,
+    batch_size: int = 500
+) -> Tuple[int, Optional[UUID]]:
+    """为一批钱包记录余额检查点（按钱包ID键集分页）
+
+    只为自上个检查点以来有新流水的钱包写入；余额与最大序号取自同一快照，二者一致。
+
+    Returns:
+        (写入的检查点数, 本批最后一个钱包ID；已扫描完所有钱包时为 None)
+    """
+    query = """
+        WITH wallets AS (
+            SELECT id, balance
+            FROM user_wallets
+            WHERE $1::uuid IS NULL OR id > $1
+            ORDER BY id
+            LIMIT $2
+        ),
+        pending AS (
+            SELECT w.id AS wallet_id, w.balance, t.last_seq, t.transaction_count
+            FROM wallets w
+            CROSS JOIN LATERAL (
+                SELECT MAX(wt.seq) AS last_seq, COUNT(*) AS transaction_count
+                FROM wallet_transactions wt
+                WHERE wt.wallet_id = w.id
+                  AND wt.seq > COALESCE((
+                      SELECT MAX(c.last_seq) FROM wallet_balance_checkpoints c WHERE c.wallet_id = w.id
+                  ), 0)
+            ) t
+            WHERE t.last_seq IS NOT NULL
+        ),
+        inserted AS (
+            INSERT INTO wallet_balance_checkpoints (wallet_id, last_seq, balance, transaction_count)
+            SELECT wallet_id, last_seq, balance, transaction_count FROM pending
+            ON CONFLICT DO NOTHING
+            RETURNING 1
+        )
+        SELECT (SELECT COUNT(*) FROM inserted) AS created,
+               (SELECT id FROM wallets ORDER BY id DESC LIMIT 1) AS last_wallet_id,
+               (SELECT COUNT(*) FROM wallets) AS scanned
+    """
+    row = await db.fetch_one(query, after_wallet_id, batch_size)
+    last_wallet_id = row["last_wallet_id"] if row["scanned"] == batch_size else None
+    return row["created"], last_wallet_id
+
+
+async def audit_wallet(db: DatabaseAdapter, user_id: UUID) -> Optional[dict]:
+    """从最近的检查点重放之后的流水，核对钱包余额
+
+    Returns:
+        钱包不存在返回 None；否则返回 wallet_id、balance（当前余额）、checkpoint_seq、
+        checkpoint_balance、replayed（重放的流水数）、expected_balance 与 difference
+    """
+    query = """
+        SELECT w.id AS wallet_id, w.balance,
+               cp.last_seq AS checkpoint_seq,
+               cp.balance AS checkpoint_balance,
+               cp.created_at AS checkpoint_at,
+               r.replayed,
+               COALESCE(cp.balance, 0) + r.total AS expected_balance,
+               w.balance - (COALESCE(cp.balance, 0) + r.total) AS difference
+        FROM user_wallets w
+        LEFT JOIN LATERAL (
+            SELECT c.last_seq, c.balance, c.created_at
+            FROM wallet_balance_checkpoints c
+            WHERE c.wallet_id = w.id
+            ORDER BY c.last_seq DESC
+            LIMIT 1
+        ) cp ON TRUE
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*) AS replayed, COALESCE(SUM(wt.amount), 0) AS total
+            FROM wallet_transactions wt
+            WHERE wt.wallet_id = w.id AND wt.seq > COALESCE(cp.last_seq, 0)
+        ) r
+        WHERE w.user_id = $1
+    """
+    row = await db.fetch_one(query, user_id)
+    return dict(row) if row else None
+
+
 async def cancel_order(
     db: DatabaseAdapter,
     order_id: UUID,
     user_id: UUID
 ) -> bool:
     """取消订单"""
-    query = """
-        UPDATE orders
-        SET status = 'cancelled', updated_at = NOW()
-        WHERE id = $1 AND user_id = $2 AND status = 'pending'
+    query = f"""
+        WITH cancelled AS (
+            UPDATE orders
+            SET status = 'cancelled', status_changed_at = NOW(), updated_at = NOW()
+            WHERE id = $1 AND user_id = $2 AND status = 'pending'
+            RETURNING user_id
+        ),
+        {_rollup_sql(_rollup_delta("c.user_id", "FROM cancelled c", orders_cancelled="1"))}
+        SELECT COUNT(*) FROM cancelled
     """
-    result = await db.execute(query, order_id, user_id)
-    return result == "UPDATE 1"
+    return await db.fetch_value(query, order_id, user_id) == 1
 
 
 async def update_user_wallet(
@@ -247,130 +460,196 @@ async def update_user_wallet(
 
 
 async def get_financial_stats(db: DatabaseAdapter, user_id: UUID) -> dict:
-    """获取财务统计信息"""
-    # 获取总收入（作为导师的服务被购买）
-    income_query = """
-        SELECT COALESCE(SUM(o.total_price), 0) as total_income
-        FROM orders o
-        JOIN services s ON o.service_id = s.id
-        WHERE s.mentor_id = $1 AND o.status = 'completed'
-    """
-    income_row = await db.fetch_one(income_query, user_id)
-    total_income = income_row['total_income'] if income_row else 0
-
-    # 获取总支出（作为买家购买服务）
-    expense_query = """
-        SELECT COALESCE(SUM(total_price), 0) as total_expense
-        FROM orders
-        WHERE user_id = $1 AND status = 'completed'
-    """
-    expense_row = await db.fetch_one(expense_query, user_id)
-    total_expense = expense_row['total_expense'] if expense_row else 0
-
-    # 获取钱包余额
-    wallet = await get_user_wallet(db, user_id)
-    balance = wallet.balance if wallet else 0
-
-    # 获取交易统计
-    transaction_stats_query = """
+    """获取财务统计信息（读取日汇总，行数与活跃天数相关而与订单/流水量无关）"""
+    query = """
         SELECT
-            COUNT(*) as total_transactions,
-            COALESCE(SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END), 0) as total_deposits,
-            COALESCE(SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END), 0) as total_withdrawals
-        FROM wallet_transactions wt
-        JOIN user_wallets uw ON wt.wallet_id = uw.id
-        WHERE uw.user_id = $1
+            COALESCE((SELECT balance FROM user_wallets WHERE user_id = $1), 0) as balance,
+            COALESCE(SUM(income), 0) as total_income,
+            COALESCE(SUM(expense), 0) as total_expense,
+            COALESCE(SUM(transaction_count), 0) as total_transactions,
+            COALESCE(SUM(credit_amount), 0) as total_deposits,
+            COALESCE(SUM(debit_amount), 0) as total_withdrawals,
+            COALESCE(SUM(orders_created), 0) as orders_created,
+            COALESCE(SUM(orders_completed), 0) as orders_completed,
+            COALESCE(SUM(orders_cancelled), 0) as orders_cancelled
+        FROM user_financial_daily
+        WHERE user_id = $1
     """
-    stats_row = await db.fetch_one(transaction_stats_query, user_id)
-    transaction_stats = stats_row if stats_row else {
-        'total_transactions': 0,
-        'total_deposits': 0,
-        'total_withdrawals': 0
-    }
+    row = await db.fetch_one(query, user_id)
 
     return {
-        'balance': float(balance),
-        'total_income': float(total_income),
-        'total_expense': float(total_expense),
-        'net_income': float(total_income - total_expense),
-        'total_transactions': transaction_stats['total_transactions'],
-        'total_deposits': float(transaction_stats['total_deposits']),
-        'total_withdrawals': float(transaction_stats['total_withdrawals'])
+        'balance': float(row['balance']),
+        'total_income': float(row['total_income']),
+        'total_expense': float(row['total_expense']),
+        'net_income': float(row['total_income'] - row['total_expense']),
+        'total_transactions': int(row['total_transactions']),
+        'total_deposits': float(row['total_deposits']),
+        'total_withdrawals': float(row['total_withdrawals']),
+        'orders_created': int(row['orders_created']),
+        'orders_completed': int(row['orders_completed']),
+        'orders_cancelled': int(row['orders_cancelled'])
     }
 
 
-async def pay_order(
-    db: DatabaseAdapter,
-    order_id: UUID,
-    user_id: UUID
-) -> tuple[bool, str]:
-    """支付订单"""
-    # 获取订单信息和导师ID
-    order_query = """
-        SELECT o.id, o.user_id, o.total_price, o.status, s.mentor_id
-        FROM orders o
-        JOIN services s ON o.service_id = s.id
-        WHERE o.id = $1 AND o.user_id = $2
-    """
-    order_row = await db.fetch_one(order_query, order_id, user_id)
-    if not order_row:
-        return False, "订单不存在"
-
-    if order_row['status'] != 'pending':
-        return False, f"订单状态为 {order_row['status']}，无法支付"
-
-    order_amount = order_row['total_price']
-    mentor_id = order_row['mentor_id']
-
-    # 获取用户钱包
-    wallet = await get_user_wallet(db, user_id)
-    if not wallet:
-        return False, "用户钱包不存在"
-
-    if wallet.balance < order_amount:
-        return False, f"钱包余额不足，当前余额: {wallet.balance}"
+async def reconcile_financial_rollup(db: DatabaseAdapter, days: int = 2) -> int:
+    """按源表重算最近 days 天（含今天，UTC）的日汇总，修正增量写入的偏差
 
-    # 开始事务处理
-    try:
-        # 扣除买家钱包余额
-        await update_wallet_balance(db, user_id, -order_amount)
+    兜底修正增量写入遗漏或并发导致的偏差；重算结果为空的汇总行会被删除。
 
-        # 增加导师钱包余额
-        await update_wallet_balance(db, mentor_id, order_amount)
-
-        # 更新订单状态
-        update_order_query = """
-            UPDATE orders
-            SET status = 'completed', updated_at = NOW()
-            WHERE id = $1
-        """
-        await db.execute(update_order_query, order_id)
-
-        # 创建交易记录（买家支出）
-        buyer_transaction = WalletTransactionCreate(
-            wallet_id=wallet.id,
-            amount=-order_amount,
-            transaction_type="payment",
-            description=f"支付订单 {order_id}"
+    Returns:
+        被修正（更新、插入或删除）的汇总行数
+    """
+    columns = ", ".join(_ROLLUP_COLUMNS)
+    sums = ", ".join(f"SUM({c}) AS {c}" for c in _ROLLUP_COLUMNS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in _ROLLUP_COLUMNS)
+    query = f"""
+        WITH bounds AS (
+            SELECT {_ROLLUP_DAY_SQL} - ($1::int - 1) AS start_day
+        ),
+        window_start AS (
+            SELECT start_day, start_day::timestamp AT TIME ZONE 'UTC' AS start_at FROM bounds
+        ),
+        actual AS (
+            SELECT user_id, day, {sums}
+            FROM (
+                SELECT o.user_id, (o.created_at AT TIME ZONE 'UTC')::date AS day,
+                       0 AS income, 0 AS expense, 1 AS orders_created, 0 AS orders_completed,
+                       0 AS orders_cancelled, 0 AS transaction_count, 0 AS credit_amount, 0 AS debit_amount
+                FROM orders o, window_start ws
+                WHERE o.created_at >= ws.start_at
+                UNION ALL
+                SELECT o.user_id, (o.status_changed_at AT TIME ZONE 'UTC')::date,
+                       0, o.total_price, 0, 1, 0, 0, 0, 0
+                FROM orders o, window_start ws
+                WHERE o.status = 'completed' AND o.status_changed_at >= ws.start_at
+                UNION ALL
+                SELECT s.mentor_id, (o.status_changed_at AT TIME ZONE 'UTC')::date,
+                       o.total_price, 0, 0, 0, 0, 0, 0, 0
+                FROM orders o
+                JOIN services s ON s.id = o.service_id
+                CROSS JOIN window_start ws
+                WHERE o.status = 'completed' AND o.status_changed_at >= ws.start_at
+                UNION ALL
+                SELECT o.user_id, (o.status_changed_at AT TIME ZONE 'UTC')::date,
+                       0, 0, 0, 0, 1, 0, 0, 0
+                FROM orders o, window_start ws
+                WHERE o.status = 'cancelled' AND o.status_changed_at >= ws.start_at
+                UNION ALL
+                SELECT w.user_id, (wt.created_at AT TIME ZONE 'UTC')::date,
+                       0, 0, 0, 0, 0, 1, GREATEST(wt.amount, 0), GREATEST(-wt.amount, 0)
+                FROM wallet_transactions wt
+                JOIN user_wallets w ON w.id = wt.wallet_id
+                CROSS JOIN window_start ws
+                WHERE wt.created_at >= ws.start_at
+            ) deltas
+            GROUP BY user_id, day
+        ),
+        upserted AS (
+            INSERT INTO user_financial_daily AS r (user_id, day, {columns})
+            SELECT user_id, day, {columns} FROM actual
+            ON CONFLICT (user_id, day) DO UPDATE
+            SET {updates}, updated_at = NOW()
+            WHERE ({", ".join(f"r.{c}" for c in _ROLLUP_COLUMNS)})
+                  IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in _ROLLUP_COLUMNS)})
+            RETURNING 1
+        ),
+        cleared AS (
+            DELETE FROM user_financial_daily r
+            USING window_start ws
+            WHERE r.day >= ws.start_day
+              AND NOT EXISTS (
+                  SELECT 1 FROM actual a WHERE a.user_id = r.user_id AND a.day = r.day
+              )
+            RETURNING 1
         )
-        await create_wallet_transaction(db, buyer_transaction)
+        SELECT (SELECT COUNT(*) FROM upserted) + (SELECT COUNT(*) FROM cleared)
+    """
+    return await db.fetch_value(query, days) or 0
+
 
-        # 创建交易记录（导师收入）
-        mentor_wallet = await get_user_wallet(db, mentor_id)
-        if mentor_wallet:
-            mentor_transaction = WalletTransactionCreate(
-                wallet_id=mentor_wallet.id,
-                amount=order_amount,
-                transaction_type="income",
-                description=f"收到订单 {order_id} 付款"
-            )
-            await create_wallet_transaction(db, mentor_transaction)
+async def pay_order(
+    db: DatabaseAdapter,
+    order_id: UUID,
+    user_id: UUID
+) -> Optional[dict]:
+    """支付订单（单条语句）
 
-        return True, "支付成功"
+    锁定订单后，在同一语句中：带余额条件扣除买家余额、订单置为 completed、
+    入账导师钱包（不存在则创建）、写入双方流水并累加双方当日汇总。任一条件不满足则不发生任何写入。
+    买家与导师的钱包按 user_id 顺序先行加锁，双方互相购买时不会因加锁顺序相反而死锁。
 
-    except Exception as e:
-        # 回滚事务的逻辑应该在数据库层面处理，这里简化处理
-        return False, f"支付失败: {str(e)}"
+    Returns:
+        订单不存在返回 None；否则返回 status、total_price、mentor_id、paid（是否支付成功）、
+        balance（支付后的买家余额）与 current_balance（未支付时的买家余额，无钱包为 None）
+    """
+    rollup = _rollup_sql(
+        _rollup_delta(
+            "$2::uuid", "FROM debit d",
+            expense="d.total_price", orders_completed="1",
+            transaction_count="1", debit_amount="d.total_price",
+        ),
+        _rollup_delta(
+            "d.mentor_id", "FROM debit d",
+            income="d.total_price", transaction_count="1", credit_amount="d.total_price",
+        ),
+    )
+    query = f"""
+        WITH target AS (
+            SELECT o.id, o.total_price, o.status, s.mentor_id
+            FROM orders o
+            JOIN services s ON o.service_id = s.id
+            WHERE o.id = $1 AND o.user_id = $2
+            FOR UPDATE OF o
+        ),
+        locked AS (
+            SELECT w.user_id
+            FROM user_wallets w, target t
+            WHERE w.user_id IN ($2, t.mentor_id)
+            ORDER BY w.user_id
+            FOR UPDATE OF w
+        ),
+        debit AS (
+            UPDATE user_wallets w
+            SET balance = w.balance - t.total_price, updated_at = NOW()
+            FROM target t
+            JOIN locked l ON l.user_id = $2
+            WHERE w.user_id = $2
+              AND t.status = 'pending'
+              AND t.mentor_id <> $2
+              AND w.balance >= t.total_price
+            RETURNING w.id, w.balance, t.id AS order_id, t.total_price, t.mentor_id
+        ),
+        paid_order AS (
+            UPDATE orders o
+            SET status = 'completed', status_changed_at = NOW(), updated_at = NOW()
+            FROM debit d
+            WHERE o.id = d.order_id
+        ),
+        credit AS (
+            INSERT INTO user_wallets (user_id, balance)
+            SELECT d.mentor_id, d.total_price FROM debit d
+            ON CONFLICT (user_id) DO UPDATE
+            SET balance = user_wallets.balance + EXCLUDED.balance, updated_at = NOW()
+            RETURNING id, user_id, balance
+        ),
+        ledger AS (
+            INSERT INTO wallet_transactions (wallet_id, user_id, transaction_type, amount, order_id, balance_after, description)
+            SELECT d.id, $2, 'payment', -d.total_price, d.order_id, d.balance, '支付订单 ' || d.order_id
+            FROM debit d
+            UNION ALL
+            SELECT c.id, c.user_id, 'income', d.total_price, d.order_id, c.balance, '收到订单 ' || d.order_id || ' 付款'
+            FROM debit d, credit c
+        ),
+        {rollup}
+        SELECT t.status, t.total_price, t.mentor_id,
+               d.id IS NOT NULL AS paid,
+               d.balance,
+               (SELECT balance FROM user_wallets WHERE user_id = $2) AS current_balance
+        FROM target t
+        LEFT JOIN debit d ON TRUE
+    """
+    row = await db.fetch_one(query, order_id, user_id)
+    return dict(row) if row else None
 
 
 async def recharge_wallet(
@@ -379,23 +658,8 @@ async def recharge_wallet(
     payment_method: str,
     user_id: UUID
 ) -> Optional[WalletTransaction]:
-    """充值钱包"""
-    wallet = await get_user_wallet(db, user_id)
-    if not wallet:
-        return None
-
-    # 更新钱包余额
-    await update_wallet_balance(db, user_id, amount)
-
-    # 创建充值交易记录
-    transaction_data = WalletTransactionCreate(
-        wallet_id=wallet.id,
-        amount=amount,
-        transaction_type="deposit",
-        description=f"充值 ({payment_method})"
-    )
-
-    return await create_wallet_transaction(db, transaction_data)
+    """充值钱包（余额变动与流水在同一条语句中完成）"""
+    return await apply_wallet_movement(db, user_id, amount, "deposit", f"充值 ({payment_method})")
 
 
 async def withdraw_wallet(
@@ -404,23 +668,5 @@ async def withdraw_wallet(
     account_info: str,
     user_id: UUID
 ) -> Optional[WalletTransaction]:
-    """提现钱包"""
-    wallet = await get_user_wallet(db, user_id)
-    if not wallet:
-        return None
-
-    if wallet.balance < amount:
-        return None
-
-    # 更新钱包余额
-    await update_wallet_balance(db, user_id, -amount)
-
-    # 创建提现交易记录
-    transaction_data = WalletTransactionCreate(
-        wallet_id=wallet.id,
-        amount=-amount,
-        transaction_type="withdraw",
-        description=f"提现到 {account_info}"
-    )
-
-    return await create_wallet_transaction(db, transaction_data)
+    """提现钱包（余额不足时不扣款，返回 None）"""
+    return await apply_wallet_movement(db, user_id, -amount, "withdrawal", f"提现到 {account_info}")
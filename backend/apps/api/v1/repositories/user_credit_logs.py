@@ -3,19 +3,47 @@
 提供用户积分日志系统的数据库操作
 统一管理所有积分相关的数据访问操作
 """
+from decimal import Decimal
 from typing import Optional, List, Dict, Any
 from uuid import UUID
 from apps.schemas.user_credit_logs import (
     UserCreditLog, UserCreditLogCreate, CreditTransaction, CreditTransactionCreate,
-    CreditBalance, CreditStats
+    CreditBalance, CreditStats, CreditAwardItem
 )
 from libs.database.adapters import DatabaseAdapter
 from datetime import datetime
 
 
+_CREDIT_LOG_COLUMNS = """id, user_id, credit_type, amount, balance_after, reason,
+               reference_id, reference_type, description, expires_at, created_at, updated_at"""
+
+# 积分类型 -> 钱包积分字段（白名单，字段名会拼接进 SQL）
+_CREDIT_COLUMNS = {
+    "mentor_point": "mentor_points",
+    "mentor_points": "mentor_points",
+    "learning_point": "learning_points",
+    "learning_points": "learning_points",
+    "reputation_point": "reputation_points",
+    "reputation_points": "reputation_points",
+}
+
+
+# 钱包中的积分字段
+_WALLET_CREDIT_COLUMNS = tuple(sorted(set(_CREDIT_COLUMNS.values())))
+
+
+def credit_column(credit_type) -> str:
+    """解析积分类型对应的钱包字段，未知类型抛出 ValueError"""
+    value = credit_type.value if hasattr(credit_type, 'value') else str(credit_type)
+    column = _CREDIT_COLUMNS.get(value)
+    if not column:
+        raise ValueError(f"未知的积分类型: {value}")
+    return column
+
+
 # ============ 积分日志管理 ============
 
-async def get_credit_log_by_id(db: DatabaseAdapter, log_id: int) -> Optional[UserCreditLog]:
+async def get_credit_log_by_id(db: DatabaseAdapter, log_id: UUID) -> Optional[UserCreditLog]:
     """根据ID获取积分日志"""
     query = """
         SELECT id, user_id, credit_type, amount, balance_after, reason,
@@ -68,50 +96,177 @@ async def create_credit_log(db: DatabaseAdapter, log: UserCreditLogCreate) -> Op
     return UserCreditLog(**row) if row else None
 
 
-async def create_credit_transaction(db: DatabaseAdapter, transaction: CreditTransactionCreate) -> Optional[UserCreditLog]:
-    """创建积分交易（同时更新用户钱包）"""
-    # 获取当前余额
-    wallet_query = """
-        SELECT mentor_points, learning_points, reputation_points
-        FROM user_wallets
-        WHERE user_id = $1
+async def create_credit_transaction(
+    db: DatabaseAdapter,
+    transaction: CreditTransactionCreate,
+    reason: str = 'system_transaction'
+) -> Optional[UserCreditLog]:
+    """创建积分交易：钱包积分变动与日志写入在同一条语句中完成
+
+    入账时不存在的钱包会被创建（INSERT ... ON CONFLICT DO UPDATE），balance_after 取自
+    更新后的钱包行，并发发放也不会算错；出账带余额条件，不足时不扣减并返回 None。
     """
-    wallet = await db.fetch_one(wallet_query, transaction.user_id)
-
-    if not wallet:
-        # 如果没有钱包记录，创建默认钱包
-        await db.execute("""
-            INSERT INTO user_wallets (user_id, created_at, updated_at)
-            VALUES ($1, NOW(), NOW())
-        """, transaction.user_id)
-        wallet = {'mentor_points': 0, 'learning_points': 0, 'reputation_points': 0}
-
-    # 计算新余额
-    credit_type_field = f"{transaction.credit_type}s"  # mentor_points, learning_points, reputation_points
-    new_balance = wallet[credit_type_field] + transaction.amount
-
-    # 更新钱包
-    update_wallet_query = f"""
-        UPDATE user_wallets
-        SET {credit_type_field} = {credit_type_field} + $1, updated_at = NOW()
-        WHERE user_id = $2
+    column = credit_column(transaction.credit_type)
+    amount = Decimal(transaction.amount)
+    if amount >= 0:
+        wallet_sql = f"""
+            INSERT INTO user_wallets (user_id, {column})
+            VALUES ($1, $2)
+            ON CONFLICT (user_id) DO UPDATE
+            SET {column} = user_wallets.{column} + EXCLUDED.{column}, updated_at = NOW()
+            RETURNING user_id, {column} AS balance_after
+        """
+    else:
+        wallet_sql = f"""
+            UPDATE user_wallets
+            SET {column} = {column} + $2, updated_at = NOW()
+            WHERE user_id = $1 AND {column} + $2 >= 0
+            RETURNING user_id, {column} AS balance_after
+        """
+    query = f"""
+        WITH wallet AS ({wallet_sql})
+        INSERT INTO user_credit_logs (
+            user_id, credit_type, amount, balance_after, reason,
+            reference_id, reference_type, description, expires_at
+        )
+        SELECT user_id, $3, $2, balance_after, $4, $5, $6, $7, $8
+        FROM wallet
+        RETURNING {_CREDIT_LOG_COLUMNS}
+    """
+    values = (
+        transaction.user_id, amount, column, reason,
+        transaction.reference_id, transaction.reference_type, transaction.description,
+        getattr(transaction, 'expires_at', None)
+    )
+    row = await db.fetch_one(query, *values)
+    return UserCreditLog(**row) if row else None
+
+
+async def award_credits_batch(
+    db: DatabaseAdapter,
+    point_type: str,
+    items: List[CreditAwardItem],
+    description: str,
+    campaign_id: Optional[UUID] = None,
+    expires_at: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """批量发放积分（单条语句）
+
+    同一用户的多条明细先合并；指定活动时跳过已领取过该活动的用户（由唯一索引兜底）；
+    不存在的用户被跳过。钱包按 user_id 顺序加锁，避免并发批次互相死锁。
+
+    Returns:
+        每个用户一行：user_id、awarded、user_exists、amount、balance_after
+    """
+    column = credit_column(point_type)
+    query = f"""
+        WITH input AS (
+            SELECT user_id, SUM(amount) AS amount
+            FROM unnest($1::uuid[], $2::numeric[]) AS t(user_id, amount)
+            GROUP BY user_id
+        ),
+        eligible AS (
+            SELECT i.user_id, i.amount
+            FROM input i
+            JOIN users u ON u.id = i.user_id
+            WHERE $5::uuid IS NULL OR NOT EXISTS (
+                SELECT 1 FROM user_credit_logs l
+                WHERE l.user_id = i.user_id AND l.reason = 'campaign_award'
+                  AND l.reference_type = 'campaign' AND l.reference_id = $5
+            )
+        ),
+        wallet AS (
+            INSERT INTO user_wallets (user_id, {column})
+            SELECT user_id, amount FROM eligible ORDER BY user_id
+            ON CONFLICT (user_id) DO UPDATE
+            SET {column} = user_wallets.{column} + EXCLUDED.{column}, updated_at = NOW()
+            RETURNING user_id, {column} AS balance_after
+        ),
+        logged AS (
+            INSERT INTO user_credit_logs (
+                user_id, credit_type, amount, balance_after, reason,
+                reference_id, reference_type, description, expires_at
+            )
+            SELECT w.user_id, $3, e.amount, w.balance_after, 'campaign_award',
+                   $5, CASE WHEN $5::uuid IS NULL THEN NULL ELSE 'campaign' END, $4, $6
+            FROM wallet w
+            JOIN eligible e ON e.user_id = w.user_id
+            RETURNING user_id, amount, balance_after
+        )
+        SELECT i.user_id,
+               l.user_id IS NOT NULL AS awarded,
+               EXISTS (SELECT 1 FROM users u WHERE u.id = i.user_id) AS user_exists,
+               l.amount, l.balance_after
+        FROM input i
+        LEFT JOIN logged l ON l.user_id = i.user_id
+        ORDER BY i.user_id
     """
-    await db.execute(update_wallet_query, transaction.amount, transaction.user_id)
-
-    # 创建日志
-    log_data = UserCreditLogCreate(
-        user_id=transaction.user_id,
-        credit_type=transaction.credit_type,
-        amount=transaction.amount,
-        balance_after=new_balance,
-        reason='system_transaction',
-        description=transaction.description,
-        reference_id=transaction.reference_id,
-        reference_type=transaction.reference_type,
-        expires_at=getattr(transaction, 'expires_at', None)
+    rows = await db.fetch_all(
+        query,
+        [item.user_id for item in items],
+        [item.amount for item in items],
+        column, description, campaign_id, expires_at
     )
+    return [dict(row) for row in rows]
+
 
-    return await create_credit_log(db, log_data)
+async def debit_credits_batch(
+    db: DatabaseAdapter,
+    credit_type: str,
+    user_ids: List[UUID],
+    amounts: List[Decimal],
+    description: str,
+    reason: str
+) -> List[Dict[str, Any]]:
+    """批量扣减积分（单条语句）
+
+    同一用户的多条先合并；余额不足时扣至 0（用量已发生，不能拒绝），日志记录实际扣减额。
+    钱包按 user_id 顺序加锁，避免并发批次互相死锁；没有钱包的用户被跳过。
+
+    Returns:
+        每个被扣减的用户一行：user_id、amount（实际扣减额）、balance_after
+    """
+    column = credit_column(credit_type)
+    query = f"""
+        WITH input AS (
+            SELECT user_id, SUM(amount) AS amount
+            FROM unnest($1::uuid[], $2::numeric[]) AS t(user_id, amount)
+            GROUP BY user_id
+        ),
+        locked AS (
+            SELECT w.user_id, w.{column} AS balance
+            FROM user_wallets w
+            JOIN input i ON i.user_id = w.user_id
+            ORDER BY w.user_id
+            FOR UPDATE OF w
+        ),
+        wallet AS (
+            UPDATE user_wallets w
+            SET {column} = l.balance - LEAST(l.balance, i.amount), updated_at = NOW()
+            FROM input i
+            JOIN locked l ON l.user_id = i.user_id
+            WHERE w.user_id = i.user_id
+            RETURNING w.user_id, LEAST(l.balance, i.amount) AS amount, w.{column} AS balance_after
+        ),
+        logged AS (
+            INSERT INTO user_credit_logs (user_id, credit_type, amount, balance_after, reason, description)
+            SELECT user_id, $3, -amount, balance_after, $4, $5
+            FROM wallet
+            WHERE amount > 0
+        )
+        SELECT user_id, amount, balance_after FROM wallet
+    """
+    rows = await db.fetch_all(query, user_ids, amounts, column, reason, description)
+    return [dict(row) for row in rows]
+
+
+async def get_credit_points(db: DatabaseAdapter, user_id: UUID, credit_type: str) -> Decimal:
+    """获取用户某一积分池的余额，无钱包时为 0"""
+    column = credit_column(credit_type)
+    value = await db.fetch_value(
+        f"SELECT {column} FROM user_wallets WHERE user_id = $1", user_id
+    )
+    return Decimal(value) if value is not None else Decimal(0)
 
 
 async def get_credit_balance(db: DatabaseAdapter, user_id: UUID) -> CreditBalance:
@@ -155,61 +310,109 @@ async def get_expiring_credits(db: DatabaseAdapter, user_id: UUID, days: int = 3
         AND expires_at IS NOT NULL
         AND expires_at <= NOW() + INTERVAL '{days} days'
         AND expires_at > NOW()
+        AND expired_at IS NULL
         ORDER BY expires_at
     """
     rows = await db.fetch_all(query, user_id)
     return [UserCreditLog(**row) for row in rows]
 
 
-async def expire_credits(db: DatabaseAdapter) -> int:
-    """过期积分处理"""
-    # 找到过期的积分日志
-    expired_logs_query = """
-        SELECT id, user_id, credit_type, amount
-        FROM user_credit_logs
-        WHERE expires_at IS NOT NULL
-        AND expires_at <= NOW()
-        AND amount > 0
-    """
-    expired_logs = await db.fetch_all(expired_logs_query)
-
-    if not expired_logs:
-        return 0
+async def expire_credits(db: DatabaseAdapter, batch_size: int = 1000) -> Dict[str, int]:
+    """处理一批已过期的积分发放（单条语句）
 
-    # 批量处理过期积分
-    for log in expired_logs:
-        credit_type_field = f"{log['credit_type']}s"
+    按过期时间领取至多 batch_size 条待处理发放（FOR UPDATE SKIP LOCKED，并发执行互不阻塞），
+    按用户合并后批量扣减钱包（余额不足时扣至 0），为实际扣减的发放写入冲正日志，
+    并标记 expired_at。走 pending 部分索引，不扫描全表。
 
-        # 扣除过期积分
-        update_wallet_query = f"""
-            UPDATE user_wallets
-            SET {credit_type_field} = GREATEST({credit_type_field} - $1, 0), updated_at = NOW()
-            WHERE user_id = $2
-        """
-        await db.execute(update_wallet_query, log['amount'], log['user_id'])
-
-        # 创建过期日志
-        await create_credit_log(db, UserCreditLogCreate(
-            user_id=log['user_id'],
-            credit_type=log['credit_type'],
-            amount=-log['amount'],
-            balance_after=0,
-            reason='expiration',
-            reference_id=str(log['id']),
-            reference_type='expired_log',
-            description=f'积分过期：{log["amount"]} {log["credit_type"]}'
-        ))
-
-    # 标记原日志为已过期
-    expired_ids = [log['id'] for log in expired_logs]
-    for log_id in expired_ids:
-        await db.execute("""
-            UPDATE user_credit_logs
-            SET amount = 0, description = description || ' (已过期)', updated_at = NOW()
-            WHERE id = $1
-        """, log_id)
-
-    return len(expired_logs)
+    Returns:
+        expired（本批处理的发放数）与 reversed（写入的冲正日志数）
+    """
+    column_case = " ".join(
+        f"WHEN '{credit_type}' THEN '{column}'" for credit_type, column in _CREDIT_COLUMNS.items()
+    )
+    sums = ", ".join(
+        f"COALESCE(SUM(amount) FILTER (WHERE wallet_column = '{c}'), 0) AS {c}"
+        for c in _WALLET_CREDIT_COLUMNS
+    )
+    locked_columns = ", ".join(f"w.{c}" for c in _WALLET_CREDIT_COLUMNS)
+    updates = ", ".join(f"{c} = l.{c} - LEAST(l.{c}, e.{c})" for c in _WALLET_CREDIT_COLUMNS)
+    returning = ", ".join(
+        f"LEAST(l.{c}, e.{c}) AS {c}_deducted, w.{c} AS {c}_balance" for c in _WALLET_CREDIT_COLUMNS
+    )
+    unpivot = ", ".join(
+        f"('{c}', w.{c}_deducted, w.{c}_balance)" for c in _WALLET_CREDIT_COLUMNS
+    )
+    query = f"""
+        WITH batch AS (
+            SELECT id, user_id, credit_type, amount, expires_at,
+                   CASE credit_type {column_case} END AS wallet_column
+            FROM user_credit_logs
+            WHERE expires_at IS NOT NULL AND expired_at IS NULL AND amount > 0
+              AND expires_at <= NOW()
+            ORDER BY expires_at
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        ),
+        marked AS (
+            UPDATE user_credit_logs l
+            SET expired_at = NOW(), updated_at = NOW()
+            FROM batch b
+            WHERE l.id = b.id
+        ),
+        expiring AS (
+            SELECT user_id, {sums}
+            FROM batch
+            GROUP BY user_id
+        ),
+        locked AS (
+            SELECT w.user_id, {locked_columns}
+            FROM user_wallets w
+            JOIN expiring e ON e.user_id = w.user_id
+            ORDER BY w.user_id
+            FOR UPDATE OF w
+        ),
+        wallet AS (
+            UPDATE user_wallets w
+            SET {updates}, updated_at = NOW()
+            FROM expiring e
+            JOIN locked l ON l.user_id = e.user_id
+            WHERE w.user_id = e.user_id
+            RETURNING w.user_id, {returning}
+        ),
+        deductions AS (
+            SELECT w.user_id, d.wallet_column, d.deducted, d.balance
+            FROM wallet w
+            CROSS JOIN LATERAL (VALUES {unpivot}) AS d(wallet_column, deducted, balance)
+            WHERE d.deducted > 0
+        ),
+        allocated AS (
+            -- 扣减额按过期先后分摊到各条发放，balance_after 还原为逐条扣减后的余额
+            SELECT b.id, b.user_id, b.credit_type, d.deducted AS total, d.balance,
+                   SUM(b.amount) OVER grants AS cum_through,
+                   SUM(b.amount) OVER grants - b.amount AS cum_before
+            FROM batch b
+            JOIN deductions d ON d.user_id = b.user_id AND d.wallet_column = b.wallet_column
+            WINDOW grants AS (PARTITION BY b.user_id, b.wallet_column ORDER BY b.expires_at, b.id)
+        ),
+        logged AS (
+            INSERT INTO user_credit_logs (
+                user_id, credit_type, amount, balance_after, reason,
+                reference_id, reference_type, description
+            )
+            SELECT user_id, credit_type,
+                   -(LEAST(total, cum_through) - LEAST(total, cum_before)),
+                   balance + total - LEAST(total, cum_through),
+                   'expiration', id, 'expired_log',
+                   '积分过期：' || (LEAST(total, cum_through) - LEAST(total, cum_before)) || ' ' || credit_type
+            FROM allocated
+            WHERE cum_before < total
+            RETURNING 1
+        )
+        SELECT (SELECT COUNT(*) FROM batch) AS expired,
+               (SELECT COUNT(*) FROM logged) AS reversed
+    """
+    row = await db.fetch_one(query, batch_size)
+    return {"expired": row["expired"], "reversed": row["reversed"]}
 
 
 async def get_credit_stats(db: DatabaseAdapter, user_id: Optional[UUID] = None) -> CreditStats:
@@ -5,9 +5,11 @@ V1 API 服务模块
 
 # 导入所有服务模块
 from . import (
+    agent_metering,
     communication,
     forum,
     matching,
+    scheduling,
     service,
     skill,
     transaction,
@@ -18,9 +20,11 @@ from . import (
 
 # 显式导出服务
 __all__ = [
+    'agent_metering',
     'communication',
     'forum',
     'matching',
+    'scheduling',
     'service',
     'skill',
     'transaction',
@@ -0,0 +1,186 @@
+"""
+智能体计费服务层
+智能体调用的用量事件先进入进程内缓冲，由后台任务每隔几秒批量写入用量明细并扣减学习积分；
+积分检查读取缓存的运行余额（数据库余额 - 尚未落库的扣减），请求路径上没有同步写库
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from apps.api.v1.repositories import agent_usage as agent_usage_repo
+from apps.api.v1.repositories import user_credit_logs as credit_repo
+from libs.cache import EventBuffer, TTLCache
+from libs.config.settings import settings
+from libs.database.adapters import DatabaseAdapter
+from libs.database.connection import database_adapter_context
+from libs.tasks import PeriodicTask, register_periodic_task
+
+logger = logging.getLogger(__name__)
+
+AGENT_CREDIT_TYPE = "learning_points"
+USAGE_FLUSH_INTERVAL = 5
+
+# 数据库余额快照；多 worker 时其他进程的扣减最多延迟一个 TTL 可见
+BALANCE_CACHE_TTL = 30
+_balance_cache = TTLCache(ttl=BALANCE_CACHE_TTL, maxsize=10000)
+
+# 与 agent_usage_events 的列长度一致，客户端传入的超长值在入缓冲前截断，避免整批 COPY 失败
+MAX_AGENT_TYPE_LENGTH = 50
+MAX_MODEL_LENGTH = 100
+MAX_SESSION_ID_LENGTH = 100
+
+# 已记录但尚未落库（含刷写中）的扣减额，按用户累计
+_unsettled: Dict[str, Decimal] = defaultdict(Decimal)
+
+
+def _release_unsettled(user_key: str, amount: Decimal) -> None:
+    """扣减已落库或事件被丢弃时，从未落库额中减去"""
+    remaining = _unsettled.get(user_key, Decimal(0)) - amount
+    if remaining > 0:
+        _unsettled[user_key] = remaining
+    else:
+        _unsettled.pop(user_key, None)
+
+
+def _on_events_dropped(events: List[tuple]) -> None:
+    """缓冲溢出丢弃的事件不会再扣费，同步释放其未落库额，避免运行余额长期偏低"""
+    for event in events:
+        _release_unsettled(str(event[0]), event[6])
+
+
+_usage_buffer = EventBuffer("agent_usage", on_drop=_on_events_dropped)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：非 ASCII 字符各计 1，ASCII 字符约 4 个计 1"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def usage_cost(prompt_tokens: int, completion_tokens: int) -> Decimal:
+    """按次数与 token 数计算本次调用消耗的学习积分"""
+    per_call = Decimal(str(settings.ai.AGENT_CREDIT_COST_PER_CALL))
+    per_1k = Decimal(str(settings.ai.AGENT_CREDIT_COST_PER_1K_TOKENS))
+    return per_call + per_1k * (prompt_tokens + completion_tokens) / 1000
+
+
+async def record_agent_usage(
+    user_id: UUID,
+    agent_type: str,
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+    session_id: Optional[str] = None
+) -> Decimal:
+    """记录一次智能体调用的用量，返回本次消耗的积分（仅入缓冲，不写库）"""
+    credits = usage_cost(prompt_tokens, completion_tokens)
+    _unsettled[str(user_id)] += credits
+    await _usage_buffer.append((
+        user_id,
+        agent_type[:MAX_AGENT_TYPE_LENGTH],
+        model[:MAX_MODEL_LENGTH] if model else model,
+        session_id[:MAX_SESSION_ID_LENGTH] if session_id else session_id,
+        prompt_tokens, completion_tokens, credits, datetime.now(timezone.utc)
+    ))
+    return credits
+
+
+async def get_running_balance(db: DatabaseAdapter, user_id: UUID) -> Decimal:
+    """运行余额：缓存的数据库余额减去尚未落库的扣减"""
+    key = str(user_id)
+    balance = _balance_cache.get(key)
+    if balance is None:
+        balance = await credit_repo.get_credit_points(db, user_id, AGENT_CREDIT_TYPE)
+        _balance_cache.set(key, balance)
+    return balance - _unsettled.get(key, Decimal(0))
+
+
+async def has_agent_credits(db: DatabaseAdapter, user_id: UUID) -> bool:
+    """是否有足够积分发起一次智能体对话；未开启计费校验时始终允许"""
+    if not settings.ai.AGENT_CREDIT_ENFORCE:
+        return True
+    return await get_running_balance(db, user_id) >= usage_cost(0, 0)
+
+
+def _is_data_error(error: Exception) -> bool:
+    """数据异常（22xxx）或约束违反（23xxx）：由事件内容导致，重试不会成功"""
+    sqlstate = getattr(error, "sqlstate", None) or ""
+    return sqlstate.startswith(("22", "23"))
+
+
+async def _write_usage(events: List[tuple]) -> int:
+    """在一个事务中写入用量明细并按用户批量扣减积分，成功后结算未落库额"""
+    totals: Dict[str, Decimal] = defaultdict(Decimal)
+    for event in events:
+        totals[str(event[0])] += event[6]
+
+    async with database_adapter_context() as db:
+        async with db.transaction():
+            await agent_usage_repo.insert_usage_events(db, events)
+            rows = await credit_repo.debit_credits_batch(
+                db, AGENT_CREDIT_TYPE,
+                [UUID(key) for key in totals],
+                list(totals.values()),
+                "AI 智能体对话",
+                "agent_usage"
+            )
+
+    for key, amount in totals.items():
+        _release_unsettled(key, amount)
+    for row in rows:
+        _balance_cache.set(str(row["user_id"]), row["balance_after"])
+    return len(events)
+
+
+async def flush_agent_usage() -> int:
+    """将缓冲中的用量事件写入明细并按用户批量扣减积分
+
+    数据库不可用等临时故障时整批放回缓冲等待重试；若整批因数据异常失败，则逐条写入，
+    丢弃（并记录）无法写入的事件，避免单条坏事件让后续每次刷写都失败。
+    """
+    events = await _usage_buffer.drain()
+    if not events:
+        return 0
+
+    try:
+        return await _write_usage(events)
+    except Exception as e:
+        if not _is_data_error(e):
+            await _usage_buffer.restore(events)
+            raise
+        logger.warning(f"用量事件批量写入失败，改为逐条写入: {e}")
+
+    written = 0
+    for index, event in enumerate(events):
+        try:
+            written += await _write_usage([event])
+        except Exception as e:
+            if not _is_data_error(e):
+                await _usage_buffer.restore(events[index:])
+                raise
+            logger.error(f"丢弃无法写入的用量事件 user={event[0]} agent={event[1]}: {e}")
+            _release_unsettled(str(event[0]), event[6])
+    return written
+
+
+_usage_flush_task = register_periodic_task(PeriodicTask(
+    name="agent_usage_flush",
+    interval=USAGE_FLUSH_INTERVAL,
+    func=flush_agent_usage,
+    run_on_shutdown=True
+))
+
+
+async def get_agent_usage_metrics() -> dict:
+    """用量缓冲、余额缓存与刷写任务指标"""
+    return {
+        "buffer": await _usage_buffer.stats(),
+        "unsettled_users": len(_unsettled),
+        "balance_cache": _balance_cache.stats(),
+        "flush": _usage_flush_task.stats()
+    }
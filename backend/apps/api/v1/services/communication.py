@@ -2,23 +2,141 @@
 通信中心 - 服务层
 提供对话和消息管理的业务逻辑
 """
+import logging
 from typing import List, Optional
 from uuid import UUID
 
 from apps.schemas.communication import (
     Conversation, ConversationCreate, ConversationUpdate,
     ConversationParticipant, ConversationParticipantCreate,
-    Message, MessageCreate, MessageUpdate
+    Message, MessageCreate, MessageUpdate, ConversationReadState, ConversationSyncResult
 )
 from apps.api.v1.repositories import communication as communication_repo
+from libs.cache import TTLCache
+from libs.config.settings import settings
 from libs.database.adapters import DatabaseAdapter
+from libs.database.connection import database_adapter_context
+from libs.realtime import ClientConnection, ConnectionHub, create_broker
+from libs.tasks import PeriodicTask, register_periodic_task, register_startup_hook, register_shutdown_hook
+
+logger = logging.getLogger(__name__)
+
+
+# ============ 成员缓存 ============
+
+# 对话成员集合缓存：conversation_id -> frozenset(user_id)
+# 本进程增删参与者时立即失效，其他进程经事件总线收到参与者事件后失效（每个 worker 启动时即监听总线），TTL 兜底；
+# 只用于订阅与只读查询，增删参与者的授权直接查库
+MEMBERSHIP_CACHE_TTL = 30
+_membership_cache = TTLCache(ttl=MEMBERSHIP_CACHE_TTL, maxsize=10000)
+
+
+def invalidate_conversation_members(conversation_id: UUID) -> None:
+    _membership_cache.delete(str(conversation_id))
+
+
+async def is_conversation_member(db: DatabaseAdapter, conversation_id: UUID, user_id: UUID) -> bool:
+    """检查用户是否为对话参与者（优先读取成员缓存）"""
+    key = str(conversation_id)
+    members = _membership_cache.get(key)
+    if members is None:
+        members = frozenset(await communication_repo.get_conversation_member_ids(db, conversation_id))
+        _membership_cache.set(key, members)
+    return user_id in members
+
+
+# ============ 实时推送 ============
+
+# 每个 WebSocket 连接最多积压的事件数，超出后断开该连接，由客户端重连并通过接口补齐
+REALTIME_QUEUE_SIZE = 100
+REALTIME_TOPIC = "conversation_events"
+
+realtime_hub = ConnectionHub(max_queue=REALTIME_QUEUE_SIZE)
+
+
+def _deliver_conversation_event(channel: tuple, event: dict) -> None:
+    """总线事件到达本进程：先同步成员缓存与本地订阅关系，再扇出到本地连接"""
+    user_id = event.get("data", {}).get("user_id")
+    if event.get("type") in ("participant.added", "participant.removed"):
+        invalidate_conversation_members(channel[1])
+    if event.get("type") == "participant.added" and user_id:
+        realtime_hub.subscribe_user(UUID(user_id), channel)
+    realtime_hub.dispatch(channel, event)
+    if event.get("type") == "participant.removed" and user_id:
+        realtime_hub.unsubscribe_user(UUID(user_id), channel)
+
+# 事件先发布到跨进程总线（Postgres LISTEN/NOTIFY，配置 Redis 时使用 Redis pub/sub），
+# 每个进程订阅一次并转交本地连接中心，保证连接在任意 worker 上的用户都能收到
+realtime_broker = create_broker(
+    REALTIME_TOPIC,
+    _deliver_conversation_event,
+    dsn=settings.postgres_url,
+    acquire=database_adapter_context,
+    redis_url=settings.ai.REDIS_URL
+)
+# 每个 worker 启动时即监听总线，没有 WebSocket 连接的 worker 也能及时失效成员缓存
+register_startup_hook(realtime_broker.start)
+register_shutdown_hook(realtime_broker.stop)
+
+
+def conversation_channel(conversation_id: UUID) -> tuple:
+    return ("conversation", str(conversation_id))
+
+
+async def publish_conversation_event(
+    db: DatabaseAdapter,
+    conversation_id: UUID,
+    event_type: str,
+    data: dict
+) -> None:
+    """向对话的在线参与者推送事件（经事件总线到达所有 worker）
+
+    Postgres 总线复用调用方连接执行 NOTIFY。推送是尽力而为的：写入已成功时总线故障只记录日志，
+    不会让请求失败（否则客户端重试会造成重复消息），客户端可通过增量同步补齐。
+    """
+    try:
+        await realtime_broker.publish(conversation_channel(conversation_id), {
+            "type": event_type,
+            "conversation_id": str(conversation_id),
+            "data": data,
+        }, db=db)
+    except Exception as e:
+        logger.warning(f"对话事件推送失败 {conversation_id} {event_type}: {e}")
+
+
+async def open_realtime_connection(db: DatabaseAdapter, user_id: UUID) -> ClientConnection:
+    """注册实时连接并订阅用户参与的全部对话（总线监听已在启动时开始，此处确保其运行）"""
+    await realtime_broker.start()
+    conversation_ids = await communication_repo.get_conversation_ids_by_user(db, user_id)
+    return realtime_hub.connect(user_id, [conversation_channel(cid) for cid in conversation_ids])
+
+
+def close_realtime_connection(connection: ClientConnection) -> None:
+    realtime_hub.disconnect(connection)
+
+
+async def subscribe_realtime_conversation(
+    db: DatabaseAdapter,
+    connection: ClientConnection,
+    conversation_id: UUID
+) -> bool:
+    """连接建立后订阅新对话，需为对话参与者"""
+    if not await is_conversation_member(db, conversation_id, connection.user_id):
+        return False
+    realtime_hub.subscribe(connection, conversation_channel(conversation_id))
+    return True
 
 
 # ============ 对话服务 ============
 
-async def get_conversations_by_user(db: DatabaseAdapter, user_id: UUID) -> List[Conversation]:
-    """获取用户参与的对话列表"""
-    return await communication_repo.get_conversations_by_user(db, user_id)
+async def get_conversations_by_user(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[Conversation]:
+    """获取用户参与的对话列表（含未读数）"""
+    return await communication_repo.get_conversations_by_user(db, user_id, limit, offset)
 
 
 async def get_conversation_by_id(
@@ -45,7 +163,7 @@ async def update_conversation(
     user_id: UUID,
     conversation_data: ConversationUpdate
 ) -> Optional[Conversation]:
-    """更新对话"""
+    """更新对话（参与者校验在更新语句中完成）"""
     return await communication_repo.update_conversation(db, conversation_id, user_id, conversation_data)
 
 
@@ -82,12 +200,11 @@ async def create_message(
     message_data: MessageCreate,
     sender_id: UUID
 ) -> Optional[Message]:
-    """创建消息"""
-    # 验证用户是否为对话参与者
-    if not await communication_repo.is_conversation_participant(db, conversation_id, sender_id):
-        return None
-
-    return await communication_repo.create_message(db, conversation_id, message_data, sender_id)
+    """创建消息（参与者校验与写入在同一条语句中完成，非参与者返回 None）"""
+    message = await communication_repo.create_message(db, conversation_id, message_data, sender_id)
+    if message:
+        await publish_conversation_event(db, conversation_id, "message.created", message.model_dump(mode="json"))
+    return message
 
 
 # 别名函数，保持向后兼容性
@@ -108,7 +225,10 @@ async def update_message(
     update_data: MessageUpdate  # 改名为 update_data
 ) -> Optional[Message]:
     """更新消息"""
-    return await communication_repo.update_message(db, message_id, sender_id, update_data)
+    message = await communication_repo.update_message(db, message_id, sender_id, update_data)
+    if message:
+        await publish_conversation_event(db, message.conversation_id, "message.updated", message.model_dump(mode="json"))
+    return message
 
 
 async def delete_message(
@@ -165,7 +285,7 @@ async def mark_message_as_read(
     message_id: UUID,
     user_id: UUID
 ) -> bool:
-    """标记消息为已读。
+    """标记消息为已读（该消息及之前的消息均视为已读）。
 
     Args:
         db: 数据库适配器
@@ -175,7 +295,122 @@ async def mark_message_as_read(
     Returns:
         是否标记成功
     """
-    return await communication_repo.mark_as_read(db, message_id, user_id)
+    state = await communication_repo.mark_conversation_read(db, user_id, message_id=message_id)
+    if not state or not state["target_found"]:
+        return False
+    await _publish_read_state(db, user_id, state)
+    return True
+
+
+async def mark_conversation_read(
+    db: DatabaseAdapter,
+    conversation_id: UUID,
+    user_id: UUID,
+    message_id: Optional[UUID] = None
+) -> Optional[ConversationReadState]:
+    """将当前用户在对话中的已读位置推进到指定消息（默认最新消息）
+
+    Returns:
+        推进后的已读游标；非参与者或消息不属于该对话时返回 None
+    """
+    state = await communication_repo.mark_conversation_read(db, user_id, conversation_id, message_id)
+    if not state or (message_id and not state["target_found"]):
+        return None
+    await _publish_read_state(db, user_id, state)
+    return ConversationReadState(**state)
+
+
+async def _publish_read_state(db: DatabaseAdapter, user_id: UUID, state: dict) -> None:
+    """游标前进时通知对话成员（已读回执，并同步该用户的其他设备）"""
+    if state["advanced"]:
+        await publish_conversation_event(db, state["conversation_id"], "participant.read", {
+            "user_id": str(user_id),
+            "last_read_message_id": str(state["last_read_message_id"]),
+        })
+
+
+# ============ 增量同步 ============
+
+# 变更日志保留天数；游标早于保留期的客户端会收到 reset
+CHANGE_LOG_RETENTION_DAYS = 90
+CHANGE_LOG_PRUNE_INTERVAL = 3600
+CHANGE_LOG_PRUNE_BATCH = 5000
+CHANGE_LOG_PRUNE_MAX_BATCHES = 20
+
+
+async def sync_conversation(
+    db: DatabaseAdapter,
+    conversation_id: UUID,
+    user_id: UUID,
+    cursor: int = 0,
+    limit: int = 500
+) -> Optional[ConversationSyncResult]:
+    """返回游标之后的对话变更，非参与者返回 None
+
+    变更序号在对话内连续，下一条应为 cursor + 1；若已被保留期清理或游标超前于对话，
+    返回 reset 与当前序号，客户端清空本地数据、通过消息列表重新加载后从该序号继续同步。
+    """
+    rows = await communication_repo.get_conversation_changes(db, conversation_id, user_id, cursor, limit)
+    if not rows:
+        return None
+
+    head_seq = rows[0]["head_seq"]
+    changes = [row for row in rows if row["seq"] is not None]
+    if cursor > head_seq or (cursor < head_seq and (not changes or changes[0]["seq"] != cursor + 1)):
+        return ConversationSyncResult(conversation_id=conversation_id, cursor=head_seq, reset=True)
+
+    # 同一实体只保留最后一次变更
+    latest = {}
+    for row in changes:
+        latest[(row["change_type"].split(".")[0], row["entity_id"])] = row
+
+    result = ConversationSyncResult(
+        conversation_id=conversation_id,
+        cursor=changes[-1]["seq"] if changes else cursor,
+        has_more=bool(changes) and len(changes) == limit and changes[-1]["seq"] < head_seq
+    )
+    for row in latest.values():
+        change_type = row["change_type"]
+        if change_type in ("message.created", "message.updated"):
+            # 消息随后被删除时由后续的 message.deleted 覆盖，此处可能已不存在
+            if row["id"] is not None:
+                result.messages.append(Message(
+                    id=row["id"],
+                    conversation_id=row["conversation_id"],
+                    sender_id=row["sender_id"],
+                    content=row["content"],
+                    is_read=row["is_read"],
+                    created_at=row["created_at"],
+                    updated_at=row["updated_at"]
+                ))
+        elif change_type == "message.deleted":
+            result.deleted_message_ids.append(row["entity_id"])
+        elif change_type == "participant.added":
+            result.added_participant_ids.append(row["entity_id"])
+        elif change_type == "participant.removed":
+            result.removed_participant_ids.append(row["entity_id"])
+    return result
+
+
+async def prune_conversation_changes() -> int:
+    """清理超过保留期的变更日志"""
+    total = 0
+    async with database_adapter_context() as db:
+        for _ in range(CHANGE_LOG_PRUNE_MAX_BATCHES):
+            deleted = await communication_repo.prune_conversation_changes(
+                db, CHANGE_LOG_RETENTION_DAYS, CHANGE_LOG_PRUNE_BATCH
+            )
+            total += deleted
+            if deleted < CHANGE_LOG_PRUNE_BATCH:
+                break
+    return total
+
+
+register_periodic_task(PeriodicTask(
+    name="conversation_change_log_prune",
+    interval=CHANGE_LOG_PRUNE_INTERVAL,
+    func=prune_conversation_changes
+))
 
 
 # ============ 参与者服务 ============
@@ -186,16 +421,18 @@ async def add_conversation_participant(
     participant_data: ConversationParticipantCreate,
     adder_id: UUID
 ) -> Optional[ConversationParticipant]:
-    """添加对话参与者"""
-    # 验证添加者是否为对话参与者
+    """添加对话参与者（已是参与者时返回 None）"""
+    # 验证添加者是否为对话参与者；变更类授权直接查库，不依赖可能滞后的成员缓存
     if not await communication_repo.is_conversation_participant(db, conversation_id, adder_id):
         return None
 
-    # 检查用户是否已经是参与者
-    if await communication_repo.is_conversation_participant(db, conversation_id, participant_data.user_id):
-        return None
-
-    return await communication_repo.add_conversation_participant(db, conversation_id, participant_data)
+    participant = await communication_repo.add_conversation_participant(db, conversation_id, participant_data)
+    if participant:
+        invalidate_conversation_members(conversation_id)
+        await publish_conversation_event(
+            db, conversation_id, "participant.added", {"user_id": str(participant_data.user_id)}
+        )
+    return participant
 
 
 async def remove_conversation_participant(
@@ -205,11 +442,15 @@ async def remove_conversation_participant(
     remover_id: UUID
 ) -> bool:
     """移除对话参与者"""
-    # 验证移除者是否为对话参与者
+    # 验证移除者是否为对话参与者；变更类授权直接查库，不依赖可能滞后的成员缓存
     if not await communication_repo.is_conversation_participant(db, conversation_id, remover_id):
         return False
 
-    return await communication_repo.remove_conversation_participant(db, conversation_id, user_id)
+    removed = await communication_repo.remove_conversation_participant(db, conversation_id, user_id)
+    if removed:
+        invalidate_conversation_members(conversation_id)
+        await publish_conversation_event(db, conversation_id, "participant.removed", {"user_id": str(user_id)})
+    return removed
 
 
 async def get_conversation_participants(
@@ -219,7 +460,7 @@ async def get_conversation_participants(
 ) -> List[ConversationParticipant]:
     """获取对话参与者列表"""
     # 验证用户是否为对话参与者
-    if not await communication_repo.is_conversation_participant(db, conversation_id, user_id):
+    if not await is_conversation_member(db, conversation_id, user_id):
         return []
 
     return await communication_repo.get_conversation_participants(db, conversation_id)
@@ -230,5 +471,8 @@ async def delete_conversation(
     conversation_id: UUID,
     user_id: UUID
 ) -> bool:
-    """删除对话"""
-    return await communication_repo.delete_conversation(db, conversation_id, user_id)
+    """删除对话（参与者校验在删除语句中完成）"""
+    deleted = await communication_repo.delete_conversation(db, conversation_id, user_id)
+    if deleted:
+        invalidate_conversation_members(conversation_id)
+    return deleted
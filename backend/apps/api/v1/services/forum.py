@@ -2,15 +2,139 @@
 论坛中心 - 服务层
 提供帖子和评论管理的业务逻辑
 """
-from typing import List, Optional
+import base64
+import html
+import json
+import logging
+import re
+from typing import List, Optional, Tuple
 from uuid import UUID
 
+from fastapi import HTTPException, status
+
 from apps.schemas.forum import (
     ForumPost as Post, ForumPostCreate as PostCreate, ForumPostUpdate as PostUpdate,
-    PostReply as Comment, PostReplyCreate as CommentCreate, PostReplyUpdate as CommentUpdate
+    PostReply as Comment, PostReplyCreate as CommentCreate, PostReplyUpdate as CommentUpdate,
+    ForumSearchHit, ForumSearchResponse, ForumReplyTree, ForumReplyTreeNode,
+    LikeBatchItem, LikeBatchItemResult
 )
+from apps.schemas.common import GeneralResponse
 from apps.api.v1.repositories import forum as forum_repo
+from libs.cache import TTLCache, create_counter_buffer
+from libs.config.settings import settings
 from libs.database.adapters import DatabaseAdapter
+from libs.database.connection import database_adapter_context
+from libs.tasks import PeriodicTask, register_periodic_task
+
+logger = logging.getLogger(__name__)
+
+
+# ============ 帖子计数缓存 ============
+
+# 按 (category, tag, author_id) 缓存帖子总数；帖子增删改时整体失效，
+# 其他 worker 的写入最多滞后一个 TTL
+POST_COUNT_CACHE_TTL = 30
+_post_count_cache = TTLCache(ttl=POST_COUNT_CACHE_TTL, maxsize=2048)
+
+
+def invalidate_post_counts() -> None:
+    """帖子写入后清空计数缓存"""
+    _post_count_cache.clear()
+
+
+async def count_posts_cached(
+    db: DatabaseAdapter,
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    author_id: Optional[UUID] = None
+) -> int:
+    """获取帖子总数，优先读取短期缓存"""
+    key = (category, tag, author_id)
+    total = _post_count_cache.get(key)
+    if total is None:
+        total = await forum_repo.count_posts(db, category, tag, author_id)
+        _post_count_cache.set(key, total)
+    return total
+
+
+# ============ 帖子浏览计数（写回缓冲） ============
+
+# 浏览数先聚合在缓冲中，按周期批量写回，避免热门帖子的行锁竞争
+POST_VIEW_FLUSH_INTERVAL = 5
+_post_view_buffer = create_counter_buffer("forum_post_views", settings.ai.REDIS_URL)
+
+
+async def record_post_view(post_id: UUID) -> None:
+    """记录一次帖子浏览"""
+    await _post_view_buffer.incr(str(post_id))
+
+
+async def get_pending_post_views(post_id: UUID) -> int:
+    """尚未写回数据库的浏览增量"""
+    return await _post_view_buffer.pending(str(post_id))
+
+
+async def flush_post_views() -> int:
+    """将缓冲中的浏览数批量写回，失败时放回缓冲等待重试"""
+    counts = await _post_view_buffer.drain()
+    if not counts:
+        return 0
+    try:
+        async with database_adapter_context() as db:
+            await forum_repo.apply_post_view_increments(
+                db, {UUID(post_id): amount for post_id, amount in counts.items()}
+            )
+    except Exception:
+        await _post_view_buffer.restore(counts)
+        raise
+    await _post_view_buffer.ack()
+    return len(counts)
+
+
+_post_view_flush_task = register_periodic_task(PeriodicTask(
+    name="forum_post_views_flush",
+    interval=POST_VIEW_FLUSH_INTERVAL,
+    func=flush_post_views,
+    run_on_shutdown=True
+))
+
+
+async def get_post_view_metrics() -> dict:
+    """浏览计数缓冲与刷写任务指标"""
+    return {
+        "buffer": await _post_view_buffer.stats(),
+        "flush": _post_view_flush_task.stats()
+    }
+
+
+# ============ 帖子热度 ============
+
+# 点赞、回复与浏览写回在同一语句中标记帖子（hot_score_dirty_at），后台任务分批重算被标记的帖子；
+# 标记持久化在数据库中，重启不会丢失，关闭时在浏览数最后一次写回之后再运行一次
+HOT_SCORE_REFRESH_INTERVAL = 60
+HOT_SCORE_REFRESH_BATCH = 1000
+HOT_SCORE_REFRESH_MAX_BATCHES = 20
+
+
+async def refresh_hot_scores() -> int:
+    """重算被标记帖子的热度得分"""
+    total = 0
+    async with database_adapter_context() as db:
+        for _ in range(HOT_SCORE_REFRESH_MAX_BATCHES):
+            refreshed = await forum_repo.refresh_hot_scores(db, HOT_SCORE_REFRESH_BATCH)
+            total += refreshed
+            if refreshed < HOT_SCORE_REFRESH_BATCH:
+                break
+    return total
+
+
+# 注册顺序在 forum_post_views_flush 之后，关闭时按注册顺序停止
+register_periodic_task(PeriodicTask(
+    name="forum_hot_score_refresh",
+    interval=HOT_SCORE_REFRESH_INTERVAL,
+    func=refresh_hot_scores,
+    run_on_shutdown=True
+))
 
 
 # ============ 帖子服务 ============
@@ -21,9 +145,16 @@ async def get_posts(
     tag: Optional[str] = None,
     author_id: Optional[UUID] = None,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    include_total: bool = True,
+    viewer_id: Optional[UUID] = None,
+    sort: str = "latest"
 ):
-    """获取帖子列表"""
+    """获取帖子列表
+
+    include_total=False 时不统计总数，多取一行判断是否还有下一页（has_more）；
+    传入 viewer_id 时批量标注当前用户是否已点赞；sort=hot 按热度排序
+    """
     from apps.schemas.forum import ForumPostListResponse
 
     posts = await forum_repo.get_posts(
@@ -31,26 +162,50 @@ async def get_posts(
         category=category,
         tag=tag,
         author_id=author_id,
-        limit=limit,
-        offset=offset
+        limit=limit if include_total else limit + 1,
+        offset=offset,
+        sort=sort
     )
 
     # 计算分页信息
-    total = await forum_repo.count_posts(db, category, tag, author_id)
+    if include_total:
+        total = await count_posts_cached(db, category, tag, author_id)
+        has_more = offset + len(posts) < total
+    else:
+        total = None
+        has_more = len(posts) > limit
+        posts = posts[:limit]
+
+    if viewer_id:
+        liked = await forum_repo.get_liked_post_ids(db, viewer_id, [post.id for post in posts])
+        for post in posts:
+            post.liked_by_me = post.id in liked
+
     page = (offset // limit) + 1
     page_size = len(posts)
 
     return ForumPostListResponse(
         posts=posts,
         total=total,
+        has_more=has_more,
         page=page,
         page_size=page_size
     )
 
 
-async def get_post_by_id(db: DatabaseAdapter, post_id: UUID) -> Optional[Post]:
-    """根据ID获取帖子"""
-    return await forum_repo.get_post_by_id(db, post_id)
+async def get_post_by_id(db: DatabaseAdapter, post_id: UUID, record_view: bool = False) -> Optional[Post]:
+    """根据ID获取帖子；record_view 为真时计入一次浏览，返回值包含尚未写回的浏览增量
+
+    浏览计数仅供参考，计数缓冲（如 Redis）不可用时只记录日志，仍正常返回帖子。
+    """
+    post = await forum_repo.get_post_by_id(db, post_id)
+    if post and record_view:
+        try:
+            await record_post_view(post_id)
+            post.views_count += await get_pending_post_views(post_id)
+        except Exception as e:
+            logger.warning(f"帖子浏览计数失败 {post_id}: {e}")
+    return post
 
 
 async def create_post(
@@ -59,7 +214,10 @@ async def create_post(
     author_id: UUID
 ) -> Optional[Post]:
     """创建帖子"""
-    return await forum_repo.create_post(db, post_data, author_id)
+    post = await forum_repo.create_post(db, post_data, author_id)
+    if post:
+        invalidate_post_counts()
+    return post
 
 
 async def update_post(
@@ -69,12 +227,20 @@ async def update_post(
     author_id: UUID
 ) -> Optional[Post]:
     """更新帖子"""
-    return await forum_repo.update_post(db, post_id, post_data, author_id)
+    post = await forum_repo.update_post(db, post_id, post_data, author_id)
+    if post:
+        # 分类或标签可能变化
+        invalidate_post_counts()
+    return post
 
 
 async def delete_post(db: DatabaseAdapter, post_id: UUID, author_id: UUID) -> bool:
     """删除帖子"""
-    return await forum_repo.delete_post(db, post_id, author_id)
+    success = await forum_repo.delete_post(db, post_id, author_id)
+    if success:
+        invalidate_post_counts()
+        invalidate_reply_tree(post_id)
+    return success
 
 
 async def get_posts_by_author(db: DatabaseAdapter, author_id: UUID) -> List[Post]:
@@ -82,13 +248,151 @@ async def get_posts_by_author(db: DatabaseAdapter, author_id: UUID) -> List[Post
     return await forum_repo.get_posts_by_author(db, author_id)
 
 
+# ============ 帖子搜索 ============
+
+# 中日韩统一表意文字按二元组建索引（见 forum_search_ngrams），其余按单词前缀匹配
+_CJK_RUN = "\u4e00-\u9fff"
+_SEARCH_TERM_PATTERN = re.compile(f"[{_CJK_RUN}]+|[^\\W{_CJK_RUN}]+")
+SEARCH_SNIPPET_LENGTH = 120
+
+
+def _extract_search_terms(q: str) -> List[str]:
+    return [term.lower() for term in _SEARCH_TERM_PATTERN.findall(q)][:16]
+
+
+def _lexeme(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def build_search_tsquery(terms: List[str]) -> Optional[str]:
+    """将搜索词转换为 to_tsquery('simple', ...) 查询串
+
+    汉字串拆为相邻二元组并以 <-> 连接；单个汉字与其他单词使用前缀匹配
+    """
+    clauses = []
+    for term in terms:
+        if re.fullmatch(f"[{_CJK_RUN}]+", term) and len(term) > 1:
+            bigrams = [_lexeme(term[i:i + 2]) for i in range(len(term) - 1)]
+            clauses.append("(" + " <-> ".join(bigrams) + ")")
+        else:
+            clauses.append(_lexeme(term) + ":*")
+    return " & ".join(clauses) if clauses else None
+
+
+def _highlight(text: str, terms: List[str]) -> str:
+    """转义 HTML 并以 <mark> 标记命中词"""
+    escaped = html.escape(text)
+    if not terms:
+        return escaped
+    pattern = re.compile("|".join(re.escape(html.escape(t)) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    return pattern.sub(lambda m: f"<mark>{m.group(0)}</mark>", escaped)
+
+
+def _snippet(content: str, terms: List[str]) -> str:
+    """截取首个命中位置附近的内容片段"""
+    lowered = content.lower()
+    positions = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+    start = max(min(positions) - SEARCH_SNIPPET_LENGTH // 4, 0) if positions else 0
+    fragment = content[start:start + SEARCH_SNIPPET_LENGTH]
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + SEARCH_SNIPPET_LENGTH < len(content) else ""
+    return prefix + _highlight(fragment, terms) + suffix
+
+
+def _encode_search_cursor(rank: float, post_id: UUID) -> str:
+    raw = json.dumps([rank, str(post_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_search_cursor(cursor: str) -> Tuple[float, UUID]:
+    try:
+        rank, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(rank), UUID(post_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+async def search_posts(
+    db: DatabaseAdapter,
+    q: str,
+    category: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> ForumSearchResponse:
+    """全文搜索帖子，按相关度排序并高亮命中词"""
+    terms = _extract_search_terms(q)
+    tsquery = build_search_tsquery(terms)
+    if not tsquery:
+        return ForumSearchResponse()
+
+    after_rank, after_id = _decode_search_cursor(cursor) if cursor else (None, None)
+    rows = await forum_repo.search_posts(
+        db, tsquery, category, limit + 1, after_rank, after_id
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    hits = [
+        ForumSearchHit(
+            **row,
+            title_highlight=_highlight(row["title"], terms),
+            snippet=_snippet(row["content"], terms)
+        )
+        for row in rows
+    ]
+    next_cursor = _encode_search_cursor(rows[-1]["rank"], rows[-1]["id"]) if has_more else None
+    return ForumSearchResponse(posts=hits, next_cursor=next_cursor, has_more=has_more)
+
+
+# ============ 回复树缓存 ============
+
+# 按帖子缓存序列化后的回复树；回复增删改时失效，点赞数变化最多滞后一个 TTL
+REPLY_TREE_CACHE_TTL = 60
+_reply_tree_cache = TTLCache(ttl=REPLY_TREE_CACHE_TTL, maxsize=512)
+
+
+def invalidate_reply_tree(post_id: UUID) -> None:
+    """帖子回复变化后清除该帖的回复树缓存"""
+    _reply_tree_cache.delete(post_id)
+
+
+def _build_reply_tree(post_id: UUID, rows: List[dict]) -> ForumReplyTree:
+    """按先序排列的行组装嵌套结构"""
+    nodes = {}
+    roots: List[ForumReplyTreeNode] = []
+    for row in rows:
+        node = ForumReplyTreeNode(**row)
+        nodes[node.id] = node
+        parent = nodes.get(row["parent_reply_id"])
+        if parent is not None:
+            parent.children.append(node)
+        else:
+            roots.append(node)
+    return ForumReplyTree(post_id=post_id, total=len(rows), replies=roots)
+
+
+async def get_reply_tree_body(db: DatabaseAdapter, post_id: UUID) -> bytes:
+    """获取帖子回复树的 JSON 响应体（GeneralResponse 包装），优先读取缓存"""
+    body = _reply_tree_cache.get(post_id)
+    if body is None:
+        rows = await forum_repo.get_reply_tree_rows(db, post_id)
+        tree = _build_reply_tree(post_id, rows)
+        body = GeneralResponse[ForumReplyTree](data=tree).model_dump_json(by_alias=True).encode("utf-8")
+        _reply_tree_cache.set(post_id, body)
+    return body
+
+
 # ============ 评论服务 ============
 
 async def get_post_replies(
     db: DatabaseAdapter,
     post_id: UUID,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    viewer_id: Optional[UUID] = None
 ):
     """获取帖子的回复列表"""
     from apps.schemas.forum import ForumReplyListResponse
@@ -97,6 +401,11 @@ async def get_post_replies(
         db, post_id, limit, offset
     )
 
+    if viewer_id:
+        liked = await forum_repo.get_liked_reply_ids(db, viewer_id, [reply.id for reply in replies])
+        for reply in replies:
+            reply.liked_by_me = reply.id in liked
+
     # 计算分页信息
     total = await forum_repo.count_post_replies(db, post_id)
     page = (offset // limit) + 1
@@ -117,9 +426,12 @@ async def create_reply(
     author_id: UUID
 ) -> Optional[Comment]:
     """创建回复"""
-    return await forum_repo.create_reply(
+    reply = await forum_repo.create_reply(
         db, post_id, reply_data, author_id
     )
+    if reply:
+        invalidate_reply_tree(post_id)
+    return reply
 
 
 async def update_reply(
@@ -129,9 +441,12 @@ async def update_reply(
     author_id: UUID
 ) -> Optional[Comment]:
     """更新回复"""
-    return await forum_repo.update_reply(
+    reply = await forum_repo.update_reply(
         db, reply_id, reply_data, author_id
     )
+    if reply:
+        invalidate_reply_tree(reply.post_id)
+    return reply
 
 
 async def delete_reply(
@@ -140,7 +455,11 @@ async def delete_reply(
     author_id: UUID
 ) -> bool:
     """删除回复"""
-    return await forum_repo.delete_reply(db, reply_id, author_id)
+    post_id = await forum_repo.delete_reply_returning_post(db, reply_id, author_id)
+    if post_id is None:
+        return False
+    invalidate_reply_tree(post_id)
+    return True
 
 
 async def get_comments_by_author(db: DatabaseAdapter, author_id: UUID) -> List[Comment]:
@@ -167,4 +486,55 @@ async def like_reply(db: DatabaseAdapter, reply_id: UUID, user_id: UUID):
 
 async def unlike_reply(db: DatabaseAdapter, reply_id: UUID, user_id: UUID) -> bool:
     """取消点赞回复"""
-    return await forum_repo.unlike_reply(db, reply_id, user_id)
\ No newline at end of file
+    return await forum_repo.unlike_reply(db, reply_id, user_id)
+
+
+async def apply_like_batch(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    items: List[LikeBatchItem]
+) -> List[LikeBatchItemResult]:
+    """按期望状态批量点赞/取消点赞（幂等），同一目标以最后一项为准
+
+    每类目标的点赞与取消各一条语句，在同一事务内完成
+    """
+    final_state = {}
+    for item in items:
+        final_state[(item.target_type, item.target_id)] = item.liked
+
+    changed = set()
+    async with db.transaction():
+        for target_type in ("post", "reply"):
+            to_like = [tid for (ttype, tid), liked in final_state.items() if ttype == target_type and liked]
+            to_unlike = [tid for (ttype, tid), liked in final_state.items() if ttype == target_type and not liked]
+            for target_id in await forum_repo.add_likes(db, user_id, target_type, to_like):
+                changed.add((target_type, target_id))
+            for target_id in await forum_repo.remove_likes(db, user_id, target_type, to_unlike):
+                changed.add((target_type, target_id))
+
+    return [
+        LikeBatchItemResult(
+            target_type=target_type,
+            target_id=target_id,
+            liked=liked,
+            changed=(target_type, target_id) in changed
+        )
+        for (target_type, target_id), liked in final_state.items()
+    ]
+
+
+async def get_liked_ids(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    post_ids: List[UUID],
+    reply_ids: List[UUID]
+):
+    """批量查询当前用户在一页帖子/回复中的点赞状态"""
+    from apps.schemas.forum import LikedIds
+
+    liked_posts = await forum_repo.get_liked_post_ids(db, user_id, post_ids)
+    liked_replies = await forum_repo.get_liked_reply_ids(db, user_id, reply_ids)
+    return LikedIds(
+        post_ids=[post_id for post_id in post_ids if post_id in liked_posts],
+        reply_ids=[reply_id for reply_id in reply_ids if reply_id in liked_replies]
+    )
@@ -11,7 +11,6 @@ from apps.schemas.communication import (
 from apps.api.v1.services.communication import (
     get_messages_by_conversation,
     create_message,
-    get_conversations_by_user,
     update_message
 )
 from apps.api.v1.repositories.communication import (
@@ -69,16 +68,9 @@ async def get_conversations(
     user_id: UUID,
     limit: int = 20
 ) -> List[ConversationListItem]:
-    """获取用户的对话列表"""
-    conversations = await get_conversations_by_user(db, user_id)
-
-    # 转换为ConversationListItem格式
-    # 使用repository中的函数获取更详细的对话信息
+    """获取用户的对话列表（最后一条消息与未读数由单条查询取得）"""
     from apps.api.v1.repositories.communication import get_conversations_by_user_legacy
-    conversation_items = await get_conversations_by_user_legacy(db, user_id, limit)
-    return conversation_items
-
-    return conversation_items
+    return await get_conversations_by_user_legacy(db, user_id, limit)
 
 
 async def get_conversation_messages(
@@ -0,0 +1,185 @@
+"""
+排期服务层
+按导师的每周可用时间、不可用时段和已有会话计算可预约时段，空闲区间按导师-周缓存
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+
+from apps.api.v1.repositories import availability as availability_repo
+from apps.schemas.session import BookableSlot, UnavailablePeriodCreate, WeeklyAvailability
+from libs.cache import TTLCache
+from libs.database.adapters import DatabaseAdapter
+from libs.utils.intervals import Interval, free_intervals, split_slots
+
+MAX_RANGE_DAYS = 62
+
+# 键为 (mentor_id, 周一日期)，值为该周（UTC 周一 00:00 起 7 天）的空闲区间；
+# 写路径主动失效，预约冲突最终由排他约束兜底
+WEEK_CACHE_TTL = 300
+_week_cache = TTLCache(ttl=WEEK_CACHE_TTL, maxsize=20000)
+
+
+def _week_start(at: datetime) -> date:
+    day = at.astimezone(timezone.utc).date()
+    return day - timedelta(days=day.weekday())
+
+
+def _week_bounds(monday: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(monday, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=7)
+
+
+def _weekly_windows(availability: List[Dict], start: datetime, end: datetime) -> List[Interval]:
+    """将每周可用时间展开为 [start, end) 内的具体区间（day_of_week 0 = 周日，UTC）"""
+    windows: List[Interval] = []
+    by_day = {row["day_of_week"]: row for row in availability}
+    # 前一天的跨日窗口可能延伸到 start 之后
+    day = start.date() - timedelta(days=1)
+    while day < end.date() + timedelta(days=1):
+        row = by_day.get((day.weekday() + 1) % 7)
+        if row:
+            window_start = datetime.combine(day, row["start_time"], tzinfo=timezone.utc)
+            window_end = datetime.combine(day, row["end_time"], tzinfo=timezone.utc)
+            if window_end <= window_start:
+                window_end += timedelta(days=1)
+            windows.append((max(window_start, start), min(window_end, end)))
+        day += timedelta(days=1)
+    return [(s, e) for s, e in windows if s < e]
+
+
+async def _load_free_weeks(db: DatabaseAdapter, mentor_id: UUID, mondays: List[date]) -> None:
+    """一次查询覆盖所有未缓存的周，逐周计算空闲区间并写入缓存"""
+    span_start, _ = _week_bounds(min(mondays))
+    _, span_end = _week_bounds(max(mondays))
+
+    availability = await availability_repo.get_weekly_availability(db, mentor_id)
+    blocked = await availability_repo.get_unavailable_periods(db, mentor_id, span_start, span_end)
+    booked = await availability_repo.get_booked_ranges(db, mentor_id, span_start, span_end)
+    busy = [(row["start_datetime"], row["end_datetime"]) for row in blocked]
+    busy += [(row["scheduled_at"], row["ends_at"]) for row in booked]
+
+    for monday in mondays:
+        week_start, week_end = _week_bounds(monday)
+        windows = _weekly_windows(availability, week_start, week_end)
+        week_busy = [(s, e) for s, e in busy if s < week_end and e > week_start]
+        _week_cache.set((str(mentor_id), monday), free_intervals(windows, week_busy))
+
+
+async def get_free_intervals(
+    db: DatabaseAdapter,
+    mentor_id: UUID,
+    start: datetime,
+    end: datetime
+) -> List[Interval]:
+    """导师在 [start, end) 内的空闲区间"""
+    mondays = []
+    monday = _week_start(start)
+    while _week_bounds(monday)[0] < end:
+        mondays.append(monday)
+        monday += timedelta(days=7)
+
+    missing = [m for m in mondays if _week_cache.get((str(mentor_id), m)) is None]
+    if missing:
+        await _load_free_weeks(db, mentor_id, missing)
+
+    intervals: List[Interval] = []
+    for monday in mondays:
+        intervals.extend(_week_cache.get((str(mentor_id), monday)) or [])
+    clipped = [(max(s, start), min(e, end)) for s, e in intervals]
+    # 再做一次扫描，合并跨周边界相接的区间
+    return free_intervals(clipped, [])
+
+
+async def get_bookable_slots(
+    db: DatabaseAdapter,
+    mentor_id: UUID,
+    start: datetime,
+    end: datetime,
+    duration_minutes: int = 60,
+    step_minutes: int = 30
+) -> List[BookableSlot]:
+    """计算导师在时间范围内可预约的固定时长时段（不含已过去的时间）
+
+    时段起点以空闲区间的起点（可用窗口开始或前一占用结束）为基准按 step 排列，
+    查询起点与当前时间只用于过滤，不会平移时段网格。
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="结束时间必须晚于开始时间")
+    if end - start > timedelta(days=MAX_RANGE_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"查询范围不能超过 {MAX_RANGE_DAYS} 天"
+        )
+
+    not_before = max(start, datetime.now(timezone.utc))
+    if end <= not_before:
+        return []
+
+    # 从当天 UTC 零点取空闲区间，使区间起点不被查询起点或当前时间截断
+    grid_start = datetime.combine(not_before.astimezone(timezone.utc).date(), time.min, tzinfo=timezone.utc)
+    free = await get_free_intervals(db, mentor_id, grid_start, end)
+    slots = split_slots(free, timedelta(minutes=duration_minutes), timedelta(minutes=step_minutes))
+    return [BookableSlot(start=s, end=e) for s, e in slots if s >= not_before]
+
+
+def invalidate_mentor_weeks(
+    mentor_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> int:
+    """失效导师的周缓存；不指定范围时失效该导师的全部周"""
+    key_prefix = str(mentor_id)
+    if start is None or end is None:
+        return _week_cache.delete_where(lambda key: key[0] == key_prefix)
+    first, last = _week_start(start), _week_start(end)
+    return _week_cache.delete_where(lambda key: key[0] == key_prefix and first <= key[1] <= last)
+
+
+# ============ 可用时间维护 ============
+
+async def get_weekly_availability(db: DatabaseAdapter, user_id: UUID) -> List[Dict]:
+    """获取每周可用时间"""
+    return await availability_repo.get_weekly_availability(db, user_id)
+
+
+async def replace_weekly_availability(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    items: List[WeeklyAvailability]
+) -> List[Dict]:
+    """整体替换每周可用时间，同一天只能有一个时间段"""
+    days = [item.day_of_week for item in items]
+    if len(days) != len(set(days)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="同一天只能设置一个可用时间段")
+    rows = await availability_repo.replace_weekly_availability(db, user_id, items)
+    invalidate_mentor_weeks(user_id)
+    return rows
+
+
+async def create_unavailable_period(
+    db: DatabaseAdapter,
+    user_id: UUID,
+    period_in: UnavailablePeriodCreate
+) -> Optional[Dict]:
+    """新增不可用时段"""
+    if period_in.end_datetime <= period_in.start_datetime:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="结束时间必须晚于开始时间")
+    period = await availability_repo.create_unavailable_period(db, user_id, period_in)
+    invalidate_mentor_weeks(user_id, period_in.start_datetime, period_in.end_datetime)
+    return period
+
+
+async def delete_unavailable_period(db: DatabaseAdapter, period_id: UUID, user_id: UUID) -> bool:
+    """删除不可用时段"""
+    period = await availability_repo.delete_unavailable_period(db, period_id, user_id)
+    if not period:
+        return False
+    invalidate_mentor_weeks(user_id, period["start_datetime"], period["end_datetime"])
+    return True
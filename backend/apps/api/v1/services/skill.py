@@ -2,20 +2,118 @@
 技能中心 - 服务层
 提供技能分类、技能、用户技能和导师技能的业务逻辑
 """
-from typing import List, Optional
+import asyncio
+import csv
+import hashlib
+import io
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 from uuid import UUID
 from fastapi import HTTPException, status
+from pydantic import ValidationError
 
 from apps.schemas.skill import (
     SkillCategory, SkillCategoryCreate, SkillCategoryUpdate,
     Skill, SkillCreate, SkillUpdate,
     UserSkill, UserSkillCreate, UserSkillUpdate,
-    MentorSkill, MentorSkillCreate, MentorSkillUpdate
+    MentorSkill, MentorSkillCreate, MentorSkillUpdate,
+    SkillTaxonomy, SkillTaxonomyCategory, SkillTaxonomyItem,
+    UserSkillImportItem, UserSkillImportRowResult, UserSkillImportResult
 )
+from apps.schemas.token import AuthenticatedUser
+from apps.schemas.common import GeneralResponse
 from apps.api.v1.repositories import skill as skill_repo
 from libs.database.adapters import DatabaseAdapter
 
 
+# ============ 技能分类快照 ============
+
+# 快照最长存活时间（秒）：多进程部署时其他 worker 的写入无法递增本进程代数，
+# 到期后强制重建以保证最终一致
+TAXONOMY_SNAPSHOT_MAX_AGE = 300
+
+
+@dataclass(frozen=True)
+class TaxonomySnapshot:
+    """预序列化的技能分类快照
+
+    generation 为本进程的失效代数，只用于判断是否需要重建，不出现在响应中
+    """
+    generation: int
+    body: bytes
+    etag: str
+    built_at: float
+
+
+_taxonomy_generation = 1
+_taxonomy_snapshot: Optional[TaxonomySnapshot] = None
+_taxonomy_lock = asyncio.Lock()
+
+
+def bump_taxonomy_generation() -> int:
+    """技能或分类发生写入后递增本进程的快照代数，下次读取时重建"""
+    global _taxonomy_generation
+    _taxonomy_generation += 1
+    return _taxonomy_generation
+
+
+def _is_snapshot_fresh(snapshot: Optional[TaxonomySnapshot]) -> bool:
+    return (
+        snapshot is not None
+        and snapshot.generation == _taxonomy_generation
+        and time.monotonic() - snapshot.built_at < TAXONOMY_SNAPSHOT_MAX_AGE
+    )
+
+
+async def _build_taxonomy_snapshot(db: DatabaseAdapter, generation: int) -> TaxonomySnapshot:
+    """查询分类树并序列化为 JSON 字节；版本取分类内容哈希，ETag 取响应体字节哈希"""
+    rows = await skill_repo.get_skill_taxonomy_rows(db)
+
+    categories: List[SkillTaxonomyCategory] = []
+    for row in rows:
+        if not categories or categories[-1].id != row["category_id"]:
+            categories.append(SkillTaxonomyCategory(
+                id=row["category_id"],
+                name=row["category_name"],
+                description=row["category_description"]
+            ))
+        if row["skill_id"] is not None:
+            categories[-1].skills.append(SkillTaxonomyItem(id=row["skill_id"], name=row["skill_name"]))
+
+    # 版本与 ETag 都只由数据决定：各 worker 数据一致时响应体与 ETag 逐字节一致
+    content_hash = hashlib.sha256(
+        "".join(category.model_dump_json() for category in categories).encode("utf-8")
+    ).hexdigest()
+
+    body = GeneralResponse[SkillTaxonomy](
+        data=SkillTaxonomy(version=content_hash[:32], categories=categories)
+    ).model_dump_json().encode("utf-8")
+
+    return TaxonomySnapshot(
+        generation=generation,
+        body=body,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        built_at=time.monotonic()
+    )
+
+
+async def get_skill_taxonomy_snapshot(db: DatabaseAdapter) -> TaxonomySnapshot:
+    """获取技能分类快照；版本未变化时直接返回内存中的预序列化结果"""
+    global _taxonomy_snapshot
+
+    snapshot = _taxonomy_snapshot
+    if _is_snapshot_fresh(snapshot):
+        return snapshot
+
+    async with _taxonomy_lock:
+        # 等待锁期间可能已由其他请求重建
+        if _is_snapshot_fresh(_taxonomy_snapshot):
+            return _taxonomy_snapshot
+        _taxonomy_snapshot = await _build_taxonomy_snapshot(db, _taxonomy_generation)
+        return _taxonomy_snapshot
+
+
 # ============ 技能分类服务 ============
 
 async def get_skill_categories(db: DatabaseAdapter, is_active: Optional[bool] = True, skip: int = 0, limit: int = 50) -> List[SkillCategory]:
@@ -44,6 +142,7 @@ async def create_skill_category(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="创建技能分类失败"
         )
+    bump_taxonomy_generation()
     return SkillCategory(**result)
 
 
@@ -54,9 +153,19 @@ async def update_skill_category(
 ) -> Optional[SkillCategory]:
     """更新技能分类"""
     result = await skill_repo.update_skill_category(db, category_id, category_data)
+    if result:
+        bump_taxonomy_generation()
     return SkillCategory(**result) if result else None
 
 
+async def delete_skill_category(db: DatabaseAdapter, category_id: UUID) -> bool:
+    """删除技能分类"""
+    success = await skill_repo.delete_skill_category(db, category_id)
+    if success:
+        bump_taxonomy_generation()
+    return success
+
+
 # ============ 技能服务 ============
 
 async def get_skills(
@@ -97,6 +206,7 @@ async def create_skill(db: DatabaseAdapter, skill_data: SkillCreate) -> Skill:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="创建技能失败"
         )
+    bump_taxonomy_generation()
     return Skill(**result)
 
 
@@ -107,9 +217,19 @@ async def update_skill(
 ) -> Optional[Skill]:
     """更新技能"""
     result = await skill_repo.update_skill(db, skill_id, skill_data)
+    if result:
+        bump_taxonomy_generation()
     return Skill(**result) if result else None
 
 
+async def delete_skill(db: DatabaseAdapter, skill_id: UUID) -> bool:
+    """删除技能"""
+    success = await skill_repo.delete_skill(db, skill_id)
+    if success:
+        bump_taxonomy_generation()
+    return success
+
+
 async def search_skills(db: DatabaseAdapter, query: str, limit: int = 20) -> List[Skill]:
     """搜索技能"""
     skills = await skill_repo.search_skills(db, query, limit)
@@ -209,6 +329,95 @@ async def verify_user_skill(
     return UserSkill(**result)
 
 
+# ============ 用户技能批量导入 ============
+
+# 单次导入的最大行数
+USER_SKILL_IMPORT_MAX_ROWS = 10000
+
+_IMPORT_STATUS_ERRORS = {
+    "user_not_found": "用户不存在",
+    "skill_not_found": "技能不存在",
+    "duplicate": "与同批次后续行重复，已忽略",
+    "skipped": "用户已拥有该技能，未覆盖",
+}
+
+# (行号, 解析后的记录, 解析错误)
+ImportEntry = Tuple[int, Optional[UserSkillImportItem], Optional[str]]
+
+
+def parse_user_skill_import_csv(content: str) -> List[ImportEntry]:
+    """解析 CSV 导入内容，表头需包含 skill_id，可选 user_id/proficiency_level/years_experience"""
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or "skill_id" not in reader.fieldnames:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV 缺少 skill_id 列"
+        )
+
+    entries: List[ImportEntry] = []
+    for row_no, row in enumerate(reader, start=1):
+        values = {key: value.strip() for key, value in row.items() if key and value and value.strip()}
+        try:
+            entries.append((row_no, UserSkillImportItem(**values), None))
+        except ValidationError as e:
+            entries.append((row_no, None, "; ".join(err["msg"] for err in e.errors())))
+    return entries
+
+
+async def import_user_skills(
+    db: DatabaseAdapter,
+    entries: List[ImportEntry],
+    current_user: AuthenticatedUser,
+    update_existing: bool = True
+) -> UserSkillImportResult:
+    """批量导入用户技能，返回逐行结果"""
+    if not entries:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="导入内容为空"
+        )
+    if len(entries) > USER_SKILL_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"单次最多导入 {USER_SKILL_IMPORT_MAX_ROWS} 行"
+        )
+
+    results = {}
+    records = []
+    for row_no, item, error in entries:
+        if item is None:
+            results[row_no] = UserSkillImportRowResult(row=row_no, status="invalid", error=error)
+            continue
+        user_id = item.user_id or current_user.id
+        if user_id != current_user.id and current_user.role != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"第 {row_no} 行：只能为自己导入技能"
+            )
+        records.append((row_no, user_id, item.skill_id, item.proficiency_level, item.years_experience))
+
+    if records:
+        rows = await skill_repo.bulk_import_user_skills(db, records, update_existing)
+        for row in rows:
+            results[row["row_no"]] = UserSkillImportRowResult(
+                row=row["row_no"],
+                status=row["status"],
+                user_skill_id=row["user_skill_id"],
+                error=_IMPORT_STATUS_ERRORS.get(row["status"])
+            )
+
+    rows = [results[row_no] for row_no in sorted(results)]
+    created = sum(1 for row in rows if row.status == "created")
+    updated = sum(1 for row in rows if row.status == "updated")
+    return UserSkillImportResult(
+        total=len(rows),
+        created=created,
+        updated=updated,
+        failed=len(rows) - created - updated,
+        rows=rows
+    )
+
+
 # ============ 导师技能服务 ============
 
 async def get_mentor_skills_by_user(
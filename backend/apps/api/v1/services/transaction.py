@@ -2,17 +2,19 @@
 交易 & 金融 - 服务层
 提供订单、钱包和交易管理的业务逻辑
 """
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 from decimal import Decimal
 
 from apps.schemas.transaction import (
     Order, OrderCreate, OrderUpdate,
     UserWallet, UserWalletCreate, UserWalletUpdate,
-    WalletTransaction, WalletTransactionCreate
+    WalletTransaction, WalletTransactionCreate, WalletAudit
 )
 from apps.api.v1.repositories import transaction as transaction_repo
 from libs.database.adapters import DatabaseAdapter
+from libs.database.connection import database_adapter_context
+from libs.tasks import PeriodicTask, register_periodic_task
 
 
 # ============ 订单服务 ============
@@ -79,14 +81,7 @@ async def deposit(
     amount: Decimal
 ) -> Optional[WalletTransaction]:
     """充值"""
-    # 创建充值交易记录
-    transaction_data = WalletTransactionCreate(
-        wallet_id=await get_wallet_id_by_user(db, user_id),
-        amount=amount,
-        transaction_type="deposit",
-        description="充值"
-    )
-    return await create_wallet_transaction(db, transaction_data)
+    return await transaction_repo.apply_wallet_movement(db, user_id, amount, "deposit", "充值")
 
 
 async def withdraw(
@@ -94,20 +89,9 @@ async def withdraw(
     user_id: UUID,
     amount: Decimal
 ) -> Optional[WalletTransaction]:
-    """提现"""
-    # 检查余额是否足够
-    wallet = await get_user_wallet(db, user_id)
-    if not wallet or wallet.balance < amount:
-        return None
-
-    # 创建提现交易记录
-    transaction_data = WalletTransactionCreate(
-        wallet_id=await get_wallet_id_by_user(db, user_id),
-        amount=-amount,  # 提现为负数
-        transaction_type="withdraw",
-        description="提现"
-    )
-    return await create_wallet_transaction(db, transaction_data)
+    """提现（余额不足时返回 None）"""
+    # 提现为负数，余额条件在扣款语句中校验
+    return await transaction_repo.apply_wallet_movement(db, user_id, -amount, "withdrawal", "提现")
 
 
 async def get_wallet_id_by_user(db: DatabaseAdapter, user_id: UUID) -> UUID:
@@ -130,17 +114,46 @@ async def get_wallet_transactions(
     )
 
 
+async def audit_wallet(db: DatabaseAdapter, user_id: UUID) -> Optional[WalletAudit]:
+    """核对用户钱包余额，只重放最近检查点之后的流水"""
+    row = await transaction_repo.audit_wallet(db, user_id)
+    return WalletAudit(**row) if row else None
+
+
+# 余额检查点：每轮按钱包ID分页扫描全部钱包，只为有新流水的钱包写入
+WALLET_CHECKPOINT_INTERVAL = 6 * 3600
+WALLET_CHECKPOINT_BATCH = 500
+
+
+async def create_wallet_checkpoints() -> int:
+    """为自上次检查点以来有新流水的钱包记录余额检查点"""
+    total = 0
+    after_wallet_id = None
+    async with database_adapter_context() as db:
+        while True:
+            created, after_wallet_id = await transaction_repo.create_wallet_checkpoints(
+                db, after_wallet_id, WALLET_CHECKPOINT_BATCH
+            )
+            total += created
+            if after_wallet_id is None:
+                break
+    return total
+
+
+register_periodic_task(PeriodicTask(
+    name="wallet_balance_checkpoints",
+    interval=WALLET_CHECKPOINT_INTERVAL,
+    func=create_wallet_checkpoints
+))
+
+
 async def create_wallet_transaction(
     db: DatabaseAdapter,
-    transaction_data: WalletTransactionCreate
+    transaction_data: WalletTransactionCreate,
+    user_id: Optional[UUID] = None
 ) -> Optional[WalletTransaction]:
-    """创建钱包交易记录"""
-    # 更新钱包余额
-    await update_wallet_balance_by_transaction(
-        db, transaction_data.wallet_id, transaction_data.amount
-    )
-
-    return await transaction_repo.create_wallet_transaction(db, transaction_data)
+    """创建钱包交易记录（余额变动与流水在同一条语句中完成；指定 user_id 时仅限本人钱包）"""
+    return await transaction_repo.create_wallet_transaction(db, transaction_data, user_id)
 
 
 async def update_wallet_balance_by_transaction(
@@ -177,13 +190,47 @@ async def get_financial_stats(db: DatabaseAdapter, user_id: UUID) -> dict:
     return await transaction_repo.get_financial_stats(db, user_id)
 
 
+# 日汇总对账：写入路径已增量维护，这里定期按源表重算最近窗口修正偏差
+FINANCIAL_ROLLUP_RECONCILE_INTERVAL = 3600
+FINANCIAL_ROLLUP_RECONCILE_DAYS = 2
+
+
+async def reconcile_financial_rollup() -> int:
+    """重算最近窗口内的用户财务日汇总"""
+    async with database_adapter_context() as db:
+        return await transaction_repo.reconcile_financial_rollup(db, FINANCIAL_ROLLUP_RECONCILE_DAYS)
+
+
+register_periodic_task(PeriodicTask(
+    name="financial_rollup_reconcile",
+    interval=FINANCIAL_ROLLUP_RECONCILE_INTERVAL,
+    func=reconcile_financial_rollup
+))
+
+
 async def pay_order(
     db: DatabaseAdapter,
     order_id: UUID,
     user_id: UUID
-) -> tuple[bool, str]:
-    """支付订单"""
-    return await transaction_repo.pay_order(db, order_id, user_id)
+) -> Tuple[bool, str, Optional[Decimal]]:
+    """支付订单
+
+    Returns:
+        (是否成功, 提示信息, 支付后的钱包余额)
+    """
+    result = await transaction_repo.pay_order(db, order_id, user_id)
+    if not result:
+        return False, "订单不存在", None
+    if result["paid"]:
+        return True, "支付成功", result["balance"]
+
+    if result["status"] != 'pending':
+        return False, f"订单状态为 {result['status']}，无法支付", None
+    if result["mentor_id"] == user_id:
+        return False, "不能购买自己的服务", None
+    if result["current_balance"] is None:
+        return False, "用户钱包不存在", None
+    return False, f"钱包余额不足，当前余额: {result['current_balance']}", result["current_balance"]
 
 
 async def recharge_wallet(
@@ -6,9 +6,13 @@ from typing import List, Optional, Dict, Any
 from uuid import UUID
 from fastapi import HTTPException, status
 
-from apps.schemas.user_credit_logs import CreditTransaction, CreditBalance, CreditStats
+from apps.schemas.user_credit_logs import (
+    CreditTransaction, CreditBalance, CreditStats, CreditAwardBatchRequest, CreditAwardResult
+)
 from apps.api.v1.repositories import user_credit_logs as credit_repo
 from libs.database.adapters import DatabaseAdapter
+from libs.database.connection import database_adapter_context
+from libs.tasks import PeriodicTask, register_periodic_task
 
 
 async def get_user_credit_balance(db: DatabaseAdapter, user_id: UUID) -> CreditBalance:
@@ -34,9 +38,59 @@ async def award_credits(db: DatabaseAdapter, transaction: CreditTransaction) ->
     return result is not None
 
 
+async def award_credits_batch(db: DatabaseAdapter, request: CreditAwardBatchRequest) -> List[CreditAwardResult]:
+    """
+    批量发放积分（活动奖励），一次调用完成全部用户的入账与日志
+    """
+    rows = await credit_repo.award_credits_batch(
+        db, request.point_type, request.items, request.description,
+        request.campaign_id, request.expires_at
+    )
+    results = []
+    for row in rows:
+        if row["awarded"]:
+            status_text = "awarded"
+        elif not row["user_exists"]:
+            status_text = "user_not_found"
+        else:
+            status_text = "duplicate"
+        results.append(CreditAwardResult(
+            user_id=row["user_id"],
+            status=status_text,
+            amount=row["amount"],
+            balance_after=row["balance_after"]
+        ))
+    return results
+
+
 async def get_credit_stats(db: DatabaseAdapter, user_id: Optional[UUID] = None) -> CreditStats:
     """
     获取积分统计
     """
     stats = await credit_repo.get_credit_stats(db, user_id)
     return CreditStats(**stats)
+
+
+# 积分过期清扫：每批一条语句、各自提交，单次运行最多处理 BATCH * MAX_BATCHES 条发放
+CREDIT_EXPIRY_INTERVAL = 300
+CREDIT_EXPIRY_BATCH = 1000
+CREDIT_EXPIRY_MAX_BATCHES = 20
+
+
+async def expire_credits() -> int:
+    """分批处理已过期的积分发放，返回处理的发放数"""
+    total = 0
+    async with database_adapter_context() as db:
+        for _ in range(CREDIT_EXPIRY_MAX_BATCHES):
+            result = await credit_repo.expire_credits(db, CREDIT_EXPIRY_BATCH)
+            total += result["expired"]
+            if result["expired"] < CREDIT_EXPIRY_BATCH:
+                break
+    return total
+
+
+register_periodic_task(PeriodicTask(
+    name="credit_expiry_sweeper",
+    interval=CREDIT_EXPIRY_INTERVAL,
+    func=expire_credits
+))
@@ -70,8 +70,9 @@ app.add_middleware(
         "X-Requested-With",
         "X-CSRF-Token",
         "Cache-Control",
+        "If-None-Match",
     ],
-    expose_headers=["Content-Length", "X-Request-ID"],
+    expose_headers=["Content-Length", "X-Request-ID", "ETag"],
     max_age=3600,  # 预检请求缓存时间
 )
 
@@ -37,11 +37,31 @@ class Conversation(IDModel, TimestampModel, ConversationBase):
     """会话完整模型"""
 
     last_message_id: Optional[UUID] = Field(None, description="最后一条消息的ID")
+    last_message_preview: Optional[str] = Field(None, description="最后一条消息预览")
+    last_message_at: Optional[datetime] = Field(None, description="最后一条消息时间")
+    last_read_message_id: Optional[UUID] = Field(None, description="当前用户最后已读消息的ID")
+    unread_count: int = Field(0, description="当前用户未读消息数量")
+    change_seq: int = Field(0, description="对话当前变更序号，可作为增量同步的起始游标")
 
     class Config(IDModel.Config):
         from_attributes = True
 
 
+class ConversationReadRequest(BaseModel):
+    """标记已读请求"""
+
+    message_id: Optional[UUID] = Field(None, description="已读到的消息ID，为空表示已读到最新消息")
+
+
+class ConversationReadState(BaseModel):
+    """参与者已读游标"""
+
+    conversation_id: UUID = Field(..., description="会话ID")
+    last_read_message_id: Optional[UUID] = Field(None, description="最后已读消息ID")
+    last_read_at: Optional[datetime] = Field(None, description="最后已读消息的发送时间")
+    unread_count: int = Field(0, description="剩余未读消息数量")
+
+
 # ============ 会话参与者 (ConversationParticipant) ============
 class ConversationParticipantBase(BaseModel):
     """会话参与者基础模型"""
@@ -97,6 +117,20 @@ class Message(IDModel, TimestampModel, MessageBase):
         alias_generator = None
 
 
+# ============ 增量同步 (ConversationSync) ============
+class ConversationSyncResult(BaseModel):
+    """对话增量同步结果，同一实体的多次变更只保留最后状态"""
+
+    conversation_id: UUID = Field(..., description="会话ID")
+    cursor: int = Field(..., description="下次同步使用的游标")
+    has_more: bool = Field(False, description="是否还有更多变更")
+    reset: bool = Field(False, description="游标已失效，客户端需清空本地数据并从返回的游标重新开始")
+    messages: List[Message] = Field(default_factory=list, description="新增或编辑过的消息（当前内容）")
+    deleted_message_ids: List[UUID] = Field(default_factory=list, description="已删除的消息ID")
+    added_participant_ids: List[UUID] = Field(default_factory=list, description="新加入的参与者用户ID")
+    removed_participant_ids: List[UUID] = Field(default_factory=list, description="已移除的参与者用户ID")
+
+
 # ============ 会话列表项 (ConversationListItem) ============
 class ConversationListItem(BaseModel):
     """会话列表显示项"""
@@ -105,6 +139,7 @@ class ConversationListItem(BaseModel):
     last_message: Optional[str] = Field(None, description="最后一条消息内容")
     last_message_time: Optional[datetime] = Field(None, description="最后一条消息时间")
     unread_count: int = Field(0, description="未读消息数量")
+    last_read_message_id: Optional[UUID] = Field(None, description="最后已读消息ID")
     participants: List[dict] = Field(default_factory=list, description="参与者信息")
 
     class Config:
@@ -38,6 +38,8 @@ class ForumPostUpdate(BaseModel):
 class ForumPost(IDModel, TimestampModel, ForumPostBase):
     """论坛帖子完整模型"""
     views_count: int = Field(0, description="浏览次数")
+    like_count: int = Field(0, description="点赞数量")
+    liked_by_me: Optional[bool] = Field(None, description="当前用户是否已点赞（未登录时为空）")
 
     class Config(IDModel.Config):
         from_attributes = True
@@ -71,6 +73,9 @@ class PostReplyUpdate(BaseModel):
 
 class PostReply(IDModel, TimestampModel, PostReplyBase):
     """帖子回复完整模型"""
+    like_count: int = Field(0, description="点赞数量")
+    liked_by_me: Optional[bool] = Field(None, description="当前用户是否已点赞（未登录时为空）")
+
     class Config(IDModel.Config):
         from_attributes = True
 
@@ -99,6 +104,32 @@ class Like(IDModel, TimestampModel, LikeBase):
         from_attributes = True
 
 
+class LikeBatchItem(BaseModel):
+    """批量点赞操作项：liked 为期望的最终状态"""
+    target_type: str = Field(..., pattern="^(post|reply)$", description="目标类型: post/reply")
+    target_id: UUID = Field(..., description="帖子或回复ID")
+    liked: bool = Field(..., description="期望状态：true 点赞，false 取消点赞")
+
+
+class LikeBatchRequest(BaseModel):
+    """批量点赞请求（离线队列回放），同一目标以最后一项为准"""
+    items: List[LikeBatchItem] = Field(..., min_length=1, max_length=500, description="操作列表")
+
+
+class LikeBatchItemResult(BaseModel):
+    """批量点赞单项结果"""
+    target_type: str = Field(..., description="目标类型")
+    target_id: UUID = Field(..., description="目标ID")
+    liked: bool = Field(..., description="请求的最终状态")
+    changed: bool = Field(..., description="本次是否改变了状态（false 表示已是该状态或目标不存在）")
+
+
+class LikedIds(BaseModel):
+    """当前用户在给定ID中已点赞的帖子与回复"""
+    post_ids: List[UUID] = Field(default_factory=list, description="已点赞的帖子ID")
+    reply_ids: List[UUID] = Field(default_factory=list, description="已点赞的回复ID")
+
+
 # ============ 复合响应模型 ============
 class ForumPostDetail(ForumPost):
     """论坛帖子详情模型（包含作者信息）"""
@@ -118,11 +149,39 @@ class ForumReplyDetail(PostReply):
 class ForumPostListResponse(BaseModel):
     """论坛帖子列表响应"""
     posts: List[ForumPostDetail] = Field(default_factory=list, description="帖子列表")
-    total: int = Field(0, description="总数量")
+    total: Optional[int] = Field(0, description="总数量（不统计总数时为空）")
+    has_more: bool = Field(False, description="是否还有下一页")
     page: int = Field(1, description="当前页")
     page_size: int = Field(10, description="每页数量")
 
 
+class ForumReplyTreeNode(ForumReplyDetail):
+    """回复树节点"""
+    depth: int = Field(0, description="嵌套深度，根回复为0")
+    children: List["ForumReplyTreeNode"] = Field(default_factory=list, description="子回复")
+
+
+class ForumReplyTree(BaseModel):
+    """帖子完整回复树"""
+    post_id: UUID = Field(..., description="帖子ID")
+    total: int = Field(0, description="回复总数")
+    replies: List[ForumReplyTreeNode] = Field(default_factory=list, description="根回复列表")
+
+
+class ForumSearchHit(ForumPost):
+    """论坛搜索结果条目"""
+    rank: float = Field(0, description="相关度得分")
+    title_highlight: str = Field("", description="高亮后的标题（<mark> 标记，已转义 HTML）")
+    snippet: str = Field("", description="命中片段（<mark> 标记，已转义 HTML）")
+
+
+class ForumSearchResponse(BaseModel):
+    """论坛搜索响应（游标分页）"""
+    posts: List[ForumSearchHit] = Field(default_factory=list, description="搜索结果")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多结果")
+    has_more: bool = Field(False, description="是否还有下一页")
+
+
 class ForumReplyListResponse(BaseModel):
     """帖子回复列表响应"""
     replies: List[ForumReplyDetail] = Field(default_factory=list, description="回复列表")
@@ -1,7 +1,7 @@
 """
 会话中心 - 数据模型
 """
-from datetime import datetime
+from datetime import datetime, time
 from typing import Optional, List
 from uuid import UUID
 from enum import Enum
@@ -69,6 +69,39 @@ class SessionStats(BaseModel):
     cancelled_sessions: int = Field(..., description="已取消会话数")
 
 
+# ============ 可预约时段模型 ============
+class WeeklyAvailability(BaseModel):
+    """每周固定可用时间（UTC）"""
+
+    day_of_week: int = Field(..., ge=0, le=6, description="星期几（0=周日）")
+    start_time: time = Field(..., description="开始时间（UTC）")
+    end_time: time = Field(..., description="结束时间（UTC），不大于开始时间表示跨到次日")
+
+
+class UnavailablePeriodCreate(BaseModel):
+    """不可用时段创建模型"""
+
+    start_datetime: datetime = Field(..., description="开始时间")
+    end_datetime: datetime = Field(..., description="结束时间")
+    reason: Optional[str] = Field(None, description="原因")
+
+
+class UnavailablePeriod(IDModel, TimestampModel, UnavailablePeriodCreate):
+    """不可用时段完整模型"""
+
+    user_id: UUID = Field(..., description="用户ID")
+
+    class Config(IDModel.Config):
+        from_attributes = True
+
+
+class BookableSlot(BaseModel):
+    """可预约时段"""
+
+    start: datetime = Field(..., description="开始时间")
+    end: datetime = Field(..., description="结束时间")
+
+
 # ============ 会话反馈模型 ============
 class SessionFeedbackBase(BaseModel):
     """会话反馈基础模型"""
@@ -96,6 +96,42 @@ class UserSkill(IDModel, TimestampModel, UserSkillBase):
         from_attributes = True
 
 
+# ============ 用户技能批量导入 (UserSkillImport) ============
+class UserSkillImportItem(BaseModel):
+    """批量导入的单条用户技能"""
+
+    user_id: Optional[UUID] = Field(None, description="用户ID，缺省为当前用户；仅管理员可为他人导入")
+    skill_id: UUID = Field(..., description="技能ID")
+    proficiency_level: int = Field(1, ge=1, le=5, description="熟练度 (1-5)")
+    years_experience: int = Field(0, ge=0, description="经验年限")
+
+
+class UserSkillImportRequest(BaseModel):
+    """用户技能批量导入请求"""
+
+    items: List[UserSkillImportItem] = Field(..., min_length=1, description="待导入的用户技能列表")
+    update_existing: bool = Field(True, description="已存在的用户技能是否覆盖熟练度与经验年限")
+
+
+class UserSkillImportRowResult(BaseModel):
+    """批量导入的单行结果"""
+
+    row: int = Field(..., description="行号（从1开始，CSV 不含表头）")
+    status: str = Field(..., description="结果: created/updated/skipped/duplicate/invalid/skill_not_found/user_not_found")
+    user_skill_id: Optional[UUID] = Field(None, description="写入后的用户技能ID")
+    error: Optional[str] = Field(None, description="错误说明")
+
+
+class UserSkillImportResult(BaseModel):
+    """用户技能批量导入结果"""
+
+    total: int = Field(..., description="提交行数")
+    created: int = Field(0, description="新建数量")
+    updated: int = Field(0, description="更新数量")
+    failed: int = Field(0, description="未写入数量")
+    rows: List[UserSkillImportRowResult] = Field(default_factory=list, description="逐行结果")
+
+
 # ============ 导师技能/服务 (MentorSkill) ============
 class MentorSkillBase(BaseModel):
     """导师技能/服务基础模型"""
@@ -158,3 +194,28 @@ class SkillEndorsement(IDModel, TimestampModel, SkillEndorsementBase):
 
     class Config(IDModel.Config):
         from_attributes = True
+
+
+# ============ 技能分类快照 (SkillTaxonomy) ============
+
+class SkillTaxonomyItem(BaseModel):
+    """技能分类快照中的技能项"""
+
+    id: UUID = Field(..., description="技能ID")
+    name: str = Field(..., description="技能名称")
+
+
+class SkillTaxonomyCategory(BaseModel):
+    """技能分类快照中的分类节点"""
+
+    id: UUID = Field(..., description="分类ID")
+    name: str = Field(..., description="分类名称")
+    description: Optional[str] = Field(None, description="分类描述")
+    skills: List[SkillTaxonomyItem] = Field(default_factory=list, description="分类下的技能")
+
+
+class SkillTaxonomy(BaseModel):
+    """技能分类快照（分类 → 技能）"""
+
+    version: str = Field(..., description="快照版本（分类内容哈希），内容不变时各实例一致")
+    categories: List[SkillTaxonomyCategory] = Field(default_factory=list, description="分类列表")
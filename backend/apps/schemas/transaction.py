@@ -74,6 +74,7 @@ class WalletTransactionType(str, Enum):
     DEPOSIT = "deposit"
     WITHDRAWAL = "withdrawal"
     PAYMENT = "payment"
+    INCOME = "income"
     REFUND = "refund"
 
 
@@ -83,6 +84,7 @@ class WalletTransactionBase(BaseModel):
     transaction_type: WalletTransactionType = Field(..., description="交易类型")
     amount: Decimal = Field(..., description="交易金额 (正数表示增加, 负数表示减少)")
     order_id: Optional[UUID] = Field(None, description="关联的订单ID")
+    description: Optional[str] = Field(None, description="交易描述")
 
 
 class WalletTransactionCreate(WalletTransactionBase):
@@ -96,3 +98,15 @@ class WalletTransaction(IDModel, TimestampModel, WalletTransactionBase):
 
     class Config(IDModel.Config):
         from_attributes = True
+
+
+class WalletAudit(BaseModel):
+    """钱包余额核对结果（最近检查点 + 之后的流水 = 期望余额）"""
+    wallet_id: UUID = Field(..., description="钱包ID")
+    balance: Decimal = Field(..., description="当前余额")
+    checkpoint_seq: Optional[int] = Field(None, description="最近检查点对应的流水序号，无检查点时为空")
+    checkpoint_balance: Optional[Decimal] = Field(None, description="最近检查点的余额")
+    checkpoint_at: Optional[datetime] = Field(None, description="最近检查点的记录时间")
+    replayed: int = Field(..., description="重放的流水数")
+    expected_balance: Decimal = Field(..., description="按流水推算的余额")
+    difference: Decimal = Field(..., description="当前余额与推算余额之差，0 表示一致")
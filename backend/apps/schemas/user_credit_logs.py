@@ -2,7 +2,7 @@
 用户积分日志 - 数据模型
 """
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from enum import Enum
 from decimal import Decimal
@@ -21,13 +21,20 @@ class CreditType(str, Enum):
     REFUND = "refund"  # 退还积分
 
 
+class CreditPointType(str, Enum):
+    """积分池（对应钱包中的积分字段）"""
+    MENTOR_POINTS = "mentor_points"          # 导师积分
+    LEARNING_POINTS = "learning_points"      # 学习积分（含 AI 使用）
+    REPUTATION_POINTS = "reputation_points"  # 声誉积分
+
+
 # ============ 积分交易模型 ============
 class CreditTransactionBase(BaseModel):
     """积分交易基础模型"""
 
     user_id: UUID = Field(..., description="用户ID")
     amount: Decimal = Field(..., ge=0, description="积分数量")
-    credit_type: CreditType = Field(..., description="积分类型")
+    credit_type: CreditPointType = Field(..., description="积分类型（积分池）")
     description: str = Field(..., description="交易描述")
     reference_id: Optional[UUID] = Field(None, description="关联的交易ID")
     reference_type: Optional[str] = Field(None, description="关联的交易类型")
@@ -57,8 +64,39 @@ class UserCreditLogCreate(CreditTransactionCreate):
 
 
 class UserCreditLog(CreditTransaction):
-    """用户积分日志模型（别名）"""
-    pass
+    """用户积分日志模型"""
+
+    amount: Decimal = Field(..., description="积分变动（正数增加，负数减少）")
+    balance_after: Optional[Decimal] = Field(None, description="变动后该积分池余额")
+    reason: Optional[str] = Field(None, description="变动原因")
+    expires_at: Optional[datetime] = Field(None, description="过期时间")
+
+
+# ============ 批量发放模型 ============
+class CreditAwardItem(BaseModel):
+    """批量发放条目"""
+
+    user_id: UUID = Field(..., description="用户ID")
+    amount: Decimal = Field(..., gt=0, description="发放积分数量")
+
+
+class CreditAwardBatchRequest(BaseModel):
+    """批量发放积分请求（活动奖励）"""
+
+    point_type: CreditPointType = Field(..., description="积分池")
+    items: List[CreditAwardItem] = Field(..., min_length=1, max_length=5000, description="发放明细，同一用户多条会合并")
+    description: str = Field(..., description="发放说明")
+    campaign_id: Optional[UUID] = Field(None, description="活动ID，指定后同一活动对同一用户只发放一次")
+    expires_at: Optional[datetime] = Field(None, description="积分过期时间")
+
+
+class CreditAwardResult(BaseModel):
+    """单个用户的发放结果"""
+
+    user_id: UUID = Field(..., description="用户ID")
+    status: str = Field(..., description="awarded / duplicate / user_not_found")
+    amount: Optional[Decimal] = Field(None, description="实际发放数量")
+    balance_after: Optional[Decimal] = Field(None, description="发放后余额")
 
 
 # ============ 积分余额模型 ============
@@ -0,0 +1,9 @@
+"""
+缓存模块
+提供进程内短期缓存、写回计数缓冲、事件缓冲等通用缓存工具
+"""
+from .ttl_cache import TTLCache
+from .counter_buffer import CounterBuffer, RedisCounterBuffer, create_counter_buffer
+from .event_buffer import EventBuffer
+
+__all__ = ["TTLCache", "CounterBuffer", "RedisCounterBuffer", "create_counter_buffer", "EventBuffer"]
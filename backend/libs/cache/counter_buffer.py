@@ -0,0 +1,131 @@
+"""
+写回计数缓冲
+高频自增计数先在缓冲中聚合，再由后台任务批量写回数据库，避免热点行锁竞争
+
+刷写协议：drain() 取出待刷写计数 → 写库 → 成功后 ack()，失败时 restore()
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """进程内计数缓冲
+
+    进程异常退出时最多丢失一个刷写周期内的增量；正常关闭时由后台任务完成最后一次刷写。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._lock = asyncio.Lock()
+        self.increments = 0
+
+    async def incr(self, key: str, amount: int = 1) -> None:
+        self._counts[key] += amount
+        self.increments += amount
+
+    async def pending(self, key: str) -> int:
+        """尚未写回的增量"""
+        return self._counts.get(key, 0)
+
+    async def drain(self) -> Dict[str, int]:
+        """取出全部待刷写计数"""
+        async with self._lock:
+            counts, self._counts = dict(self._counts), defaultdict(int)
+            return counts
+
+    async def ack(self) -> None:
+        """刷写成功，无需额外处理"""
+
+    async def restore(self, counts: Dict[str, int]) -> None:
+        """刷写失败时将计数放回缓冲，等待下次重试"""
+        async with self._lock:
+            for key, amount in counts.items():
+                self._counts[key] += amount
+
+    async def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "name": self.name,
+            "pending_keys": len(self._counts),
+            "pending_total": sum(self._counts.values()),
+            "increments": self.increments,
+        }
+
+
+class RedisCounterBuffer:
+    """基于 Redis 哈希的计数缓冲，多 worker 共享且进程崩溃不丢失增量
+
+    drain() 将计数哈希原子重命名为 flushing 键后读取；ack() 删除 flushing 键。
+    写库失败或进程崩溃时 flushing 键保留，下次 drain() 优先重放（至少一次语义）。
+    通过带过期时间的锁保证同一时刻只有一个 worker 刷写。
+    """
+
+    LOCK_TTL = 60
+
+    def __init__(self, client, name: str):
+        self.name = name
+        self.client = client
+        self.key = f"counter_buffer:{name}"
+        self.flushing_key = f"{self.key}:flushing"
+        self.lock_key = f"{self.key}:lock"
+        self.increments = 0
+
+    async def incr(self, key: str, amount: int = 1) -> None:
+        await self.client.hincrby(self.key, key, amount)
+        self.increments += amount
+
+    async def pending(self, key: str) -> int:
+        value = await self.client.hget(self.key, key)
+        return int(value) if value else 0
+
+    async def drain(self) -> Dict[str, int]:
+        if not await self.client.set(self.lock_key, "1", nx=True, ex=self.LOCK_TTL):
+            return {}
+
+        if not await self.client.exists(self.flushing_key):
+            # renamenx：哈希不存在时抛错，视为没有待刷写计数
+            try:
+                await self.client.renamenx(self.key, self.flushing_key)
+            except Exception:
+                await self.client.delete(self.lock_key)
+                return {}
+        else:
+            logger.info(f"计数缓冲 {self.name} 重放上次未确认的刷写")
+
+        raw = await self.client.hgetall(self.flushing_key)
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in raw.items()
+        }
+
+    async def ack(self) -> None:
+        await self.client.delete(self.flushing_key, self.lock_key)
+
+    async def restore(self, counts: Dict[str, int]) -> None:
+        # flushing 键仍在，释放锁即可由下次 drain() 重放
+        await self.client.delete(self.lock_key)
+
+    async def stats(self) -> Dict:
+        return {
+            "backend": "redis",
+            "name": self.name,
+            "pending_keys": await self.client.hlen(self.key),
+            "unacked_keys": await self.client.hlen(self.flushing_key),
+            "increments": self.increments,
+        }
+
+
+def create_counter_buffer(name: str, redis_url: str = None):
+    """配置了 Redis 时使用 Redis 缓冲，否则退回进程内缓冲"""
+    if redis_url:
+        try:
+            import redis.asyncio as redis
+            return RedisCounterBuffer(redis.from_url(redis_url), name)
+        except Exception as e:
+            logger.warning(f"Redis 计数缓冲初始化失败，使用进程内缓冲: {e}")
+    return CounterBuffer(name)
@@ -0,0 +1,76 @@
+"""
+事件缓冲
+高频事件先追加到进程内缓冲，再由后台任务批量写入数据库，避免请求路径上的逐条写入
+
+刷写协议与计数缓冲一致：drain() 取出待刷写事件 → 写库 → 失败时 restore()
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """进程内事件缓冲
+
+    待刷写事件超过 max_pending 时丢弃最旧的事件并记录告警，防止数据库长时间不可用时内存无限增长；
+    on_drop 回调收到被丢弃的事件，供调用方回滚据此维护的派生状态。
+    进程异常退出时最多丢失一个刷写周期内的事件；正常关闭时由后台任务完成最后一次刷写。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_pending: int = 100000,
+        on_drop: Optional[Callable[[List[Any]], None]] = None
+    ):
+        self.name = name
+        self.max_pending = max_pending
+        self.on_drop = on_drop
+        self._events: List[Any] = []
+        self._lock = asyncio.Lock()
+        self.appended = 0
+        self.dropped = 0
+
+    async def append(self, event: Any) -> None:
+        self._events.append(event)
+        self.appended += 1
+        self._trim()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    async def drain(self) -> List[Any]:
+        """取出全部待刷写事件"""
+        async with self._lock:
+            events, self._events = self._events, []
+            return events
+
+    async def restore(self, events: List[Any]) -> None:
+        """刷写失败时将事件放回缓冲头部，等待下次重试"""
+        async with self._lock:
+            self._events[:0] = events
+            self._trim()
+
+    def _trim(self) -> None:
+        overflow = len(self._events) - self.max_pending
+        if overflow > 0:
+            dropped = self._events[:overflow]
+            del self._events[:overflow]
+            self.dropped += overflow
+            logger.warning(f"事件缓冲 {self.name} 已满，丢弃 {overflow} 条最旧事件")
+            if self.on_drop is not None:
+                try:
+                    self.on_drop(dropped)
+                except Exception as e:
+                    logger.warning(f"事件缓冲 {self.name} 丢弃回调异常: {e}")
+
+    async def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "name": self.name,
+            "pending": len(self._events),
+            "appended": self.appended,
+            "dropped": self.dropped,
+        }
@@ -24,6 +24,11 @@ class AIConfig(BaseSettings):
     AGENT_MAX_ITERATIONS: int = Field(default=10, description="Agent 最大思考轮数")
     AGENT_TIMEOUT_SECONDS: int = Field(default=300, description="Agent 超时时间（秒）")
     
+    # Agent 计费配置（学习积分）
+    AGENT_CREDIT_COST_PER_CALL: float = Field(default=1, description="每次智能体对话消耗的学习积分")
+    AGENT_CREDIT_COST_PER_1K_TOKENS: float = Field(default=0, description="每千 token 额外消耗的学习积分")
+    AGENT_CREDIT_ENFORCE: bool = Field(default=False, description="积分不足时是否拒绝智能体对话")
+
     # 搜索工具配置
     TAVILY_API_KEY: Optional[str] = Field(default=None, description="Tavily 搜索 API 密钥")
     
@@ -32,6 +32,9 @@ class MinIOConfig(BaseSettings):
     MAX_DOCUMENT_SIZE: int = Field(default=10 * 1024 * 1024, description="文档最大文件大小(字节)")
     MAX_GENERAL_SIZE: int = Field(default=50 * 1024 * 1024, description="通用文件最大文件大小(字节)")
 
+    # 流式上传分片大小（S3 要求除最后一片外不小于 5MB），也是单个上传的内存占用上限
+    MINIO_UPLOAD_PART_SIZE: int = Field(default=5 * 1024 * 1024, description="流式上传分片大小(字节)")
+
     # 文件过期时间配置
     AVATAR_URL_EXPIRE_MINUTES: int = Field(default=60, description="头像URL过期时间(分钟)")
     DOCUMENT_URL_EXPIRE_MINUTES: int = Field(default=1440, description="文档URL过期时间(分钟)")  # 24小时
@@ -37,6 +37,14 @@ class DatabaseAdapter(ABC):
             results.append(await self.execute(query, *args))
         return results
 
+    def transaction(self):
+        """返回事务上下文管理器（async with），具体适配器实现"""
+        raise NotImplementedError("当前适配器不支持事务")
+
+    async def copy_records_to_table(self, table_name: str, records: List[tuple], columns: List[str]) -> str:
+        """通过 COPY 批量写入记录，具体适配器实现"""
+        raise NotImplementedError("当前适配器不支持 COPY")
+
 class PostgreSQLAdapter(DatabaseAdapter):
     """PostgreSQL适配器"""
     
@@ -69,6 +77,12 @@ class PostgreSQLAdapter(DatabaseAdapter):
                 results.append(await self.connection.execute(query, *args))
         return results
 
+    def transaction(self):
+        return self.connection.transaction()
+
+    async def copy_records_to_table(self, table_name: str, records: List[tuple], columns: List[str]) -> str:
+        return await self.connection.copy_records_to_table(table_name, records=records, columns=columns)
+
 class SupabaseAdapter(DatabaseAdapter):
     """Supabase适配器"""
     
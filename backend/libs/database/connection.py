@@ -12,6 +12,7 @@ from typing import AsyncGenerator
 import logging
 from .adapters import DatabaseAdapter, PostgreSQLAdapter, SupabaseAdapter
 from libs.config.settings import settings
+from libs.tasks import start_periodic_tasks, stop_periodic_tasks, run_startup_hooks, run_shutdown_hooks
 
 logger = logging.getLogger(__name__)
 db_pool = None
@@ -56,12 +57,27 @@ async def lifespan(app: FastAPI):
         logger.error(f"数据库连接池创建失败: {e}")
         db_pool = None
 
+    if db_pool:
+        await start_periodic_tasks()
+        await run_startup_hooks()
+
     yield
-    
+
     if db_pool:
+        # 先停止后台任务（含最后一次缓冲刷写），再关闭连接池
+        await stop_periodic_tasks()
+        await run_shutdown_hooks()
         logger.info("关闭数据库连接池...")
         await db_pool.close()
 
+@asynccontextmanager
+async def database_adapter_context() -> AsyncGenerator[DatabaseAdapter, None]:
+    """在请求之外（后台任务等）从连接池获取数据库适配器"""
+    if not db_pool:
+        raise RuntimeError("数据库连接池未初始化")
+    async with db_pool.acquire() as connection:
+        yield PostgreSQLAdapter(connection)
+
 async def get_database_adapter() -> AsyncGenerator[DatabaseAdapter, None]:
     """按请求提供数据库适配器，确保连接自动释放。"""
     if db_pool:
@@ -0,0 +1,11 @@
+"""
+实时通信模块
+提供 WebSocket 连接管理、事件扇出与跨进程事件总线
+"""
+from .hub import ClientConnection, ConnectionHub, pump_connection
+from .broker import LocalBroker, PostgresBroker, RedisBroker, create_broker
+
+__all__ = [
+    "ClientConnection", "ConnectionHub", "pump_connection",
+    "LocalBroker", "PostgresBroker", "RedisBroker", "create_broker",
+]
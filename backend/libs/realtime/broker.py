@@ -0,0 +1,244 @@
+"""
+跨进程事件总线
+多 worker / 多节点部署时，事件先发布到总线，再由每个进程的订阅端转交本地连接中心扇出
+
+- PostgresBroker: 基于 LISTEN/NOTIFY，使用一条专用 asyncpg 连接监听，无需额外基础设施
+- RedisBroker: 基于 Redis pub/sub，配置了 Redis 时可选用
+- LocalBroker: 单进程或数据库不可用时直接本地分发
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 回调参数：(本地频道键, 事件)
+EventHandler = Callable[[Hashable, Dict[str, Any]], None]
+
+# NOTIFY 负载上限为 8000 字节，预留信封开销
+MAX_NOTIFY_PAYLOAD = 7500
+
+
+def _encode(channel: Hashable, event: Dict[str, Any]) -> str:
+    payload = json.dumps({"channel": channel, "event": event}, ensure_ascii=False, default=str)
+    if len(payload.encode("utf-8")) > MAX_NOTIFY_PAYLOAD:
+        # 过大的事件只保留类型等元信息，客户端收到 truncated 后通过接口拉取
+        slim = {key: value for key, value in event.items() if key != "data"}
+        slim["truncated"] = True
+        payload = json.dumps({"channel": channel, "event": slim}, ensure_ascii=False, default=str)
+    return payload
+
+
+def _decode(payload: str):
+    envelope = json.loads(payload)
+    channel = envelope["channel"]
+    # JSON 将元组频道键还原为列表，转换回元组以便在连接中心查找
+    if isinstance(channel, list):
+        channel = tuple(channel)
+    return channel, envelope["event"]
+
+
+class LocalBroker:
+    """进程内直接分发"""
+
+    def __init__(self, handler: EventHandler):
+        self.handler = handler
+        self.published = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, channel: Hashable, event: Dict[str, Any], db=None) -> None:
+        self.published += 1
+        self.handler(channel, event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local", "published": self.published}
+
+
+class PostgresBroker:
+    """基于 Postgres LISTEN/NOTIFY 的事件总线
+
+    每个进程持有一条专用连接执行 LISTEN，连接断开后按退避间隔自动重连；
+    发布优先在调用方的连接上执行 pg_notify（处于事务中时随提交送达，且不额外占用连接池），
+    本进程的订阅端同样会收到并分发，保证各进程顺序一致。
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        topic: str,
+        handler: EventHandler,
+        acquire: Callable[[], Any],
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0
+    ):
+        self.dsn = dsn
+        self.topic = topic
+        self.handler = handler
+        self.acquire = acquire
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+        self._connection = None
+        self._closed = asyncio.Event()
+        self._stopping = False
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        self.received += 1
+        try:
+            self.handler(*_decode(payload))
+        except Exception as e:
+            logger.warning(f"事件总线消息处理失败: {e}")
+
+    def _on_termination(self, connection) -> None:
+        self._closed.set()
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        delay = self.reconnect_delay
+        while not self._stopping:
+            try:
+                self._closed.clear()
+                self._connection = await asyncpg.connect(dsn=self.dsn)
+                self._connection.add_termination_listener(self._on_termination)
+                await self._connection.add_listener(self.topic, self._on_notification)
+                logger.info(f"事件总线已监听 Postgres 频道: {self.topic}")
+                delay = self.reconnect_delay
+                await self._closed.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"事件总线监听连接失败: {e}")
+
+            if self._stopping:
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name=f"broker:{self.topic}")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._closed.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, channel: Hashable, event: Dict[str, Any], db=None) -> None:
+        """发布事件；传入 db 时复用调用方连接，否则从连接池临时获取"""
+        payload = _encode(channel, event)
+        if db is not None:
+            await db.execute("SELECT pg_notify($1, $2)", self.topic, payload)
+        else:
+            async with self.acquire() as conn:
+                await conn.execute("SELECT pg_notify($1, $2)", self.topic, payload)
+        self.published += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "postgres",
+            "topic": self.topic,
+            "listening": self._connection is not None and not self._connection.is_closed(),
+            "published": self.published,
+            "received": self.received,
+            "reconnects": self.reconnects,
+        }
+
+
+class RedisBroker:
+    """基于 Redis pub/sub 的事件总线"""
+
+    def __init__(self, client, topic: str, handler: EventHandler):
+        self.client = client
+        self.topic = topic
+        self.handler = handler
+        self._task: Optional[asyncio.Task] = None
+        self._pubsub = None
+        self.published = 0
+        self.received = 0
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self._pubsub = self.client.pubsub()
+                await self._pubsub.subscribe(self.topic)
+                logger.info(f"事件总线已订阅 Redis 频道: {self.topic}")
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self.received += 1
+                    data = message["data"]
+                    try:
+                        self.handler(*_decode(data.decode() if isinstance(data, bytes) else data))
+                    except Exception as e:
+                        logger.warning(f"事件总线消息处理失败: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"事件总线 Redis 订阅中断，稍后重试: {e}")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"broker:{self.topic}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+
+    async def publish(self, channel: Hashable, event: Dict[str, Any], db=None) -> None:
+        await self.client.publish(self.topic, _encode(channel, event))
+        self.published += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "topic": self.topic,
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+def create_broker(
+    topic: str,
+    handler: EventHandler,
+    dsn: Optional[str] = None,
+    acquire: Optional[Callable[[], Any]] = None,
+    redis_url: Optional[str] = None
+):
+    """按配置选择事件总线：Redis（已配置时）> Postgres > 本地"""
+    if redis_url:
+        try:
+            import redis.asyncio as redis
+            return RedisBroker(redis.from_url(redis_url), topic, handler)
+        except Exception as e:
+            logger.warning(f"Redis 事件总线初始化失败，改用 Postgres: {e}")
+    if dsn and acquire:
+        return PostgresBroker(dsn, topic, handler, acquire)
+    return LocalBroker(handler)
@@ -0,0 +1,130 @@
+"""
+实时推送中心
+维护本进程内的 WebSocket 连接及其订阅的频道（如对话），将事件扇出到各连接的有界发送队列
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+
+class ClientConnection:
+    """单个客户端连接的发送端
+
+    每个连接有独立的有界队列；队列写满说明客户端消费过慢，
+    此时标记连接为过载并由发送循环关闭，客户端重连后通过接口补齐消息（背压）。
+    """
+
+    def __init__(self, user_id: UUID, max_queue: int = 100):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        self.channels: Set[Hashable] = set()
+        self.overflowed = False
+        self.sent = 0
+
+    def offer(self, payload: str) -> bool:
+        """非阻塞入队，队列已满时返回 False"""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+
+class ConnectionHub:
+    """进程内连接与频道订阅注册表"""
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._channels: Dict[Hashable, Set[ClientConnection]] = defaultdict(set)
+        self._users: Dict[UUID, Set[ClientConnection]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def connect(self, user_id: UUID, channels: Iterable[Hashable] = ()) -> ClientConnection:
+        connection = ClientConnection(user_id, self.max_queue)
+        self._users[user_id].add(connection)
+        for channel in channels:
+            self.subscribe(connection, channel)
+        return connection
+
+    def disconnect(self, connection: ClientConnection) -> None:
+        for channel in list(connection.channels):
+            self.unsubscribe(connection, channel)
+        connections = self._users.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self._users[connection.user_id]
+
+    def subscribe(self, connection: ClientConnection, channel: Hashable) -> None:
+        self._channels[channel].add(connection)
+        connection.channels.add(channel)
+
+    def unsubscribe(self, connection: ClientConnection, channel: Hashable) -> None:
+        connection.channels.discard(channel)
+        subscribers = self._channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self._channels[channel]
+
+    def subscribe_user(self, user_id: UUID, channel: Hashable) -> None:
+        """将用户在本进程的所有连接加入频道（如被加入新对话）"""
+        for connection in list(self._users.get(user_id, ())):
+            self.subscribe(connection, channel)
+
+    def unsubscribe_user(self, user_id: UUID, channel: Hashable) -> None:
+        for connection in list(self._users.get(user_id, ())):
+            self.unsubscribe(connection, channel)
+
+    def dispatch(self, channel: Hashable, event: Dict[str, Any]) -> int:
+        """向频道的本地订阅者扇出事件，事件只序列化一次；返回成功入队的连接数"""
+        subscribers = self._channels.get(channel)
+        self.published += 1
+        if not subscribers:
+            return 0
+
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        delivered = 0
+        for connection in list(subscribers):
+            if connection.offer(payload):
+                delivered += 1
+            else:
+                self.dropped += 1
+        self.delivered += delivered
+        return delivered
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._users),
+            "connections": sum(len(c) for c in self._users.values()),
+            "channels": len(self._channels),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+async def pump_connection(connection: ClientConnection, send_text, poll_interval: float = 1.0) -> None:
+    """将连接队列中的事件依次发送给客户端，直到连接过载
+
+    Args:
+        send_text: 发送协程（如 WebSocket.send_text）
+        poll_interval: 队列为空时检查过载标记的间隔
+    """
+    while not connection.overflowed:
+        try:
+            payload: Optional[str] = await asyncio.wait_for(connection.queue.get(), timeout=poll_interval)
+        except asyncio.TimeoutError:
+            continue
+        await send_text(payload)
+        connection.sent += 1
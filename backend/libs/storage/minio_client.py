@@ -19,6 +19,35 @@ from libs.config.settings import settings
 logger = logging.getLogger(__name__)
 
 
+class FileTooLargeError(ValueError):
+    """上传内容超过大小限制"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"文件大小超过限制。最大允许 {max_size // (1024*1024)}MB")
+
+
+class SizeLimitedStream:
+    """包装可读流，累计读取字节数，超过上限时抛出 FileTooLargeError
+
+    多读 1 字节判断是否超限，恰好等于上限的文件可以通过。
+    """
+
+    def __init__(self, stream: BinaryIO, max_size: int):
+        self.stream = stream
+        self.max_size = max_size
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.max_size + 1 - self.bytes_read
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_size:
+            raise FileTooLargeError(self.max_size)
+        return chunk
+
+
 class MinIOClient:
     """MinIO客户端封装类"""
 
@@ -112,6 +141,66 @@ class MinIOClient:
             logger.error(f"Unexpected error uploading file {bucket_name}/{object_name}: {e}")
             raise
 
+    def upload_stream(
+        self,
+        bucket_name: str,
+        object_name: str,
+        stream: BinaryIO,
+        max_size: int,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        以未知长度的分片上传方式流式写入MinIO，内存占用不超过一个分片
+
+        Args:
+            bucket_name: 存储桶名称
+            object_name: 对象名称
+            stream: 可读的同步文件对象
+            max_size: 最大字节数，读取过程中超出即中止上传（已上传分片由客户端清理）
+            content_type: 内容类型
+            metadata: 元数据
+
+        Returns:
+            上传结果信息
+        """
+        try:
+            self.ensure_bucket_exists(bucket_name)
+
+            limited = SizeLimitedStream(stream, max_size)
+            result = self.client.put_object(
+                bucket_name=bucket_name,
+                object_name=object_name,
+                data=limited,
+                length=-1,
+                part_size=self.config.MINIO_UPLOAD_PART_SIZE,
+                content_type=content_type,
+                metadata=metadata
+            )
+
+            upload_info = {
+                "bucket_name": bucket_name,
+                "object_name": object_name,
+                "file_size": limited.bytes_read,
+                "content_type": content_type,
+                "etag": result.etag,
+                "uploaded_at": datetime.now().isoformat(),
+                "metadata": metadata or {}
+            }
+
+            logger.info(f"File streamed successfully: {bucket_name}/{object_name} ({limited.bytes_read} bytes)")
+            return upload_info
+
+        except FileTooLargeError:
+            logger.info(f"Upload rejected, exceeds {max_size} bytes: {bucket_name}/{object_name}")
+            raise
+        except S3Error as e:
+            logger.error(f"Failed to stream file {bucket_name}/{object_name}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error streaming file {bucket_name}/{object_name}: {e}")
+            raise
+
     def download_file(self, bucket_name: str, object_name: str) -> bytes:
         """
         从MinIO下载文件
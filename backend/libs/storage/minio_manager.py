@@ -2,15 +2,16 @@
 MinIO存储管理器
 提供基于MinIO的文件上传、下载、删除等功能
 """
+import asyncio
 import os
 import uuid
 import mimetypes
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, BinaryIO
 from datetime import datetime
 from pathlib import Path
 
-from libs.storage.minio_client import minio_client
+from libs.storage.minio_client import minio_client, FileTooLargeError
 from libs.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -105,6 +106,71 @@ class MinIOStorageManager:
         content_type, _ = mimetypes.guess_type(filename)
         return content_type or "application/octet-stream"
 
+    def _prepare_upload(
+        self,
+        original_filename: str,
+        file_type: str,
+        user_id: Optional[str],
+        metadata: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        计算上传目标：存储桶、对象名称（有用户ID时按用户分组）、内容类型与元数据
+        """
+        unique_filename = self._generate_unique_filename(original_filename)
+        file_metadata = {
+            "original_filename": original_filename,
+            "file_type": file_type,
+            "user_id": user_id or "",
+            "uploaded_at": datetime.now().isoformat()
+        }
+        if metadata:
+            file_metadata.update(metadata)
+
+        return {
+            "bucket_name": self._get_bucket_for_file_type(file_type),
+            "object_name": f"{user_id}/{unique_filename}" if user_id else unique_filename,
+            "unique_filename": unique_filename,
+            "content_type": self._get_content_type(original_filename),
+            "metadata": file_metadata
+        }
+
+    def _build_upload_result(
+        self,
+        target: Dict[str, Any],
+        original_filename: str,
+        file_type: str,
+        user_id: Optional[str],
+        file_size: int
+    ) -> Dict[str, Any]:
+        """
+        生成预签名URL并组装上传结果
+        """
+        expires_minutes = self._get_url_expire_for_file_type(file_type)
+        file_url = self.client.get_file_url(
+            bucket_name=target["bucket_name"],
+            object_name=target["object_name"],
+            expires_minutes=expires_minutes
+        )
+
+        result = {
+            "file_id": str(uuid.uuid4()),
+            "bucket_name": target["bucket_name"],
+            "object_name": target["object_name"],
+            "original_filename": original_filename,
+            "unique_filename": target["unique_filename"],
+            "file_url": file_url,
+            "file_size": file_size,
+            "content_type": target["content_type"],
+            "file_type": file_type,
+            "user_id": user_id,
+            "uploaded_at": datetime.now().isoformat(),
+            "url_expires_minutes": expires_minutes,
+            "metadata": target["metadata"]
+        }
+
+        logger.info(f"File uploaded successfully: {result['file_id']}")
+        return result
+
     async def upload_file(
         self,
         file_content: bytes,
@@ -130,71 +196,75 @@ class MinIOStorageManager:
             # 检查文件大小
             max_size = self._get_max_size_for_file_type(file_type)
             if len(file_content) > max_size:
-                raise ValueError(f"文件大小超过限制。最大允许 {max_size // (1024*1024)}MB")
+                raise FileTooLargeError(max_size)
+
+            target = self._prepare_upload(original_filename, file_type, user_id, metadata)
+
+            # 上传文件
+            self.client.upload_file(
+                bucket_name=target["bucket_name"],
+                object_name=target["object_name"],
+                file_content=file_content,
+                content_type=target["content_type"],
+                metadata=target["metadata"]
+            )
 
-            # 获取存储桶
-            bucket_name = self._get_bucket_for_file_type(file_type)
+            return self._build_upload_result(
+                target, original_filename, file_type, user_id, len(file_content)
+            )
 
-            # 生成唯一文件名
-            unique_filename = self._generate_unique_filename(original_filename)
+        except Exception as e:
+            logger.error(f"Failed to upload file: {str(e)}")
+            raise
 
-            # 构建对象名称（如果有用户ID，则按用户分组）
-            if user_id:
-                object_name = f"{user_id}/{unique_filename}"
-            else:
-                object_name = unique_filename
+    async def upload_stream(
+        self,
+        stream: BinaryIO,
+        original_filename: str,
+        file_type: str = "general",
+        user_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        max_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        流式上传文件到MinIO，边读边按分片上传，大小限制在读取过程中校验
 
-            # 获取内容类型
-            content_type = self._get_content_type(original_filename)
+        同步的 MinIO 客户端在线程中运行，不阻塞事件循环；单个上传的内存占用不超过一个分片。
 
-            # 准备元数据
-            file_metadata = {
-                "original_filename": original_filename,
-                "file_type": file_type,
-                "user_id": user_id or "",
-                "uploaded_at": datetime.now().isoformat()
-            }
-            if metadata:
-                file_metadata.update(metadata)
+        Args:
+            stream: 可读的同步文件对象（如 UploadFile.file）
+            original_filename: 原始文件名
+            file_type: 文件类型 (avatar, document, general)
+            user_id: 用户ID
+            metadata: 额外的元数据
+            max_size: 最大字节数，默认取文件类型对应的限制
 
-            # 上传文件
-            upload_result = self.client.upload_file(
-                bucket_name=bucket_name,
-                object_name=object_name,
-                file_content=file_content,
-                content_type=content_type,
-                metadata=file_metadata
+        Returns:
+            上传结果信息；超过大小限制时抛出 FileTooLargeError
+        """
+        try:
+            if max_size is None:
+                max_size = self._get_max_size_for_file_type(file_type)
+            target = self._prepare_upload(original_filename, file_type, user_id, metadata)
+
+            upload_info = await asyncio.to_thread(
+                self.client.upload_stream,
+                target["bucket_name"],
+                target["object_name"],
+                stream,
+                max_size,
+                target["content_type"],
+                target["metadata"]
             )
 
-            # 生成预签名URL
-            expires_minutes = self._get_url_expire_for_file_type(file_type)
-            file_url = self.client.get_file_url(
-                bucket_name=bucket_name,
-                object_name=object_name,
-                expires_minutes=expires_minutes
+            return self._build_upload_result(
+                target, original_filename, file_type, user_id, upload_info["file_size"]
             )
 
-            result = {
-                "file_id": str(uuid.uuid4()),
-                "bucket_name": bucket_name,
-                "object_name": object_name,
-                "original_filename": original_filename,
-                "unique_filename": unique_filename,
-                "file_url": file_url,
-                "file_size": len(file_content),
-                "content_type": content_type,
-                "file_type": file_type,
-                "user_id": user_id,
-                "uploaded_at": datetime.now().isoformat(),
-                "url_expires_minutes": expires_minutes,
-                "metadata": file_metadata
-            }
-
-            logger.info(f"File uploaded successfully: {result['file_id']}")
-            return result
-
+        except FileTooLargeError:
+            raise
         except Exception as e:
-            logger.error(f"Failed to upload file: {str(e)}")
+            logger.error(f"Failed to stream upload file: {str(e)}")
             raise
 
     async def download_file(
@@ -0,0 +1,24 @@
+"""
+后台任务模块
+提供随应用生命周期启动与停止的周期性任务及关闭钩子
+"""
+from .periodic import (
+    PeriodicTask,
+    register_periodic_task,
+    get_periodic_tasks,
+    start_periodic_tasks,
+    stop_periodic_tasks,
+)
+from .lifecycle import register_startup_hook, run_startup_hooks, register_shutdown_hook, run_shutdown_hooks
+
+__all__ = [
+    "PeriodicTask",
+    "register_periodic_task",
+    "get_periodic_tasks",
+    "start_periodic_tasks",
+    "stop_periodic_tasks",
+    "register_startup_hook",
+    "run_startup_hooks",
+    "register_shutdown_hook",
+    "run_shutdown_hooks",
+]
@@ -0,0 +1,39 @@
+"""
+应用启动与关闭钩子
+常驻的后台组件（如事件总线监听连接）在此注册启动与清理函数，由应用生命周期统一调用
+"""
+import logging
+from typing import Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+_startup_hooks: List[Callable[[], Awaitable[None]]] = []
+_shutdown_hooks: List[Callable[[], Awaitable[None]]] = []
+
+
+def register_startup_hook(hook: Callable[[], Awaitable[None]]) -> None:
+    """注册启动时执行的协程函数"""
+    _startup_hooks.append(hook)
+
+
+async def run_startup_hooks() -> None:
+    """按注册顺序执行启动钩子"""
+    for hook in _startup_hooks:
+        try:
+            await hook()
+        except Exception as e:
+            logger.warning(f"启动钩子执行异常: {e}")
+
+
+def register_shutdown_hook(hook: Callable[[], Awaitable[None]]) -> None:
+    """注册关闭时执行的协程函数"""
+    _shutdown_hooks.append(hook)
+
+
+async def run_shutdown_hooks() -> None:
+    """按注册的相反顺序执行关闭钩子"""
+    for hook in reversed(_shutdown_hooks):
+        try:
+            await hook()
+        except Exception as e:
+            logger.warning(f"关闭钩子执行异常: {e}")
@@ -0,0 +1,120 @@
+"""
+周期性后台任务
+在应用生命周期内按固定间隔运行协程，记录运行指标；关闭时执行最后一次运行
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """按固定间隔运行的后台任务
+
+    Args:
+        name: 任务名称（用于日志与指标）
+        interval: 运行间隔（秒）
+        func: 无参协程函数，返回值为本次处理的条目数（可为 None）
+        run_on_shutdown: 关闭时是否再运行一次（用于刷写缓冲）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        func: Callable[[], Awaitable[Optional[int]]],
+        run_on_shutdown: bool = False
+    ):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_on_shutdown = run_on_shutdown
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+        self.runs = 0
+        self.failures = 0
+        self.items_processed = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def run_once(self) -> Optional[int]:
+        """运行一次并记录指标；异常不会向外抛出"""
+        started = time.perf_counter()
+        try:
+            processed = await self.func()
+            self.items_processed += processed or 0
+            self.last_error = None
+            return processed
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.warning(f"后台任务 {self.name} 运行失败: {e}")
+            return None
+        finally:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                await self.run_once()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._loop(), name=f"periodic:{self.name}")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        if self.run_on_shutdown:
+            await self.run_once()
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "items_processed": self.items_processed,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+        }
+
+
+_tasks: Dict[str, PeriodicTask] = {}
+
+
+def register_periodic_task(task: PeriodicTask) -> PeriodicTask:
+    """注册后台任务，由应用生命周期统一启动与停止；同名任务覆盖"""
+    _tasks[task.name] = task
+    return task
+
+
+def get_periodic_tasks() -> List[PeriodicTask]:
+    return list(_tasks.values())
+
+
+async def start_periodic_tasks() -> None:
+    for task in _tasks.values():
+        task.start()
+        logger.info(f"后台任务已启动: {task.name} (间隔 {task.interval}s)")
+
+
+async def stop_periodic_tasks() -> None:
+    for task in _tasks.values():
+        try:
+            await task.stop()
+        except Exception as e:
+            logger.warning(f"后台任务 {task.name} 停止异常: {e}")
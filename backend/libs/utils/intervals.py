@@ -0,0 +1,77 @@
+"""
+时间区间工具函数
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+def free_intervals(available: Iterable[Interval], busy: Iterable[Interval]) -> List[Interval]:
+    """
+    扫描线求空闲区间：被任一可用区间覆盖且不被任何占用区间覆盖的部分
+
+    Args:
+        available: 可用区间（可重叠、无序）
+        busy: 占用区间（可重叠、无序）
+
+    Returns:
+        按时间排序、互不重叠的空闲区间（左闭右开）
+    """
+    # 同一时刻先处理结束事件，首尾相接的区间不会被合并成重叠
+    events = []
+    for start, end in available:
+        if start < end:
+            events.append((start, 0, 1, 0))
+            events.append((end, 0, -1, 0))
+    for start, end in busy:
+        if start < end:
+            events.append((start, 1, 0, 1))
+            events.append((end, 0, 0, -1))
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    result: List[Interval] = []
+    available_depth = busy_depth = 0
+    open_at = None
+    for at, _, available_delta, busy_delta in events:
+        was_free = available_depth > 0 and busy_depth == 0
+        available_depth += available_delta
+        busy_depth += busy_delta
+        is_free = available_depth > 0 and busy_depth == 0
+        if is_free and not was_free:
+            open_at = at
+        elif was_free and not is_free:
+            if open_at < at:
+                result.append((open_at, at))
+            open_at = None
+
+    # 相邻区间合并（结束与开始同一时刻）
+    merged: List[Interval] = []
+    for start, end in result:
+        if merged and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def split_slots(intervals: Iterable[Interval], duration: timedelta, step: timedelta) -> List[Interval]:
+    """
+    将空闲区间切分为固定时长的时段
+
+    Args:
+        intervals: 空闲区间
+        duration: 时段时长
+        step: 相邻时段起点的间隔
+
+    Returns:
+        完全落在空闲区间内的时段列表
+    """
+    slots: List[Interval] = []
+    for start, end in intervals:
+        at = start
+        while at + duration <= end:
+            slots.append((at, at + duration))
+            at += step
+    return slots
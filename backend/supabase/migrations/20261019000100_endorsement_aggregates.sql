@@ -0,0 +1,49 @@
+-- Incremental endorsement aggregates on user_skills
+-- Generated: 2026-10-19
+
+-- Endorsements table; one endorsement per (user_skill, endorser) so inserts can be idempotent
+CREATE TABLE IF NOT EXISTS user_skill_endorsements (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
+    user_skill_id UUID NOT NULL REFERENCES user_skills(id) ON DELETE CASCADE,
+    endorser_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    rating INT CHECK (rating BETWEEN 1 AND 5),
+    comment TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_user_skill_endorsements_skill_endorser
+    ON user_skill_endorsements(user_skill_id, endorser_id);
+
+-- Running aggregates maintained arithmetically by add_skill_endorsement
+ALTER TABLE user_skills
+ADD COLUMN IF NOT EXISTS endorsement_count INT NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS rating_sum BIGINT NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS rating_count INT NOT NULL DEFAULT 0;
+
+-- Replace the previously recomputed average with a derived column
+ALTER TABLE user_skills DROP COLUMN IF EXISTS avg_endorsement_rating;
+ALTER TABLE user_skills
+ADD COLUMN avg_endorsement_rating NUMERIC GENERATED ALWAYS AS (
+    CASE WHEN rating_count > 0 THEN rating_sum::NUMERIC / rating_count END
+) STORED;
+
+-- Backfill aggregates from existing endorsements
+UPDATE user_skills us
+SET endorsement_count = agg.endorsement_count,
+    rating_sum = agg.rating_sum,
+    rating_count = agg.rating_count
+FROM (
+    SELECT user_skill_id,
+           COUNT(*) AS endorsement_count,
+           COALESCE(SUM(rating), 0) AS rating_sum,
+           COUNT(rating) AS rating_count
+    FROM user_skill_endorsements
+    GROUP BY user_skill_id
+) agg
+WHERE us.id = agg.user_skill_id;
+
+COMMENT ON COLUMN user_skills.endorsement_count IS 'Number of endorsements, maintained on insert';
+COMMENT ON COLUMN user_skills.rating_sum IS 'Sum of non-null endorsement ratings';
+COMMENT ON COLUMN user_skills.rating_count IS 'Number of endorsements carrying a rating';
+COMMENT ON COLUMN user_skills.avg_endorsement_rating IS 'Derived: rating_sum / rating_count';
@@ -0,0 +1,36 @@
+-- Denormalized like counters for forum posts and replies
+-- Generated: 2026-10-19
+
+-- Counters maintained by like/unlike in the same statement as the likes row
+ALTER TABLE forum_posts
+ADD COLUMN IF NOT EXISTS like_count INT NOT NULL DEFAULT 0;
+
+ALTER TABLE post_replies
+ADD COLUMN IF NOT EXISTS like_count INT NOT NULL DEFAULT 0;
+
+-- Backfill from existing likes
+UPDATE forum_posts fp
+SET like_count = agg.like_count
+FROM (
+    SELECT post_id, COUNT(*) AS like_count
+    FROM likes
+    WHERE post_id IS NOT NULL
+    GROUP BY post_id
+) agg
+WHERE fp.id = agg.post_id;
+
+UPDATE post_replies pr
+SET like_count = agg.like_count
+FROM (
+    SELECT reply_id, COUNT(*) AS like_count
+    FROM likes
+    WHERE reply_id IS NOT NULL
+    GROUP BY reply_id
+) agg
+WHERE pr.id = agg.reply_id;
+
+-- Replies of a post in display order, without touching likes
+CREATE INDEX IF NOT EXISTS idx_post_replies_post_created ON post_replies(post_id, created_at);
+
+COMMENT ON COLUMN forum_posts.like_count IS 'Number of likes, maintained by like/unlike';
+COMMENT ON COLUMN post_replies.like_count IS 'Number of likes, maintained by like/unlike';
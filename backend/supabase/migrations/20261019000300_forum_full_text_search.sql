@@ -0,0 +1,40 @@
+-- Full-text search over forum posts
+-- Generated: 2026-10-19
+--
+-- Chinese text has no word boundaries, so the 'simple' configuration alone would index whole
+-- CJK runs as single lexemes. Posts are additionally indexed as overlapping CJK bigrams, and
+-- queries are rewritten into bigram phrases by the service layer. Where the zhparser extension
+-- is available, a zhparser-based configuration can replace forum_search_ngrams without
+-- changing the query side contract (title A, tags B, content C weights).
+
+-- Overlapping bigrams of every CJK run, space separated: '中文搜索' -> '中文 文搜 搜索'
+CREATE OR REPLACE FUNCTION forum_search_ngrams(input TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT COALESCE(string_agg(substr(input, i, 2), ' ' ORDER BY i), '')
+    FROM generate_series(1, GREATEST(char_length(input) - 1, 0)) AS i
+    WHERE substr(input, i, 2) ~ '^[一-鿿]{2}$'
+$$;
+
+-- Weighted search document; wrapped so the generated column only calls immutable functions
+CREATE OR REPLACE FUNCTION forum_post_search_vector(title TEXT, content TEXT, tags TEXT[])
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT
+        setweight(to_tsvector('simple', COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('simple', forum_search_ngrams(COALESCE(title, ''))), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(array_to_string(tags, ' '), '')), 'B') ||
+        setweight(to_tsvector('simple', forum_search_ngrams(COALESCE(array_to_string(tags, ' '), ''))), 'B') ||
+        setweight(to_tsvector('simple', COALESCE(content, '')), 'C') ||
+        setweight(to_tsvector('simple', forum_search_ngrams(COALESCE(content, ''))), 'C')
+$$;
+
+ALTER TABLE forum_posts
+ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (forum_post_search_vector(title, content, tags)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_forum_posts_search_vector ON forum_posts USING GIN (search_vector);
+
+COMMENT ON COLUMN forum_posts.search_vector IS 'Generated full-text document (title A, tags B, content C, plus CJK bigrams)';
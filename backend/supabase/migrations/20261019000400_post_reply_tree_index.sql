@@ -0,0 +1,10 @@
+-- Index for walking reply threads with a recursive CTE
+-- Generated: 2026-10-19
+
+-- Each recursion step looks up the children of the previous level
+CREATE INDEX IF NOT EXISTS idx_post_replies_parent ON post_replies(parent_reply_id)
+    WHERE parent_reply_id IS NOT NULL;
+
+-- Root replies of a post
+CREATE INDEX IF NOT EXISTS idx_post_replies_post_roots ON post_replies(post_id)
+    WHERE parent_reply_id IS NULL;
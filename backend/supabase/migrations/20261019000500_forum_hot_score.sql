@@ -0,0 +1,32 @@
+-- Precomputed hot ranking for the forum feed
+-- Generated: 2026-10-19
+--
+-- hot_score = log10(max(activity, 1)) + created_epoch / 45000
+-- The time term grows with creation time instead of decaying with age, so a post's score only
+-- changes when its activity changes (every 12.5 hours of recency is worth 10x activity).
+-- This lets the background job rescore only posts that had likes, replies or views since its last run.
+
+CREATE OR REPLACE FUNCTION forum_hot_score(activity NUMERIC, created_at TIMESTAMPTZ)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT LOG(GREATEST(activity, 1))::DOUBLE PRECISION
+         + EXTRACT(EPOCH FROM created_at)::DOUBLE PRECISION / 45000
+$$;
+
+ALTER TABLE forum_posts
+ADD COLUMN IF NOT EXISTS hot_score DOUBLE PRECISION NOT NULL DEFAULT 0;
+
+-- Backfill: likes x2, replies x3, views x0.1
+UPDATE forum_posts fp
+SET hot_score = forum_hot_score(
+    fp.like_count * 2
+    + COALESCE((SELECT COUNT(*) FROM post_replies pr WHERE pr.post_id = fp.id), 0) * 3
+    + fp.views_count * 0.1,
+    fp.created_at
+);
+
+CREATE INDEX IF NOT EXISTS idx_forum_posts_hot ON forum_posts(hot_score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_forum_posts_category_hot ON forum_posts(category, hot_score DESC, id DESC);
+
+COMMENT ON COLUMN forum_posts.hot_score IS 'Hot ranking score, recomputed for recently active posts by the forum_hot_score job';
@@ -0,0 +1,32 @@
+-- Per-participant read cursors for conversations
+-- Generated: 2026-10-19
+--
+-- messages.is_read is a single flag shared by every recipient. Each participant instead keeps a
+-- cursor on the last message they have read; a message is unread for a user when it was sent by
+-- someone else and sorts after the cursor on (created_at, id). Unread counts become an index range
+-- scan on messages (conversation_id, created_at, id).
+
+ALTER TABLE conversation_participants
+ADD COLUMN IF NOT EXISTS last_read_message_id UUID REFERENCES messages(id) ON DELETE SET NULL,
+ADD COLUMN IF NOT EXISTS last_read_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN conversation_participants.last_read_message_id IS 'Last message the participant has read';
+COMMENT ON COLUMN conversation_participants.last_read_at IS 'created_at of last_read_message_id; messages after (last_read_at, last_read_message_id) are unread';
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created
+ON messages (conversation_id, created_at, id);
+
+-- Backfill: start each cursor at the newest message that was flagged read or sent by the participant
+WITH latest AS (
+    SELECT DISTINCT ON (cp.id) cp.id AS participant_id, m.id, m.created_at
+    FROM conversation_participants cp
+    JOIN messages m ON m.conversation_id = cp.conversation_id
+    WHERE cp.last_read_at IS NULL
+      AND (m.is_read OR m.sender_id = cp.user_id)
+    ORDER BY cp.id, m.created_at DESC, m.id DESC
+)
+UPDATE conversation_participants cp
+SET last_read_message_id = latest.id,
+    last_read_at = latest.created_at
+FROM latest
+WHERE cp.id = latest.participant_id;
@@ -0,0 +1,40 @@
+-- Denormalized last message for the conversation inbox
+-- Generated: 2026-10-19
+--
+-- conversations.last_message_id existed but was never maintained. Sending a message now updates
+-- last_message_id, a short preview and the timestamp in the same statement as the insert, and
+-- copies the timestamp onto every participant row so a user's inbox is an index scan on
+-- conversation_participants (user_id, last_activity_at DESC) joined to conversations.
+
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS last_message_preview TEXT,
+ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN conversations.last_message_preview IS 'First 200 characters of the last message';
+COMMENT ON COLUMN conversations.last_message_at IS 'created_at of last_message_id';
+
+ALTER TABLE conversation_participants
+ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+COMMENT ON COLUMN conversation_participants.last_activity_at IS 'Copy of the conversation''s last message time (or join time); inbox sort key';
+
+-- Backfill from the newest message of each conversation
+WITH latest AS (
+    SELECT DISTINCT ON (conversation_id) conversation_id, id, content, created_at
+    FROM messages
+    ORDER BY conversation_id, created_at DESC, id DESC
+)
+UPDATE conversations c
+SET last_message_id = latest.id,
+    last_message_preview = LEFT(latest.content, 200),
+    last_message_at = latest.created_at
+FROM latest
+WHERE c.id = latest.conversation_id;
+
+UPDATE conversation_participants cp
+SET last_activity_at = COALESCE(c.last_message_at, c.created_at)
+FROM conversations c
+WHERE c.id = cp.conversation_id;
+
+CREATE INDEX IF NOT EXISTS idx_conversation_participants_inbox
+ON conversation_participants (user_id, last_activity_at DESC, conversation_id DESC);
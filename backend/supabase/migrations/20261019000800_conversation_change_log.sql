@@ -0,0 +1,49 @@
+-- Per-conversation change log for delta sync
+-- Generated: 2026-10-19
+--
+-- Every message create/edit/delete and participant add/remove increments conversations.change_seq
+-- and appends one row to conversation_changes in the same statement. The increment takes the
+-- conversation row lock, so sequence numbers are gap-free and become visible in order within a
+-- conversation; a client holding cursor N fetches seq > N and never misses a change.
+
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN conversations.change_seq IS 'Sequence number of the latest entry in conversation_changes';
+
+CREATE TABLE IF NOT EXISTS conversation_changes (
+    conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    seq BIGINT NOT NULL,
+    change_type VARCHAR(32) NOT NULL,
+    entity_id UUID NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (conversation_id, seq)
+);
+
+COMMENT ON TABLE conversation_changes IS 'Append-only change log per conversation, read by the delta sync API';
+COMMENT ON COLUMN conversation_changes.change_type IS 'message.created | message.updated | message.deleted | participant.added | participant.removed';
+COMMENT ON COLUMN conversation_changes.entity_id IS 'Message id for message.* changes, user id for participant.* changes';
+
+-- Retention pruning scans by age; BRIN stays tiny on an append-only table
+CREATE INDEX IF NOT EXISTS idx_conversation_changes_created_brin
+ON conversation_changes USING BRIN (created_at);
+
+-- Backfill: existing messages become message.created entries so cursor 0 replays full history
+WITH numbered AS (
+    SELECT conversation_id, id, created_at,
+           ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY created_at, id) AS seq
+    FROM messages
+)
+INSERT INTO conversation_changes (conversation_id, seq, change_type, entity_id, created_at)
+SELECT conversation_id, seq, 'message.created', id, created_at
+FROM numbered
+ON CONFLICT DO NOTHING;
+
+UPDATE conversations c
+SET change_seq = latest.seq
+FROM (
+    SELECT conversation_id, MAX(seq) AS seq
+    FROM conversation_changes
+    GROUP BY conversation_id
+) latest
+WHERE c.id = latest.conversation_id AND c.change_seq < latest.seq;
@@ -0,0 +1,11 @@
+-- Ledger description for wallet transactions
+-- Generated: 2026-10-19
+--
+-- Payments, recharges and withdrawals are written as a single statement that moves the balance
+-- and inserts the ledger row together; the description (payment method, order reference,
+-- withdrawal account) is stored on the ledger row it belongs to.
+
+ALTER TABLE wallet_transactions
+ADD COLUMN IF NOT EXISTS description TEXT;
+
+COMMENT ON COLUMN wallet_transactions.description IS 'Human-readable note, e.g. payment method or order reference';
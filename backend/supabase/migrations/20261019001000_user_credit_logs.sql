@@ -0,0 +1,33 @@
+-- Credit ledger for wallet point balances
+-- Generated: 2026-10-19
+--
+-- Every change to user_wallets.{mentor,learning,reputation}_points is written together with one
+-- user_credit_logs row in the same statement (upsert the wallet, RETURNING the new balance, insert
+-- the log), so balance_after is exact even under concurrent awards.
+
+CREATE TABLE IF NOT EXISTS user_credit_logs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    credit_type VARCHAR(20) NOT NULL,
+    amount NUMERIC NOT NULL,
+    balance_after NUMERIC NOT NULL,
+    reason VARCHAR(100) NOT NULL,
+    reference_id UUID,
+    reference_type VARCHAR(50),
+    description TEXT,
+    expires_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE user_credit_logs IS 'Append-only ledger of point balance changes';
+COMMENT ON COLUMN user_credit_logs.credit_type IS 'Wallet point pool: mentor_points | learning_points | reputation_points';
+COMMENT ON COLUMN user_credit_logs.balance_after IS 'Pool balance right after this change';
+
+CREATE INDEX IF NOT EXISTS idx_user_credit_logs_user_created
+ON user_credit_logs (user_id, created_at DESC);
+
+-- Campaign payouts are idempotent per (user, campaign): re-running a batch skips users already paid
+CREATE UNIQUE INDEX IF NOT EXISTS uq_user_credit_logs_campaign_award
+ON user_credit_logs (user_id, reference_type, reference_id)
+WHERE reason = 'campaign_award' AND reference_id IS NOT NULL;
@@ -0,0 +1,79 @@
+-- Per-user daily financial rollup
+-- Generated: 2026-10-19
+--
+-- The stats endpoint used to aggregate all of a user's orders and wallet transactions per request.
+-- Writes (order create/pay/cancel/status edits, wallet movements) now add their deltas to the
+-- user's daily rows in the same statement; a status edit that leaves completed/cancelled reverses
+-- the row of the day the order entered that status. A periodic job recomputes the recent window
+-- from the source tables to repair any remaining drift.
+--
+-- Days are UTC: orders by created_at (created) or status_changed_at (completed/cancelled),
+-- wallet transactions by created_at.
+
+ALTER TABLE orders
+ADD COLUMN IF NOT EXISTS status_changed_at TIMESTAMPTZ;
+
+UPDATE orders SET status_changed_at = updated_at WHERE status_changed_at IS NULL;
+
+ALTER TABLE orders
+ALTER COLUMN status_changed_at SET DEFAULT NOW(),
+ALTER COLUMN status_changed_at SET NOT NULL;
+
+COMMENT ON COLUMN orders.status_changed_at IS 'When status last changed; the rollup day for completed/cancelled orders';
+
+CREATE TABLE IF NOT EXISTS user_financial_daily (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    income NUMERIC NOT NULL DEFAULT 0,
+    expense NUMERIC NOT NULL DEFAULT 0,
+    orders_created INTEGER NOT NULL DEFAULT 0,
+    orders_completed INTEGER NOT NULL DEFAULT 0,
+    orders_cancelled INTEGER NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    credit_amount NUMERIC NOT NULL DEFAULT 0,
+    debit_amount NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, day)
+);
+
+COMMENT ON TABLE user_financial_daily IS 'Per-user daily totals maintained by writes and reconciled periodically';
+COMMENT ON COLUMN user_financial_daily.income IS 'Completed orders of services the user mentors';
+COMMENT ON COLUMN user_financial_daily.expense IS 'Completed orders the user bought';
+COMMENT ON COLUMN user_financial_daily.credit_amount IS 'Sum of positive wallet transaction amounts';
+COMMENT ON COLUMN user_financial_daily.debit_amount IS 'Sum of absolute negative wallet transaction amounts';
+
+CREATE INDEX IF NOT EXISTS idx_orders_status_changed ON orders (status_changed_at);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at);
+CREATE INDEX IF NOT EXISTS idx_wallet_transactions_created ON wallet_transactions (created_at);
+
+-- Backfill full history
+INSERT INTO user_financial_daily AS r (
+    user_id, day, income, expense, orders_created, orders_completed, orders_cancelled,
+    transaction_count, credit_amount, debit_amount
+)
+SELECT user_id, day, SUM(income), SUM(expense), SUM(orders_created), SUM(orders_completed),
+       SUM(orders_cancelled), SUM(transaction_count), SUM(credit_amount), SUM(debit_amount)
+FROM (
+    SELECT o.user_id, (o.created_at AT TIME ZONE 'UTC')::date AS day,
+           0 AS income, 0 AS expense, 1 AS orders_created, 0 AS orders_completed, 0 AS orders_cancelled,
+           0 AS transaction_count, 0 AS credit_amount, 0 AS debit_amount
+    FROM orders o
+    UNION ALL
+    SELECT o.user_id, (o.status_changed_at AT TIME ZONE 'UTC')::date,
+           0, o.total_price, 0, 1, 0, 0, 0, 0
+    FROM orders o WHERE o.status = 'completed'
+    UNION ALL
+    SELECT s.mentor_id, (o.status_changed_at AT TIME ZONE 'UTC')::date,
+           o.total_price, 0, 0, 0, 0, 0, 0, 0
+    FROM orders o JOIN services s ON s.id = o.service_id WHERE o.status = 'completed'
+    UNION ALL
+    SELECT o.user_id, (o.status_changed_at AT TIME ZONE 'UTC')::date,
+           0, 0, 0, 0, 1, 0, 0, 0
+    FROM orders o WHERE o.status = 'cancelled'
+    UNION ALL
+    SELECT w.user_id, (wt.created_at AT TIME ZONE 'UTC')::date,
+           0, 0, 0, 0, 0, 1, GREATEST(wt.amount, 0), GREATEST(-wt.amount, 0)
+    FROM wallet_transactions wt JOIN user_wallets w ON w.id = wt.wallet_id
+) deltas
+GROUP BY user_id, day
+ON CONFLICT (user_id, day) DO NOTHING;
@@ -0,0 +1,17 @@
+-- Background expiry of credit grants
+-- Generated: 2026-10-19
+--
+-- Grants (amount > 0) with expires_at in the past are claimed by a periodic sweeper in bounded
+-- batches with FOR UPDATE SKIP LOCKED, so concurrent workers never block on each other. Each
+-- batch deducts from wallets in bulk, posts reversing 'expiration' entries and stamps the grant's
+-- expired_at. The original grant amount is kept for history.
+
+ALTER TABLE user_credit_logs
+ADD COLUMN IF NOT EXISTS expired_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN user_credit_logs.expired_at IS 'When the expiry sweeper processed this grant; NULL while pending';
+
+-- Only pending grants with an expiry are indexed, so the index stays the size of the backlog
+CREATE INDEX IF NOT EXISTS idx_user_credit_logs_pending_expiry
+ON user_credit_logs (expires_at)
+WHERE expires_at IS NOT NULL AND expired_at IS NULL AND amount > 0;
@@ -0,0 +1,44 @@
+-- Wallet balance checkpoints and denormalized wallet owner on transactions
+-- Generated: 2026-10-19
+--
+-- wallet_transactions gains a per-insert sequence number. Every ledger insert happens in the same
+-- statement that updates the wallet row, so for one wallet seq order matches commit order and a
+-- snapshot that sees (balance, max seq) is consistent. A periodic job records such a pair per wallet;
+-- an audit replays only the rows after the latest checkpoint instead of the whole history.
+--
+-- user_id is copied onto wallet_transactions so history pages are an index-only scan on
+-- (user_id, created_at DESC, id DESC) without joining user_wallets.
+
+ALTER TABLE wallet_transactions
+ADD COLUMN IF NOT EXISTS seq BIGINT GENERATED BY DEFAULT AS IDENTITY,
+ADD COLUMN IF NOT EXISTS user_id UUID REFERENCES users(id) ON DELETE CASCADE;
+
+COMMENT ON COLUMN wallet_transactions.seq IS 'Insert sequence; per wallet it follows commit order';
+COMMENT ON COLUMN wallet_transactions.user_id IS 'Owner of wallet_id, copied on insert';
+
+UPDATE wallet_transactions wt
+SET user_id = w.user_id
+FROM user_wallets w
+WHERE w.id = wt.wallet_id AND wt.user_id IS NULL;
+
+ALTER TABLE wallet_transactions
+ALTER COLUMN user_id SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_wallet_transactions_wallet_seq
+ON wallet_transactions (wallet_id, seq);
+
+CREATE INDEX IF NOT EXISTS idx_wallet_transactions_user_history
+ON wallet_transactions (user_id, created_at DESC, id DESC)
+INCLUDE (wallet_id, transaction_type, amount, order_id, balance_after, description, updated_at);
+
+CREATE TABLE IF NOT EXISTS wallet_balance_checkpoints (
+    wallet_id UUID NOT NULL REFERENCES user_wallets(id) ON DELETE CASCADE,
+    last_seq BIGINT NOT NULL,
+    balance NUMERIC NOT NULL,
+    transaction_count BIGINT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (wallet_id, last_seq)
+);
+
+COMMENT ON TABLE wallet_balance_checkpoints IS 'Wallet balance as of the transaction with seq = last_seq';
+COMMENT ON COLUMN wallet_balance_checkpoints.transaction_count IS 'Transactions covered since the previous checkpoint';
@@ -0,0 +1,26 @@
+-- Agent usage metering
+-- Generated: 2026-10-19
+--
+-- Agent calls append a usage event to an in-process buffer. Every few seconds the buffer is written
+-- here with COPY, and the summed credits per user are debited from learning_points in one statement
+-- (one 'agent_usage' credit log row per user per flush). No foreign key on user_id so a deleted user
+-- cannot fail a whole COPY batch.
+
+CREATE TABLE IF NOT EXISTS agent_usage_events (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
+    user_id UUID NOT NULL,
+    agent_type VARCHAR(50) NOT NULL,
+    model VARCHAR(100),
+    session_id VARCHAR(100),
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    credits NUMERIC NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE agent_usage_events IS 'Per-call agent usage, written in batches by the metering flush';
+COMMENT ON COLUMN agent_usage_events.credits IS 'learning_points charged for the call';
+COMMENT ON COLUMN agent_usage_events.created_at IS 'When the call happened (not when it was flushed)';
+
+CREATE INDEX IF NOT EXISTS idx_agent_usage_events_user_created
+ON agent_usage_events (user_id, created_at DESC);
@@ -0,0 +1,24 @@
+-- Session participant columns and indexes for per-user session statistics
+-- Generated: 2026-10-19
+--
+-- The sessions repository filters by mentor_id / mentee_id, which the initial schema only had on
+-- mentorships. Add the columns where missing, backfill them from the parent mentorship, and index
+-- each with status so the statistics aggregate (COUNT(*) FILTER (WHERE status = ...)) is a
+-- BitmapOr over two small index ranges instead of a scan.
+
+ALTER TABLE sessions
+ADD COLUMN IF NOT EXISTS mentor_id UUID REFERENCES users(id) ON DELETE CASCADE,
+ADD COLUMN IF NOT EXISTS mentee_id UUID REFERENCES users(id) ON DELETE CASCADE;
+
+COMMENT ON COLUMN sessions.mentor_id IS 'Mentor of the session (copied from mentorships when created through one)';
+COMMENT ON COLUMN sessions.mentee_id IS 'Mentee of the session (copied from mentorships when created through one)';
+
+UPDATE sessions s
+SET mentor_id = COALESCE(s.mentor_id, m.mentor_id),
+    mentee_id = COALESCE(s.mentee_id, m.mentee_id)
+FROM mentorships m
+WHERE m.id = s.mentorship_id
+  AND (s.mentor_id IS NULL OR s.mentee_id IS NULL);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_mentor_status ON sessions (mentor_id, status);
+CREATE INDEX IF NOT EXISTS idx_sessions_mentee_status ON sessions (mentee_id, status);
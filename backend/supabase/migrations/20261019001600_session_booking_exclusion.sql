@@ -0,0 +1,42 @@
+-- Non-overlapping mentor bookings and availability lookups
+-- Generated: 2026-10-19
+--
+-- Bookable slots are computed from user_availability (weekly, UTC, day_of_week 0 = Sunday),
+-- unavailable_periods and the mentor's sessions. Booking relies on an exclusion constraint rather
+-- than locking the mentor's calendar: two concurrent inserts for overlapping times on the same
+-- mentor cannot both commit, the loser fails with exclusion_violation (23P01).
+--
+-- timestamptz + interval is not immutable, so the range end is stored as sessions.ends_at and kept
+-- in sync by the repository on create/reschedule. Cancelled sessions do not hold their slot.
+-- Existing overlapping non-cancelled sessions must be resolved before this migration can apply.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE sessions
+ADD COLUMN IF NOT EXISTS ends_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN sessions.ends_at IS 'scheduled_at + duration_minutes; end of the booked range';
+
+UPDATE sessions
+SET ends_at = scheduled_at + make_interval(mins => duration_minutes)
+WHERE ends_at IS NULL;
+
+ALTER TABLE sessions
+ALTER COLUMN ends_at SET NOT NULL;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'sessions_mentor_no_overlap'
+    ) THEN
+        ALTER TABLE sessions
+        ADD CONSTRAINT sessions_mentor_no_overlap
+        EXCLUDE USING gist (
+            mentor_id WITH =,
+            tstzrange(scheduled_at, ends_at, '[)') WITH &&
+        ) WHERE (status <> 'cancelled');
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_unavailable_periods_user_start
+ON unavailable_periods (user_id, start_datetime);
@@ -0,0 +1,22 @@
+-- Durable dirty marks for incremental hot score refresh
+-- Generated: 2026-10-19
+--
+-- Likes, unlikes, reply create/delete and view-count flushes stamp hot_score_dirty_at on the post
+-- in the same statement that changes its activity. The refresh job claims dirty posts in batches
+-- with FOR UPDATE SKIP LOCKED, rescores them and clears the mark in one statement, so marks survive
+-- restarts and are shared by every worker.
+
+ALTER TABLE forum_posts
+ADD COLUMN IF NOT EXISTS hot_score_dirty_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN forum_posts.hot_score_dirty_at IS 'Set when likes, replies or views change; cleared when hot_score is recomputed';
+
+-- Only dirty posts are indexed, so the index stays the size of the refresh backlog
+CREATE INDEX IF NOT EXISTS idx_forum_posts_hot_score_dirty
+ON forum_posts (hot_score_dirty_at)
+WHERE hot_score_dirty_at IS NOT NULL;
+
+-- Rescore recently created posts once, covering marks that only existed in process memory
+UPDATE forum_posts
+SET hot_score_dirty_at = NOW()
+WHERE created_at >= NOW() - INTERVAL '30 days' AND hot_score_dirty_at IS NULL;